@@ -123,3 +123,114 @@ class SymetricKey extends Key implements __ISymetricKey {
     return KeyType::SYMETRIC;
   }
 }
+
+// Where KeyCache keeps what it fetched, so other processes and requests can use it too.
+// An entry is ['pem' => ?string, 'fetched' => int, 'expires' => int]. A null pem means the
+// lookup failed, and is cached too.
+interface KeyStore {
+  public function get(string $keyId) : ?array;
+  public function set(string $keyId, array $entry) : void;
+}
+
+class APCuKeyStore implements KeyStore {
+  public function __construct(
+    public string $prefix = 'dpa.crypto.key.'
+  ){}
+  public function get(string $keyId) : ?array {
+    $entry = apcu_fetch($this->prefix . $keyId, $success);
+    return $success && is_array($entry) ? $entry : null;
+  }
+  public function set(string $keyId, array $entry) : void {
+    apcu_store($this->prefix . $keyId, $entry, max(1, $entry['expires'] - time()));
+  }
+};
+
+class FileKeyStore implements KeyStore {
+  public function __construct(
+    public string $directory
+  ){}
+  private function path(string $keyId) : string {
+    return $this->directory . '/' . hash('sha256', $keyId) . '.json';
+  }
+  public function get(string $keyId) : ?array {
+    $content = @file_get_contents($this->path($keyId));
+    if($content === false)
+      return null;
+    $entry = json_decode($content, true);
+    return is_array($entry) ? $entry : null;
+  }
+  public function set(string $keyId, array $entry) : void {
+    if(!is_dir($this->directory))
+      @mkdir($this->directory, 0700, true);
+    $path = $this->path($keyId);
+    $tmp = $path . '.' . getmypid() . '.tmp';
+    if(file_put_contents($tmp, json_encode($entry, JSON_UNESCAPED_SLASHES)) !== false)
+      rename($tmp, $path);
+  }
+};
+
+/**
+ * Public keys by keyId. $lookup does the actual lookup, and returns the PEM of the keys, or
+ * null if there are none. The parsed keys are kept in memory, the PEM in $store, if any.
+ */
+class KeyCache {
+  const MEMORY_SIZE = 1024;
+  private array $keys = [];
+  public function __construct(
+    private \Closure $lookup,
+    private ?KeyStore $store = null,
+    public int $ttl = 86400,
+    public int $negative_ttl = 300,
+    public int $min_refresh_interval = 60
+  ){}
+
+  public function get(string $keyId) : array {
+    $now = time();
+    $item = $this->keys[$keyId] ?? null;
+    if($item){
+      unset($this->keys[$keyId]);
+      if($item['expires'] <= $now)
+        $item = null;
+    }
+    if(!$item){
+      $entry = $this->store?->get($keyId);
+      if(!$entry || $entry['expires'] <= $now)
+        $entry = $this->fetch($keyId);
+      $item = $this->parse($entry);
+    }
+    if(count($this->keys) >= KeyCache::MEMORY_SIZE)
+      unset($this->keys[array_key_first($this->keys)]);
+    $this->keys[$keyId] = $item;
+    return $item['keys'];
+  }
+
+  // For when none of the keys matched, they may have been rotated. Returns null if they
+  // were fetched too recently to try again, so a bad signature can't cause a lookup each time.
+  public function refresh(string $keyId) : ?array {
+    $this->get($keyId);
+    if($this->keys[$keyId]['fetched'] + $this->min_refresh_interval > time())
+      return null;
+    $this->keys[$keyId] = $this->parse($this->fetch($keyId));
+    return $this->keys[$keyId]['keys'];
+  }
+
+  private function fetch(string $keyId) : array {
+    $now = time();
+    $pem = ($this->lookup)($keyId);
+    $entry = [
+      'pem' => $pem,
+      'fetched' => $now,
+      'expires' => $now + ($pem === null ? $this->negative_ttl : $this->ttl),
+    ];
+    $this->store?->set($keyId, $entry);
+    return $entry;
+  }
+
+  private function parse(array $entry) : array {
+    return [
+      'keys' => $entry['pem'] === null ? [] : PublicKey::getAllFromPEM($entry['pem']),
+      'fetched' => $entry['fetched'],
+      'expires' => $entry['expires'],
+    ];
+  }
+};
@@ -119,17 +119,26 @@ class HTTPDoc {
   public ?HTTPSignature $signature = null;
   public string $method;
   public string $location;
-  public string $message;
+  public string $message; // Only read from $body once it's accessed
   public array $headers = [];
+  private mixed $body = null;
+  private ?int $size = null;
   public function __construct(
     string $method,
     string $location,
     ?string $message = null,
-    array $headers = []
+    array $headers = [],
+    mixed $body = null, // A stream to read the message from, if there is no $message
+    public ?int $max_size = null // Bodies bigger than this are rejected
   ){
     $this->method = strtolower($method);
     $this->location = $location;
-    $this->message = $message ?? '';
+    if($message === null && $body !== null){
+      $this->body = $body;
+      unset($this->message);
+    }else{
+      $this->message = $message ?? '';
+    }
     $this->headers = array_change_key_case($headers, CASE_LOWER);
     $this->signature = HTTPSignature::fromHTTPDoc($this);
     $this->trim();
@@ -159,17 +168,75 @@ class HTTPDoc {
       }, ARRAY_FILTER_USE_KEY
     );
   }
-  public static function fromCurrentRequest() : HTTPDoc {
+  public function __get(string $name) : mixed {
+    if($name != 'message'){
+      trigger_error("Undefined property: HTTPDoc::$name", E_USER_WARNING);
+      return null;
+    }
+    if($this->hash([]) === null){
+      trigger_error("Message bigger than $this->max_size bytes, ignoring it", E_USER_WARNING);
+      return $this->message = '';
+    }
+    return $this->message = (string)stream_get_contents($this->body);
+  }
+  public static function fromCurrentRequest(?int $max_size=null) : HTTPDoc {
     if(self::$br)
       return self::$br;
     $method = $_SERVER['REQUEST_METHOD'];
     $location = $_SERVER['REQUEST_URI'];
-    $message = file_get_contents('php://input');
-    self::$br = new HTTPDoc($method, $location, $message?$message:null, getallheaders());
+    $length = $_SERVER['CONTENT_LENGTH'] ?? '';
+    $too_big = $max_size !== null && ctype_digit($length) && (int)$length > $max_size;
+    // If it's too big, don't even start reading it, hash() will say so
+    $body = fopen($too_big ? 'php://memory' : 'php://input', 'rb');
+    self::$br = new HTTPDoc($method, $location, null, getallheaders(), $body, $max_size);
+    if($too_big)
+      self::$br->size = (int)$length;
     return self::$br;
   }
+  public function has_message() : bool {
+    if(isset($this->message))
+      return $this->message !== '';
+    $this->hash([]);
+    return $this->size !== 0;
+  }
+  /**
+   * Hashes the message with all the algorithms at once. A streamed message is read only once, in chunks,
+   * and spooled to php://temp as it goes, for the hashes asked for later and the message itself.
+   * Returns null if it's bigger than max_size.
+   */
+  public function hash(array $algorithms) : ?array {
+    if($this->max_size !== null && $this->size !== null && $this->size > $this->max_size)
+      return null;
+    $contexts = [];
+    foreach($algorithms as $algorithm)
+      $contexts[$algorithm] = hash_init($algorithm);
+    if(isset($this->message)){
+      foreach($contexts as $context)
+        hash_update($context, $this->message);
+    }else{
+      $spool = $this->size === null ? fopen('php://temp', 'w+b') : null;
+      if($spool)
+        $this->size = 0;
+      else
+        rewind($this->body);
+      while(!feof($this->body) && ($chunk = fread($this->body, 65536)) !== false && $chunk !== ''){
+        if($spool){
+          $this->size += strlen($chunk);
+          if($this->max_size !== null && $this->size > $this->max_size)
+            return null;
+          fwrite($spool, $chunk);
+        }
+        foreach($contexts as $context)
+          hash_update($context, $chunk);
+      }
+      if($spool)
+        $this->body = $spool;
+      rewind($this->body);
+    }
+    return array_map('hash_final', $contexts);
+  }
   public function verify(
-    array|\dpa\crypto\PublicKey|\dpa\crypto\SymetricKey $key,
+    array|\dpa\crypto\PublicKey|\dpa\crypto\SymetricKey|\dpa\crypto\KeyCache $key,
     ?\DateTimeInterface $received_time=null,
     bool $received_time_trusted=false,
     bool $check_message_body=true,
@@ -194,13 +261,13 @@ class HTTPDoc {
       "SHA-1"   => [160,"sha1",new \DateTimeImmutable('2014-05-08')],
     ];
     $header = strtolower($header);
-    $digest = $this->headers[$header];
+    $digest = $this->headers[$header] ?? null;
     if(!$digest)
       return VerificationResult::NO_SIGNATURE;
     $insecure = true;
-    $has_signature = false;
-    foreach(explode(',', $digest) as $hash){
-      $a = explode('=', $digest, 2);
+    $expected = [];
+    foreach(explode(',', $digest) as $entry){
+      $a = explode('=', $entry, 2);
       $key = trim($a[0]);
       $value = $a[1]??null;
       if($value === null){
@@ -227,15 +294,19 @@ class HTTPDoc {
       }else{
         return VerificationResult::INVALID;
       }
-      $result = hash($hash[1], $this->message);
-      if(!hash_equals($value, $result)) // Note:
+      $expected[] = [$hash, $value];
+    }
+    if(!$expected)
+      return VerificationResult::NO_SIGNATURE;
+    $results = $this->hash(array_unique(array_map(fn($e) => $e[0][1], $expected)));
+    if($results === null)
+      return VerificationResult::INVALID;
+    foreach($expected as [$hash, $value]){
+      if(!hash_equals($value, $results[$hash[1]]))
         return VerificationResult::INVALID;
       if($hash[2] === null || ($trusted_verification_date && $trusted_verification_date <= $hash[2]))
         $insecure = false;
-      $has_signature = true;
     }
-    if(!$has_signature)
-      return VerificationResult::NO_SIGNATURE;
     return $insecure ? VerificationResult::VALID_BUT_INSECURE : VerificationResult::VALID;
   }
 };
@@ -385,8 +456,15 @@ class HTTPSignature {
     return implode("\n", $result);
   }
 
+  private function find_key(SignatureAlgorithm $sa, array $keys, string $message) : \dpa\crypto\PublicKey|\dpa\crypto\SymetricKey|null {
+    foreach($keys as $k)
+      if($sa->verify($k, $message, $this->signature))
+        return $k;
+    return null;
+  }
+
   public function verify(
-    array|\dpa\crypto\PublicKey|\dpa\crypto\SymetricKey $key,
+    array|\dpa\crypto\PublicKey|\dpa\crypto\SymetricKey|\dpa\crypto\KeyCache $key,
     ?\DateTimeInterface $received_time = null,
     bool $received_time_trusted = false,
     bool $check_message_body = true,
@@ -395,7 +473,9 @@ class HTTPSignature {
     $insecure = false;
     if(!$key)
       return VerificationResult::INVALID;
-    if(!is_array($key))
+    // Only looked up once the cheap checks passed
+    $cache = $key instanceof \dpa\crypto\KeyCache ? $key : null;
+    if(!$cache && !is_array($key))
       $key = [$key];
     $check_time = $received_time ? $received_time->getTimestamp() : strtotime("now");
     if($received_time_trusted && $received_time !== null && $received_time->getTimestamp() - $this->skew_seconds > strtotime("now")){
@@ -426,20 +506,18 @@ class HTTPSignature {
     $message = $this->construct_signature_message();
     if(!$message)
       return VerificationResult::INVALID;
-    $rkey = null;
-    foreach($key as $k){
-      if($sa->verify($k, $message, $this->signature)){
-        $rkey = $k;
-        break;
-      }
-    }
+    if($cache)
+      $key = $cache->get($this->keyId);
+    $rkey = $this->find_key($sa, $key, $message);
+    if(!$rkey && $cache && ($key = $cache->refresh($this->keyId)))
+      $rkey = $this->find_key($sa, $key, $message);
     if(!$rkey)
       return VerificationResult::INVALID;
     $results = [];
-    if( $check_message_body && ( $this->doc->message
-     || in_array('digest', $this->headers)
+    if( $check_message_body && ( in_array('digest', $this->headers)
      || in_array('repr-digest', $this->headers)
      || in_array('content-digest', $this->headers)
+     || $this->doc->has_message()
     )){
       // The spec doesn't ask for the checking the content, but let's check it anyway!
       if(in_array('content-digest',$this->headers))
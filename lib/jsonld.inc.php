@@ -7,7 +7,7 @@ interface POJO extends \Serializable {
   const IRI = null;
   const NS = null;
   public function toArray(ContextHelper $context=null) : array|string|null;
-  public function fromArray(array $data) : void;
+  public function fromArray(array $data, ContextHelper $context=null) : void;
 }
 
 interface simple_type extends \Serializable, \Stringable {
@@ -28,11 +28,23 @@ class ContextHelper {
   public array $context = [];
   public array $mapping = [];
   public array $mapping_ext = [];
+  // The META of the only context module loaded, its tables can be used as is
+  private ?array $meta = null;
+  private ?array $mappings = null;
+  private ?array $expanded = null;
+  private ?array $reverse = null;
+  private ?array $prefix_lengths = null;
+  private ?array $typefields = null;
+  // Resolved contexts by their JSON, most recently used last. They're shared, so
+  // they are never handed out, only merged into other instances.
+  private static array $cache = [];
+  const CACHE_SIZE = 64;
   public function __construct(ContextHelper|string|array|null $context=null){
     if($context instanceof self){
       $this->context = $context->context;
       $this->mapping = $context->mapping;
       $this->mapping_ext = $context->mapping_ext;
+      $this->meta = $context->meta;
       return;
     }
     if(!$context)
@@ -43,6 +55,7 @@ class ContextHelper {
       if(!is_array($value))
         $value = ['@id' => $value];
     unset($value);
+    $meta = false;
     foreach($context as $entry)
     foreach($entry as $key => $value){
       if(!is_string($value)){
@@ -58,19 +71,44 @@ class ContextHelper {
         if($lctx){
           $this->mapping = array_merge($this->mapping, $lctx['MAPPING']);
           $this->mapping_ext = array_merge($this->mapping, $lctx['MAPPING_EXT']);
+          if($meta === false){
+            $meta = $lctx;
+          }else if($meta && $meta['CONTEXT'] !== $lctx['CONTEXT']){
+            $meta = null;
+          }
         }
       }else{
         unset($this->mapping[$key]);
         $this->mapping_ext[$key] = $value;
+        $meta = null;
       }
     }
+    $mappings = $this->mapping + $this->mapping_ext;
     foreach($this->mapping as &$value)
-      $value = $this->key2iri($value);
+      $value = ContextHelper::expand($value, $mappings);
     unset($value);
+    $this->meta = $meta ?: null;
   }
 
-  public function key2iri(string $key) : string {
-    $mappings = $this->mapping + $this->mapping_ext;
+  private static function resolve(ContextHelper|string|array $context) : ContextHelper {
+    if($context instanceof self)
+      return $context;
+    // Not sorted, the order of the terms decides which one iri2key picks
+    $key = json_encode($context, JSON_UNESCAPED_SLASHES);
+    if($key === false)
+      return new ContextHelper($context);
+    if(isset(ContextHelper::$cache[$key])){
+      $c = ContextHelper::$cache[$key];
+      unset(ContextHelper::$cache[$key]);
+    }else{
+      $c = new ContextHelper($context);
+      if(count(ContextHelper::$cache) >= ContextHelper::CACHE_SIZE)
+        unset(ContextHelper::$cache[array_key_first(ContextHelper::$cache)]);
+    }
+    return ContextHelper::$cache[$key] = $c;
+  }
+
+  private static function expand(string $key, array $mappings) : string {
     while(true){
       if(isset($mappings[$key])){
         $key = $mappings[$key];
@@ -86,38 +124,99 @@ class ContextHelper {
     return $key;
   }
 
-  public function iri2key(string $iri, array &$emaps=null) : string{
-    $mappings = $this->mapping + $this->mapping_ext;
-    $result = $iri;
-    $best = 0;
-    foreach($mappings as $key => $value){
-      if($iri == $value)
-        return $key;
-      if(strlen($value) <= $best)
+  private function index() : void {
+    if($this->expanded !== null)
+      return;
+    $this->mappings = $this->mapping + $this->mapping_ext;
+    if($this->meta){
+      $this->expanded = $this->meta['EXPANDED'];
+      $this->reverse = $this->meta['REVERSE'];
+      $this->prefix_lengths = $this->meta['PREFIX_LENGTHS'];
+      return;
+    }
+    $this->expanded = [];
+    $this->reverse = [];
+    $lengths = [];
+    foreach($this->mappings as $key => $value){
+      $this->expanded[$key] = ContextHelper::expand((string)$key, $this->mappings);
+      if(!isset($this->reverse[$value]))
+        $this->reverse[$value] = $key;
+      if($value !== '')
+        $lengths[strlen($value)] = true;
+    }
+    $this->prefix_lengths = array_keys($lengths);
+    rsort($this->prefix_lengths);
+  }
+
+  public function key2iri(string $key) : string {
+    $this->index();
+    while(true){
+      if(isset($this->expanded[$key]))
+        return $this->expanded[$key];
+      @list($prefix, $ref) = explode(':', $key, 2);
+      if($ref !== null && isset($this->mappings[$prefix])){
+        $key = $this->mappings[$prefix] . $ref;
         continue;
-      if(!str_starts_with($iri, $value))
+      }
+      return $key;
+    }
+  }
+
+  public function iri2key(string $iri, array &$emaps=null) : string{
+    $this->index();
+    if(isset($this->reverse[$iri]))
+      return (string)$this->reverse[$iri];
+    $n = strlen($iri);
+    foreach($this->prefix_lengths as $length){
+      if($length >= $n || !isset($this->reverse[$prefix = substr($iri, 0, $length)]))
         continue;
-      $best = strlen($value);
-      $suffix = substr($iri,$best);
+      $key = (string)$this->reverse[$prefix];
+      $suffix = substr($iri, $length);
       $result = $key.':'.$suffix;
       if($emaps !== null && !isset($this->mapping[$key])){
-        $emaps[$key] = $value;
-        if(!isset($mappings[$suffix])){
+        $emaps[$key] = $prefix;
+        if(!isset($this->mappings[$suffix])){
           $emaps[$suffix] = $result;
           $result = $suffix;
         }
       }
+      return $result;
     }
-    return $result;
+    return $iri;
   }
 
   public function lookup(string $key) : ?string {
     return f::lookup_type_by_iri($this->key2iri($key));
   }
 
+  // The keys which are aliases of @type, and @type itself
+  public function typefields() : array {
+    if($this->typefields === null)
+      $this->typefields = array_merge(['@type'], array_keys($this->mapping, '@type', true));
+    return $this->typefields;
+  }
+
   public function merge(ContextHelper|string|array|null ...$contexts) : ContextHelper {
     foreach($contexts as $context){
-      $c = new ContextHelper($context);
+      if($context === null || $context === [] || $context === '')
+        continue;
+      $c = ContextHelper::resolve($context);
+      if(!$c->context && !$c->mapping && !$c->mapping_ext)
+        continue;
+      if(!$this->context && !$this->mapping && !$this->mapping_ext){
+        // Nothing to merge with, take it as is, including what was already indexed
+        $c->index();
+        foreach(['context', 'mapping', 'mapping_ext', 'meta', 'mappings', 'expanded', 'reverse', 'prefix_lengths', 'typefields'] as $field)
+          $this->$field = $c->$field;
+        continue;
+      }
+      if($c->meta && ((!$this->mapping && !$this->mapping_ext) || ($this->meta && $this->meta['CONTEXT'] === $c->meta['CONTEXT']))){
+        $this->meta = $c->meta;
+      }else if($c->mapping || $c->mapping_ext){
+        $this->meta = null;
+      }
+      $this->expanded = null;
+      $this->typefields = null;
       $this->context = array_merge($this->context, $c->context);
       $this->mapping = array_merge($this->mapping, $c->mapping);
       $this->mapping_ext = array_merge($this->mapping_ext, $c->mapping_ext);
@@ -128,7 +227,22 @@ class ContextHelper {
 
 class f {
 
+  // The generator emits tables for both lookups below. If they're there, they're authoritative.
+  public static function iri_lookup() : ?array {
+    static $lookup = null;
+    if($lookup === null)
+      $lookup = file_exists(\dpa\IRI_LOOKUP) ? require \dpa\IRI_LOOKUP : false;
+    return $lookup ?: null;
+  }
+
+  // The id the generated schema seeds into the `id` table for a vocabulary IRI, no query needed.
+  public static function iri_id(string $iri) : ?int {
+    return f::iri_lookup()['IDS'][$iri] ?? null;
+  }
+
   public static function lookup_type_by_iri(string $iri, ?string $key=null) : ?string {
+    if($key === null && ($lookup = f::iri_lookup()))
+      return $lookup['TYPES'][$iri] ?? null;
     if(!preg_match('/^([^:]*:(\/\/)?)([^#]*)(#(.*))?$/',$iri,$result))
       return null;
     if(!@$result[3])
@@ -148,6 +262,10 @@ class f {
   }
 
   public static function lookup_context(string $uri) : ?array {
+    if($lookup = f::iri_lookup()){
+      $module = $lookup['CONTEXTS'][explode('#', $uri, 2)[0]] ?? null;
+      return $module ? $module::META : null;
+    }
     if(!preg_match('/^([^:]*:(\/\/)?)([^#]*)(#(.*))?$/',$uri,$result))
       return null;
     if(!@$result[3])
@@ -219,20 +337,8 @@ class f {
       $value = $o->{'get_'.$entry->name}();
       if($value === null || (is_array($value) && count($value) == 0))
         continue;
-      if(!is_array($value) || !isset($value[0]))
-        $value = [$value];
-      foreach($value as &$v){
-        if($v instanceof POJO){
-          $v = $v->toArray($context);
-        }else if($v instanceof simple_type){
-          $v = $v->__toString();
-        }
-      }
-      unset($v);
-      if(count($value) == 1)
-        $value = $value[0];
       if(!isset($result[$entry->iri])){
-        $result[$entry->iri] = $value;
+        $result[$entry->iri] = f::toArrayValue($value, $context);
         foreach($entry->context as $ctx)
           $contexts[$ctx] = @$contexts[$ctx] + 1;
       }
@@ -245,6 +351,22 @@ class f {
     return $result;
   }
 
+  public static function toArrayValue(mixed $value, ContextHelper $context) : mixed {
+    if(!is_array($value) || !isset($value[0]))
+      $value = [$value];
+    foreach($value as &$v){
+      if($v instanceof POJO){
+        $v = $v->toArray($context);
+      }else if($v instanceof simple_type){
+        $v = $v->__toString();
+      }
+    }
+    unset($v);
+    if(count($value) == 1)
+      $value = $value[0];
+    return $value;
+  }
+
   public static function getIRItoNameMap(POJO|string $o) : array {
     static $iri_map = [];
     if(is_object($o))
@@ -252,6 +374,16 @@ class f {
     if(isset($iri_map[$o]))
       return $iri_map[$o];
     $info = [];
+    if(defined($o.'::IRI_MAP')){
+      // Precomputed by the generator, already sorted
+      foreach($o::IRI_MAP as $key => list($iri, $name, $defaultType, $context)){
+        $prop = new Property($iri, $defaultType, $context);
+        $prop->name = $name;
+        $info[$key] = $prop;
+      }
+      $iri_map[$o] = $info;
+      return $info;
+    }
     foreach(f::getAllParents($o) as $reflection){
       foreach($reflection->getMethods() as $entry){
         if(!($attr = @$entry->getAttributes(Property::class)[0]))
@@ -284,26 +416,29 @@ class f {
           trigger_error("No mapping for IRI: $key\n");
         continue;
       }
-      if(is_array($value)){
-        if(isset($value[0])){
-          foreach($value as &$v)
-            if(is_array($v))
-              $v = f::fromArray($v, $context, $entry->defaultType);
-          unset($v);
-        }else{
-          $value = [f::fromArray($value, $context, $entry->defaultType)];
-        }
+      $o->{'set_'.$entry->name}(...f::fromArrayValue($value, $context, $entry->defaultType));
+    }
+  }
+
+  public static function fromArrayValue(mixed $value, ContextHelper $context, ?string $defaultType=null) : array {
+    if(is_array($value)){
+      if(isset($value[0])){
+        foreach($value as &$v)
+          if(is_array($v))
+            $v = f::fromArray($v, $context, $defaultType);
+        unset($v);
       }else{
-        $value = [$value];
+        $value = [f::fromArray($value, $context, $defaultType)];
       }
-      $o->{'set_'.$entry->name}(...$value);
+    }else{
+      $value = [$value];
     }
+    return $value;
   }
 
   public static function fromArray(array $a, ContextHelper|array|string $context=null, ?string $defaultType=null) : ?POJO {
     $context = (new ContextHelper())->merge($context, @$a['@context']);
-    $typefields = array_merge(['@type'], array_keys($context->mapping, '@type', true));
-    foreach($typefields as $typefield){
+    foreach($context->typefields() as $typefield){
       $type = @$a[$typefield];
       if(is_string($type))
         break;
@@ -317,10 +452,27 @@ class f {
       return null;
     $pojo = new $class();
     assert($pojo instanceof POJO);
-    f::fromArrayHelper($pojo, $a, $context);
+    $pojo->fromArray($a, $context);
     return $pojo;
   }
 
+  // For many documents at once, like an inbox batch. The contexts are resolved once and shared.
+  public static function fromArrayBatch(iterable $list, ContextHelper|array|string $context=null, ?string $defaultType=null) : \Generator {
+    $context = (new ContextHelper())->merge($context);
+    foreach($list as $i => $a)
+      yield $i => is_array($a) ? f::fromArray($a, $context, $defaultType) : null;
+  }
+
+  // Same, for a stream with one JSON document per line. Empty lines are skipped.
+  public static function fromNDJSON(mixed $stream, ContextHelper|array|string $context=null, ?string $defaultType=null) : \Generator {
+    $lines = (function() use($stream){
+      while(($line = fgets($stream)) !== false)
+        if(($line = trim($line)) !== '')
+          yield json_decode($line, true);
+    })();
+    yield from f::fromArrayBatch($lines, $context, $defaultType);
+  }
+
   public static function toArray(POJO $o) : array|string|null {
     return $o->toArray();
   }
@@ -347,11 +499,15 @@ class f {
     $v = f::deser_sub($v, $a);
     foreach($mod as list($ns,$md)){
       if($v instanceof $ns && !$md($v))
-        throw new \Exception("Constraint failed: $md(".json_encode($v).")");
+        f::constraint_failed($md, $v);
     }
     return $v;
   }
 
+  public static function constraint_failed(string $constraint, mixed $v) : never {
+    throw new \Exception("Constraint failed: $constraint(".json_encode($v).")");
+  }
+
   public static function array_flatten(array $x, array $expand=[], array $mod=[]) : array {
     $res = [];
     foreach($x as $vs){
@@ -4,6 +4,8 @@ declare(strict_types = 1);
 namespace dpa;
 
 const BASE = __DIR__ . '/..';
+const CLASSMAP = BASE . '/pojo/__classmap__.inc.php';
+const IRI_LOOKUP = BASE . '/pojo/__iri__.inc.php';
 
 function load(string $file) : void {
   if(file_exists(BASE.'/'.$file))
@@ -11,8 +13,19 @@ function load(string $file) : void {
 }
 
 spl_autoload_register(function(string $class_name){
+  static $classmap = null;
   if(!str_starts_with($class_name, 'dpa\\'))
     return;
+  if(str_starts_with($class_name, 'dpa\\pojo\\')){
+    // The generator emits a map of all generated classes. If it's there, it's authoritative.
+    if($classmap === null)
+      $classmap = file_exists(CLASSMAP) ? require CLASSMAP : false;
+    if($classmap !== false){
+      if(isset($classmap[$class_name]))
+        require_once BASE.'/'.$classmap[$class_name];
+      return;
+    }
+  }
   $parts = explode('\\', $class_name);
   if(count($parts) <= 2)
     return;
@@ -15,20 +15,15 @@ namespace dpa\pojo\www_w3_org\ns\activitystreams {
         $this->set_href($scalar);
     }
     public function toArray(\dpa\jsonld\ContextHelper $context=null) : array|string|null {
-      foreach(\dpa\jsonld\f::getAllParents(get_class($this)) as $reflection){
-        foreach($reflection->getMethods() as $entry){
-          if(!($attr = @$entry->getAttributes(\dpa\jsonld\Property::class)[0]))
-            continue;
-          if(!($name = @explode('_', $entry->getName(), 2)[1]))
-            continue;
-          $value = $this->{'get_'.$name}();
-          if($name === 'href'){
-            if($value === null){
-              return parent::toArray($context);
-            }
-          }else if($value !== null && !(is_array($value) && count($value) == 0)){
+      foreach(\dpa\jsonld\f::getIRItoNameMap($this) as $entry){
+        $name = $entry->name;
+        $value = $this->{'get_'.$name}();
+        if($name === 'href'){
+          if($value === null){
             return parent::toArray($context);
           }
+        }else if($value !== null && !(is_array($value) && count($value) == 0)){
+          return parent::toArray($context);
         }
       }
       $v = $this->get_href();
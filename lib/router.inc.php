@@ -13,8 +13,14 @@ class RouteMatch {
   }
 };
 
+// The routes are compiled into a trie, with one root per number of components. A node is
+// ['s' => [component => node], 'v' => ?node, 'm' => [method => index]], where 'v' matches any
+// component, and the method '*' is used for routes which accept any method. The table is a
+// plain array, so it can be kept in APCu, or in a PHP file for opcache.
 class Router {
+  const APCU_PREFIX = 'dpa.router.';
   protected array $routes = [];
+  protected ?array $table = null;
 
   public function route(?string $method, array $components, \Closure $callback) : void {
     $this->add(new Route($method, $components, $callback));
@@ -22,24 +28,108 @@ class Router {
 
   public function add(Route $route) : void {
     $this->routes[] = $route;
+    $this->table = null;
+  }
+
+  public function signature() : string {
+    $spec = [];
+    foreach($this->routes as $route){
+      $spec[] = $route->method ?? '*';
+      $spec[] = count($route->components);
+      foreach($route->components as $component)
+        $spec[] = $component === null ? null : "$component";
+    }
+    return hash('xxh128', serialize($spec));
+  }
+
+  public function compile() : array {
+    $trie = [];
+    foreach($this->routes as $index => $route){
+      $node = &$trie[count($route->components)];
+      foreach($route->components as $component){
+        if($component === null){
+          $node = &$node['v'];
+        }else{
+          $node = &$node['s']["$component"];
+        }
+      }
+      // Earlier routes win over later ones with the same number of arguments.
+      $node['m'][$route->method ?? '*'] ??= $index;
+      unset($node);
+    }
+    return $this->table = [
+      'signature' => $this->signature(),
+      'trie' => $trie,
+    ];
+  }
+
+  // Uses a table from compile(). It's ignored if the routes changed since.
+  public function load(array $table) : bool {
+    if(($table['signature'] ?? null) !== $this->signature())
+      return false;
+    $this->table = $table;
+    return true;
+  }
+
+  public function cache(string $key) : bool {
+    if(!function_exists('apcu_enabled') || !apcu_enabled()){
+      $this->compile();
+      return false;
+    }
+    $table = apcu_fetch(static::APCU_PREFIX . $key, $success);
+    if($success && is_array($table) && $this->load($table))
+      return true;
+    apcu_store(static::APCU_PREFIX . $key, $this->compile());
+    return false;
+  }
+
+  public function save(string $file) : void {
+    $tmp = $file . '.' . getmypid() . '.tmp';
+    if(file_put_contents($tmp, "<?php\nreturn " . var_export($this->table ?? $this->compile(), true) . ";\n") !== false)
+      rename($tmp, $file);
+  }
+
+  public function restore(string $file) : bool {
+    $table = @include $file;
+    return is_array($table) && $this->load($table);
   }
 
   public function lookup(?URLLocation $location=null) : ?RouteMatch {
     if($location === null)
       $location = URLLocation::fromPath(preg_replace('/([\\?\\#].*)?/sm', '', $_SERVER['PATH_INFO'] ?? $_SERVER['REQUEST_URI'] ?? ''), $_SERVER['REQUEST_METHOD']);
-    $count = INF;
-    $best_route = null;
-    foreach($this->routes as $route){
-      $match = $route->match($location);
-      if(!$match)
-        continue;
-      $c = count($match->arguments);
-      if($count <= $c)
-        continue;
-      $count = $c;
-      $best_route = $match;
+    $table = $this->table ?? $this->compile();
+    $node = $table['trie'][count($location->components)] ?? null;
+    if($node === null)
+      return null;
+    $best = null;
+    static::search($node, $location->components, 0, $location->method, [], $best);
+    if($best === null)
+      return null;
+    return new RouteMatch($this->routes[$best[0]], $best[1]);
+  }
+
+  // Finds the route with the fewest arguments, and of those, the one added first.
+  protected static function search(array $node, array $components, int $i, string $method, array $arguments, ?array &$best) : void {
+    if($best !== null && count($arguments) > count($best[1]))
+      return;
+    if(!isset($components[$i])){
+      $index = $node['m'][$method] ?? null;
+      $any = $node['m']['*'] ?? null;
+      if($index === null || ($any !== null && $any < $index))
+        $index = $any;
+      if($index === null)
+        return;
+      if($best === null || count($arguments) < count($best[1]) || $index < $best[0])
+        $best = [$index, $arguments];
+      return;
+    }
+    $component = $components[$i];
+    if(isset($node['s'][$component]))
+      static::search($node['s'][$component], $components, $i+1, $method, $arguments, $best);
+    if(isset($node['v'])){
+      $arguments[] = $component;
+      static::search($node['v'], $components, $i+1, $method, $arguments, $best);
     }
-    return $best_route;
   }
 
   public function execute(?URLLocation $location=null) : bool {
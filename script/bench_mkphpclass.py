@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# Runs mkphpclass.py against generated ontologies of increasing size, to see how it scales.
+# Nothing is downloaded, everything happens in a temporary directory. Each size is run
+# in its own process, so that the peak memory is that of this size alone.
+import os
+import re
+import sys
+import json
+import glob
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+script = Path(__file__).resolve().parent
+base = script.parent
+
+def override_meta():
+  meta = {}
+  for f in sorted(glob.glob(str(base / 'lib/override/*.php'))):
+    with open(f, 'r') as fd:
+      m = re.search(r'/\* *override: *(\{.*?)\n\*/', fd.read(), re.S)
+    if m:
+      meta.update(json.loads(m.group(1)))
+  return meta
+
+# A tree of classes with 4 subclasses each. Every class has a few datatype properties,
+# and an object property pointing at some other class.
+def ontology(n):
+  ns = 'https://example.org/ns/synthetic#'
+  s = [
+    '@prefix : <'+ns+'> .\n',
+    '@prefix meta: <http://dpa.li/ns/owl/fixes/meta#> .\n',
+    '@prefix owl: <http://www.w3.org/2002/07/owl#> .\n',
+    '@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\n',
+    '@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n\n',
+    '<https://example.org/ns/synthetic> a owl:Ontology .\n',
+    '<https://example.org/ns/synthetic/context> a meta:context; meta:target-ontology <https://example.org/ns/synthetic> .\n\n',
+  ]
+  context = {'@vocab': ns}
+  for i in range(n):
+    s.append(f':Class{i} a owl:Class')
+    if i:
+      s.append(f'; rdfs:subClassOf :Class{(i-1)//4}')
+    s.append(' .\n')
+    context[f'Class{i}'] = ns + f'Class{i}'
+    for k, (kind, rtype) in enumerate((
+      ('owl:DatatypeProperty', 'xsd:string'),
+      ('owl:DatatypeProperty, owl:FunctionalProperty', 'xsd:dateTime'),
+      ('owl:DatatypeProperty', 'xsd:float'),
+      ('owl:ObjectProperty', f':Class{i*7%n}'),
+    )):
+      s.append(f':prop{i}_{k} a {kind}; rdfs:domain :Class{i}; rdfs:range {rtype} .\n')
+      context[f'prop{i}_{k}'] = ns + f'prop{i}_{k}'
+  return ''.join(s), {'@context': context}
+
+def run(n, jobs):
+  with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    os.makedirs('build')
+    os.makedirs('vocab')
+    os.makedirs('download/context/https:/example.org/ns/synthetic')
+    shutil.copy(base / 'base.sql', 'base.sql')
+    shutil.copy(base / 'vocab/ld.owl', 'vocab/ld.owl')
+    with open('build/override_meta.json', 'w') as f:
+      json.dump(override_meta(), f)
+    owl, context = ontology(n)
+    with open('vocab/synthetic.owl', 'w') as f:
+      f.write(owl)
+    with open('download/context/https:/example.org/ns/synthetic/context', 'w') as f:
+      json.dump(context, f)
+    sys.path.insert(0, str(script))
+    import mkphpclass
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+      stats = mkphpclass.generate(['vocab/ld.owl', 'vocab/synthetic.owl'], ['https://example.org/ns/synthetic/context'], use_cache=False, jobs=jobs)
+    finally:
+      sys.stdout.close()
+      sys.stdout = stdout
+  return {**stats.counts, **stats.phases, 'total': stats.last-stats.start, 'peak MiB': stats.peak_memory()/1024}
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark mkphpclass.py against synthetic ontologies')
+  parser.add_argument('sizes', nargs='*', type=int, default=[25, 100, 400, 1600], help='number of classes of each ontology')
+  parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='passed on to the generator')
+  parser.add_argument('--one', type=int, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.one is not None:
+    print(json.dumps(run(args.one, args.jobs)))
+    return
+
+  rows = []
+  for n in args.sizes:
+    out = subprocess.run([sys.executable, __file__, '--one', str(n), '--jobs', str(args.jobs)], check=True, stdout=subprocess.PIPE)
+    rows.append(json.loads(out.stdout))
+  columns = [*rows[0].keys()] if rows else []
+  print(' '.join(f'{c:>10}' for c in columns))
+  for row in rows:
+    print(' '.join(f'{row[c]:>10.3f}' if isinstance(row[c], float) else f'{row[c]:>10}' for c in columns))
+
+if __name__ == '__main__':
+  main()
@@ -3,9 +3,16 @@ import os
 import re
 import sys
 import json
+import math
+import time
 import textwrap
 import base64
+import pickle
 import hashlib
+import argparse
+import resource
+import multiprocessing
+import rdflib
 from glob import glob
 from pathlib import Path
 from rdflib import RDF, Graph, URIRef, Literal
@@ -20,16 +27,62 @@ owl_DatatypeProperty = URIRef("http://www.w3.org/2002/07/owl#DatatypeProperty")
 owl_ObjectProperty = URIRef("http://www.w3.org/2002/07/owl#ObjectProperty")
 owl_FunctionalProperty = URIRef("http://www.w3.org/2002/07/owl#FunctionalProperty")
 owl_onDatatype = URIRef("http://www.w3.org/2002/07/owl#onDatatype")
+owl_withRestrictions = URIRef("http://www.w3.org/2002/07/owl#withRestrictions")
 owl_properties = [owl_DatatypeProperty,owl_ObjectProperty,owl_FunctionalProperty]
 owl_equivalentProperty = URIRef("http://www.w3.org/2002/07/owl#equivalentProperty")
 owl_sameAs = URIRef("http://www.w3.org/2002/07/owl#sameAs")
 dpa_context = URIRef('http://dpa.li/ns/owl/fixes/meta#context')
+dpa_index = URIRef('http://dpa.li/ns/owl/fixes/meta#index')
+rdf_first = URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#first')
+rdf_rest = URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#rest')
+rdf_nil = URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#nil')
+xsd_ns = 'http://www.w3.org/2001/XMLSchema#'
+
+# Bump this whenever fixup() or anything else affecting the parsed graphs changes
+GENERATOR_VERSION = 2
+vocab_cache_dir = 'build/cache/vocab'
+pojo_manifest = 'build/pojo.manifest.json'
+specialize = False
+sql_layout = 'normalized'
+sql_partition = False
+# Ids below this are reserved for the vocabulary IRIs, see Registry.getIRIIds
+iri_id_range = 1 << 24
+# Every id given out so far. A database keeps the ids it was created with, so this is
+# kept with the vocabularies rather than with what's generated.
+iri_ids_file = 'vocab/ids.json'
 
 wrapper = textwrap.TextWrapper(width=80-5)
 
-with open("build/override_meta.json",'r') as f:
-  native_types = json.load(f)
-  native_types['http://dpa.li/ns/owl/fixes/types#JSON'] = ['string',None,None,'JSON']
+# The facets of the builtin xsd types that the PHP type doesn't already guarantee.
+# long has none, and unsignedLong only a minimum, because PHP ints can't go beyond that anyway.
+xsd_facets = {
+  xsd_ns+'nonPositiveInteger': {'maxInclusive': 0},
+  xsd_ns+'negativeInteger': {'maxInclusive': -1},
+  xsd_ns+'int': {'minInclusive': -0x80000000, 'maxInclusive': 0x7FFFFFFF},
+  xsd_ns+'short': {'minInclusive': -0x8000, 'maxInclusive': 0x7FFF},
+  xsd_ns+'byte': {'minInclusive': -0x80, 'maxInclusive': 0x7F},
+  xsd_ns+'nonNegativeInteger': {'minInclusive': 0},
+  xsd_ns+'unsignedLong': {'minInclusive': 0},
+  xsd_ns+'unsignedInt': {'minInclusive': 0, 'maxInclusive': 0xFFFFFFFF},
+  xsd_ns+'unsignedShort': {'minInclusive': 0, 'maxInclusive': 0xFFFF},
+  xsd_ns+'unsignedByte': {'minInclusive': 0, 'maxInclusive': 0xFF},
+  xsd_ns+'positiveInteger': {'minInclusive': 1},
+}
+supported_facets = {'minInclusive', 'maxInclusive', 'minExclusive', 'maxExclusive', 'length', 'minLength', 'maxLength', 'pattern'}
+php_type_tests = {
+  'int': 'is_int($v)',
+  'float': '(is_int($v) || is_float($v))',
+  'string': 'is_string($v)',
+  'bool': 'is_bool($v)',
+}
+
+native_types = None
+
+def load_native_types():
+  global native_types
+  with open("build/override_meta.json",'r') as f:
+    native_types = json.load(f)
+    native_types['http://dpa.li/ns/owl/fixes/types#JSON'] = ['string',None,None,'JSON']
 
 def escape_id(s):
   s = re.sub('[^a-zA-Z0-9_\x7f-\xff\\\\/]', '_', s)
@@ -37,13 +90,17 @@ def escape_id(s):
   s = re.sub('([/\\\\])+', '\\1', s)
   return s
 
-def escapeSQLid(s):
+def sqlName(s):
   s = str(s)
   if len(s) > 64: # mysql length limit
     h = hashlib.sha1(s.encode()).digest()
     h = base64.b64encode(h).decode()
     n = getName(s)[:64-len(h)-1]
     s = n + '\t' + h
+  return s
+
+def escapeSQLid(s):
+  s = sqlName(s)
   result = re.sub('([\\\\`])','\\\\\\1', s)
   result = '`' + result + '`'
   return result
@@ -51,9 +108,97 @@ def escapeSQLid(s):
 def escapeSQLstr(s):
   return '\'' + re.sub('([\\\\\'])','\\\\\\1', s) + '\''
 
+def phpStr(s):
+  return '\'' + re.sub('([\\\\\'])','\\\\\\1', s) + '\''
+
+xml_name_start = ':A-Z_a-z\\x{C0}-\\x{D6}\\x{D8}-\\x{F6}\\x{F8}-\\x{2FF}\\x{370}-\\x{37D}\\x{37F}-\\x{1FFF}\\x{200C}-\\x{200D}\\x{2070}-\\x{218F}\\x{2C00}-\\x{2FEF}\\x{3001}-\\x{D7FF}\\x{F900}-\\x{FDCF}\\x{FDF0}-\\x{FFFD}\\x{10000}-\\x{EFFFF}'
+xml_name = xml_name_start + '\\-.0-9\\x{B7}\\x{300}-\\x{36F}\\x{203F}-\\x{2040}'
+xsd_class_escapes = {'d': '\\p{Nd}', 'D': '\\P{Nd}', 's': '\\x20\\t\\n\\r', 'i': xml_name_start, 'c': xml_name}
+xsd_escapes = {
+  'd': '\\p{Nd}', 'D': '\\P{Nd}',
+  's': '[\\x20\\t\\n\\r]', 'S': '[^\\x20\\t\\n\\r]',
+  'w': '[^\\p{P}\\p{Z}\\p{C}]', 'W': '[\\p{P}\\p{Z}\\p{C}]',
+  'i': '['+xml_name_start+']', 'I': '[^'+xml_name_start+']',
+  'c': '['+xml_name+']', 'C': '[^'+xml_name+']',
+}
+
+# An XSD regular expression as a PCRE one, without the implicit anchors. None if it uses
+# something that has no PCRE equivalent here, like \p{IsBasicLatin} blocks.
+def xsdPatternToPCRE(p):
+  def escape(i, classes):
+    c = p[i:i+1]
+    if c in 'pP' and c and p[i+1:i+2] == '{':
+      end = p.find('}', i)
+      if end < 0 or p[i+2:end].startswith('Is'):
+        return None, i
+      return '\\'+p[i:end+1], end+1
+    if c in classes:
+      return classes[c], i+1
+    if c and c in 'nrt\\|.-^?*+{}()[]':
+      return '\\'+c, i+1
+    return None, i
+  def charClass(i):
+    res = '['
+    if p[i:i+1] == '^':
+      res += '^'
+      i += 1
+    exclude = None
+    while i < len(p) and (p[i] != ']' or res in ('[', '[^')):
+      c = p[i]
+      if c == '-' and p[i+1:i+2] == '[':
+        exclude, i = charClass(i+2)
+        if exclude is None or p[i:i+1] != ']':
+          return None, i
+        break
+      elif c == '\\':
+        x, i = escape(i+1, xsd_class_escapes)
+        if x is None:
+          return None, i
+        res += x
+      elif c == '[':
+        return None, i
+      else:
+        res += '\\/' if c == '/' else c
+        i += 1
+    if p[i:i+1] != ']':
+      return None, i
+    res += ']'
+    if exclude:
+      res = '(?:(?!'+exclude+')'+res+')'
+    return res, i+1
+  res = ''
+  i = 0
+  while i < len(p):
+    c = p[i]
+    if c == '\\':
+      x, i = escape(i+1, xsd_escapes)
+    elif c == '[':
+      x, i = charClass(i+1)
+    else:
+      x = {'.': '[^\\n\\r]', '^': '\\^', '$': '\\$', '/': '\\/'}.get(c, c)
+      i += 1
+    if x is None:
+      return None
+    res += x
+  return res
+
+def phpNumber(x):
+  if isinstance(x, bool):
+    return None
+  if isinstance(x, int):
+    return str(x)
+  try:
+    x = float(x)
+  except (TypeError, ValueError):
+    return None
+  return repr(x) if math.isfinite(x) else None
+
 def cleanlist(l):
   return [x for x in l if x]
 
+def byuri(l):
+  return sorted(l, key=lambda x: str(x.uri))
+
 def split_uri(uri, t=None, rla=False):
   parts = re.split('[/\\\\#?=]+', uri)
   if len(parts) == 1:
@@ -67,18 +212,171 @@ def split_uri(uri, t=None, rla=False):
   parts.insert(0, 'dpa\\pojo')
   return [escape_id(part) for part in parts if part not in ['','.','..']]
 
+# PHP's $a + $b
+def phpUnion(a, b):
+  r = dict(a)
+  for k, v in b.items():
+    r.setdefault(k, v)
+  return r
+
+def withSchemeVariants(m):
+  r = dict(m)
+  for k, v in m.items():
+    for a, b in (('http:', 'https:'), ('https:', 'http:')):
+      if k.startswith(a):
+        r.setdefault(b + k[len(a):], v)
+  return r
+
 def getName(uri):
   p = ''
   if uri and uri[1] == ' ':
     p = uri[:2]
   return p + split_uri(uri)[-1]
 
+# With a manifest, files are only written if their content changed, and the ones which are no longer
+# generated are removed. The manifest also has the flags the files were generated with. If they
+# changed, everything in pojo/ that isn't generated anymore goes, not just what the manifest knew of.
+class Output:
+  def __init__(self, manifest=None, flags=None):
+    self.manifest = manifest
+    self.flags = flags or {}
+    self.old = {}
+    self.files = {}
+    self.written = 0
+    self.rebuild = False
+    if manifest:
+      old = None
+      if os.path.isfile(manifest):
+        with open(manifest, 'r') as f:
+          old = json.load(f)
+      if isinstance(old, dict) and old.get('flags') == self.flags and isinstance(old.get('files'), dict):
+        self.old = old['files']
+      else:
+        self.rebuild = True
+  # Whether the file already has the content with this hash. The manifest is only trusted as long as
+  # the size and mtime of the file are still what they were, so files changed by hand are rewritten.
+  def unchanged(self, path, h):
+    try:
+      st = os.stat(path)
+    except OSError:
+      return False
+    old = self.old.get(path)
+    if old and old[1:] == [st.st_size, st.st_mtime_ns]:
+      same = old[0] == h
+    else:
+      with open(path, 'rb') as f:
+        same = hashlib.sha256(f.read()).hexdigest() == h
+    if same:
+      self.files[path] = [h, st.st_size, st.st_mtime_ns]
+    return same
+  def replace(self, tmp, path, h):
+    os.replace(tmp, path)
+    st = os.stat(path)
+    self.files[path] = [h, st.st_size, st.st_mtime_ns]
+    self.written += 1
+  def write(self, path, content):
+    if not isinstance(content, str):
+      return self.write_chunks(path, content)
+    data = content.encode()
+    h = hashlib.sha256(data).hexdigest()
+    if self.manifest and self.unchanged(path, h):
+      return
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+      f.write(data)
+    self.replace(path + '.tmp', path, h)
+  # Same as write, for the files too big to be built in memory as a whole first
+  def write_chunks(self, path, chunks):
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    with open(path + '.tmp', 'wb') as f:
+      for chunk in chunks:
+        data = chunk.encode()
+        h.update(data)
+        f.write(data)
+    h = h.hexdigest()
+    if self.manifest and self.unchanged(path, h):
+      os.remove(path + '.tmp')
+      return
+    self.replace(path + '.tmp', path, h)
+  def finish(self):
+    if not self.manifest:
+      return
+    stale = self.old.keys()
+    if self.rebuild:
+      stale = {str(f) for f in Path('pojo').rglob('*') if f.is_file()}
+    removed = 0
+    for path in sorted(stale - self.files.keys()):
+      if os.path.isfile(path):
+        os.unlink(path)
+        removed += 1
+      d = os.path.dirname(path)
+      while d and os.path.isdir(d) and not os.listdir(d):
+        os.rmdir(d)
+        d = os.path.dirname(d)
+    Path(os.path.dirname(self.manifest)).mkdir(parents=True, exist_ok=True)
+    with open(self.manifest + '.tmp', 'w') as f:
+      json.dump({'flags': self.flags, 'files': dict(sorted(self.files.items()))}, f, indent=0)
+    os.replace(self.manifest + '.tmp', self.manifest)
+    print(f"{self.written} files written, {len(self.files)-self.written} unchanged, {removed} removed")
+
+class Stats:
+  def __init__(self):
+    self.start = self.last = time.perf_counter()
+    self.phases = {}
+    self.counts = {}
+  def phase(self, name):
+    now = time.perf_counter()
+    self.phases[name] = self.phases.get(name, 0) + now - self.last
+    self.last = now
+  # In KiB, of this process or of the biggest worker
+  def peak_memory(self):
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+  def report(self, file=sys.stderr):
+    for name, n in self.counts.items():
+      print(f'{name:>12}: {n}', file=file)
+    for name, t in self.phases.items():
+      print(f'{name:>12}: {t:.3f}s', file=file)
+    print(f'{"total":>12}: {self.last-self.start:.3f}s', file=file)
+    print(f'{"peak memory":>12}: {self.peak_memory()/1024:.1f}MiB', file=file)
+
+# Subject and predicate/object index over all triples. Iterates in insertion order,
+# like the rdflib memory store, but without its per triple context bookkeeping.
+class Index:
+  def __init__(self):
+    self.spo = {}
+    self.pos = {}
+  def add(self, t):
+    s, p, o = t
+    self.spo.setdefault(s, {}).setdefault(p, {})[o] = None
+    self.pos.setdefault(p, {}).setdefault(o, {})[s] = None
+  def triples(self, t):
+    s, p, o = t
+    if s is None:
+      for s in self.pos.get(p, {}).get(o, ()):
+        yield (s, p, o)
+    elif p is None:
+      for p, os in self.spo.get(s, {}).items():
+        for o in os:
+          yield (s, p, o)
+    else:
+      for o in self.spo.get(s, {}).get(p, ()):
+        yield (s, p, o)
+  def subjects(self, p, o):
+    return self.pos.get(p, {}).get(o, {}).keys()
+
 class Registry:
-  def __init__(self, g):
-    self.g = g
+  def __init__(self, index, output):
+    self.index = index
+    self.output = output
     self.context = {}
     self.classes = {}
     self.property = {}
+    self.subclasses = None
+    self.iri_ids = None
+    self.previous_ids = {}
+    self.previous_schema = None
+    self.pruned = set()
   def getOrCreateClass(self, uri):
     if uri in self.classes:
       return self.classes[uri]
@@ -98,26 +396,258 @@ class Registry:
     c = Context(self, uri)
     self.context[uri] = c
     return c
-  def serialize_php(self):
-    for v in self.classes.values():
-      v.serialize_php()
-    for v in self.context.values():
-      v.serialize_php()
+  # The triples are only needed to build the model. Once it's built, they can go,
+  # and the forked workers don't get a copy of them either.
+  def release(self):
+    self.index = None
+    for x in chain(self.context.values(), self.classes.values(), self.property.values()):
+      x.index = None
+  # Drops everything which can't be reached from the root types and contexts. A class
+  # reaches its parents, the properties with it as domain, and their ranges. A context
+  # reaches the contexts it imports and the classes and properties in it.
+  def prune(self, roots):
+    roots = {URIRef(x) for x in roots}
+    unknown = roots - self.classes.keys() - self.context.keys()
+    if unknown:
+      raise ValueError('unknown root types or contexts: ' + ', '.join(sorted(unknown)))
+    # The terms of a context are only all kept if it's a root, or imported by one. Any other context
+    # is kept for the terms that need it, but doesn't pull in the rest of its terms.
+    contexts = set()
+    expanded = set()
+    classes = set()
+    properties = set()
+    todo = [(x, True) for x in roots]
+    # What columns without a type get, see Property.sqlPropInfos
+    todo.append((URIRef('http://dpa.li/ns/owl/fixes/types#JSON'), False))
+    while todo:
+      x, expand = todo.pop()
+      if x in self.context:
+        if x in expanded or (x in contexts and not expand):
+          continue
+        contexts.add(x)
+        todo += [(i, expand) for i in self.context[x].imports]
+        if expand:
+          expanded.add(x)
+          todo += [(c.uri, False) for c in self.classes.values() if x in c.context]
+          todo += [(p.uri, False) for p in set(self.property.values()) if x in p.context]
+      elif x in self.classes:
+        c = self.classes[x]
+        if c in classes:
+          continue
+        classes.add(c)
+        todo += [(y, False) for y in c.context]
+        todo += [(p.uri, False) for p in c.implements]
+        todo += [(p.uri, False) for p in c.property.values()]
+      elif x in self.property:
+        p = self.property[x]
+        if p in properties:
+          continue
+        properties.add(p)
+        todo += [(y, False) for y in p.context]
+        if p.type:
+          todo.append((p.type.uri, False))
+    self.pruned = {
+      'contexts': sorted(str(x) for x in self.context.keys() - contexts),
+      'classes': sorted(str(x) for x, c in self.classes.items() if c not in classes and ':' in x),
+      'properties': sorted({str(p.uri) for p in self.property.values() if p not in properties}),
+    }
+    self.context = {k: v for k, v in self.context.items() if k in contexts}
+    self.classes = {k: v for k, v in self.classes.items() if v in classes}
+    self.property = {k: v for k, v in self.property.items() if v in properties}
+  # Called once all classes and properties are known. From here on, the type
+  # hierarchy is fixed, and the classes memoize what is derived from it.
+  def resolve(self):
+    self.subclasses = {}
+    for c in byuri(self.classes.values()):
+      for parent in c.implements:
+        self.subclasses.setdefault(parent, []).append(c)
+  # The id of a vocabulary IRI only depends on the IRI, unless it collides with another
+  # one, in which case the next free one is taken, in IRI order. 1 is the `id` row.
+  def getIRIIds(self):
+    if self.iri_ids is None:
+      # The ids given out before never move, only new IRIs get one. Those of IRIs which
+      # are gone stay taken, the id table still has them.
+      self.iri_ids = {}
+      used = {1: 'id'}
+      for iri, n in sorted(self.previous_ids.items()):
+        if n in used:
+          raise ValueError(f'<{iri}> and <{used[n]}> both have id {n}')
+        used[n] = iri
+      iris = sorted({str(x) for x in chain(self.classes.keys(), self.property.keys()) if ':' in x})
+      for iri in iris:
+        if iri in self.previous_ids:
+          self.iri_ids[iri] = self.previous_ids[iri]
+          continue
+        n = int.from_bytes(hashlib.sha256(iri.encode()).digest()[:8], 'big') % (iri_id_range - 2) + 2
+        while n in used:
+          n = n + 1 if n + 1 < iri_id_range else 2
+        used[n] = iri
+        self.iri_ids[iri] = n
+    return self.iri_ids
+  # Those of a database win over those in iri_ids_file, they can't be changed there anymore
+  def addPreviousIds(self, ids, source):
+    for iri, n in sorted(ids.items()):
+      if self.previous_ids.get(iri, n) != n:
+        print(f"<{iri}> has id {n} in {source}, not {self.previous_ids[iri]} as in {iri_ids_file}", file=sys.stderr)
+      self.previous_ids[iri] = n
+  def saveIRIIds(self):
+    content = json.dumps({**self.previous_ids, **self.getIRIIds()}, indent=0, sort_keys=True) + '\n'
+    if os.path.exists(iri_ids_file):
+      with open(iri_ids_file, 'r') as f:
+        if f.read() == content:
+          return
+    with open(iri_ids_file + '.tmp', 'w') as f:
+      f.write(content)
+    os.replace(iri_ids_file + '.tmp', iri_ids_file)
+  def serialize_php(self, jobs=1):
+    items = byuri(self.classes.values()) + [*self.context.values()]
+    if jobs > 1:
+      results = parallel_map(genPHP, items, jobs)
+    else:
+      results = map(genPHP, items)
+    classmap = {}
+    types = {}
+    contexts = {}
+    for v, s in zip(items, results):
+      if s is not None:
+        self.output.write(v.getAbsPath(), s)
+        for name in v.getPHPClassNames():
+          classmap[name] = v.getAbsPath()
+        if isinstance(v, Context):
+          contexts[str(v.uri)] = '\\' + v.getAbsNS() + '\\__module__'
+        elif ':' in v.uri:
+          types[str(v.uri)] = v.getAbsNS('C')
+    self.serialize_php_classmap(classmap)
+    self.serialize_php_iri_lookup(types, contexts, self.getIRIIds())
+  def serialize_php_classmap(self, classmap):
+    s = ['<?php\n\n', 'declare(strict_types = 1);\n\n', 'return [\n']
+    for name, path in sorted(classmap.items()):
+      s.append('  ' + json.dumps(name) + ' => ' + json.dumps(path) + ',\n')
+    s.append('];\n')
+    self.output.write('pojo/__classmap__.inc.php', ''.join(s))
+    self.output.write('pojo/__preload__.php', '''\
+<?php
+
+// Use this file as opcache.preload script to load all generated classes on startup
+
+declare(strict_types = 1);
+require_once __DIR__ . '/../lib/loader.inc.php';
+
+foreach(array_unique(require __DIR__ . '/__classmap__.inc.php') as $file)
+  require_once \\dpa\\BASE . '/' . $file;
+''')
+  # For \dpa\jsonld\f::lookup_type_by_iri and f::lookup_context. Both ignore the
+  # scheme when deriving the class name, so http and https IRIs map to the same class.
+  def serialize_php_iri_lookup(self, types, contexts, ids):
+    s = ['<?php\n\n', 'declare(strict_types = 1);\n\n', 'return [\n']
+    for key, table in (('TYPES', types), ('CONTEXTS', contexts), ('IDS', ids)):
+      s.append('  ' + json.dumps(key) + ' => [\n')
+      for iri, name in sorted(withSchemeVariants(table).items()):
+        s.append('    ' + json.dumps(iri) + ' => ' + json.dumps(name) + ',\n')
+      s.append('  ],\n')
+    s.append('];\n')
+    self.output.write('pojo/__iri__.inc.php', ''.join(s))
   def serialize_mysql(self):
     s = ['']
     with open("base.sql",'r') as f:
       s[0] += f.read()
-    with open("pojo/schema.sql", 'w') as f:
-      for v in self.classes.values():
-        i=0
-        for l in v.serialize_mysql():
-          if i >= len(s):
-            s.append('')
-          s[i] += l
-          i += 1
-      print('\n'.join(s), file=f)
+    if sql_partition:
+      s[0] += sql_partition_version
+    s[0] += self.serialize_mysql_iri_ids(self.getIRIIds())
+    model = {'ids': self.getIRIIds(), 'tables': {}, 'triggers': {}, 'views': {}}
+    for v in byuri(self.classes.values()):
+      i=0
+      for l in v.serialize_mysql(model):
+        if i >= len(s):
+          s.append('')
+        s[i] += l
+        i += 1
+    if sql_partition:
+      # Tables of an unpartitioned schema reference version, so they go first
+      for t in sorted(filter(None, (c.getSQLTable() for c in self.classes.values()))):
+        s[0] += f'CALL `partition table`({escapeSQLstr(sqlName(t))});\n'
+      s[0] += "CALL `partition table`('version');\n\n"
+      s.append(self.serialize_mysql_retention())
+    self.output.write("pojo/schema.sql", (x for segment in s for x in (segment, '\n')))
+    self.output.write("pojo/schema.json", chain(json.JSONEncoder(indent=1, sort_keys=True).iterencode(model), ["\n"]))
+    if self.previous_schema is not None:
+      self.output.write("pojo/migration.sql", self.serialize_mysql_migration(self.previous_schema, model))
+    self.output.write("pojo/bulk.sql", (v.serialize_mysql_bulk() for v in byuri(self.classes.values())))
+    self.saveIRIIds()
+  # Rows which are already there as they are are left out. Any other row with the same id
+  # or IRI makes the INSERT fail, instead of the PHP code and the database disagreeing.
+  def serialize_mysql_iri_ids(self, ids):
+    s = 'CREATE TEMPORARY TABLE `iri ids` (`id` INT NOT NULL PRIMARY KEY, `uri` VARCHAR(512) NOT NULL UNIQUE);\n'
+    s += 'INSERT INTO `iri ids` (`id`,`uri`) VALUES\n'
+    s += ',\n'.join(f'  ({n}, {escapeSQLstr(iri)})' for iri, n in sorted(ids.items()))
+    s += ';\n'
+    s += 'INSERT INTO `id` (`id`,`uri`)\n'
+    s += '  SELECT `n`.`id`, `n`.`uri` FROM `iri ids` AS `n`\n'
+    s += '  WHERE NOT EXISTS (SELECT 1 FROM `id` WHERE `id`.`id` = `n`.`id` AND `id`.`uri` = `n`.`uri`);\n'
+    s += 'DROP TEMPORARY TABLE `iri ids`;\n'
+    s += f'ALTER TABLE `id` AUTO_INCREMENT = {iri_id_range};\n\n'
+    return s
+  # Only what changed between two pojo/schema.json. Tables and columns which are gone are
+  # left alone, there may still be data in them.
+  def serialize_mysql_migration(self, old, new):
+    s = ['', '', '', '']
+    ids = {iri: n for iri, n in new['ids'].items() if iri not in old.get('ids', {})}
+    if ids:
+      s[0] += self.serialize_mysql_iri_ids(ids)
+    for table, t in new['tables'].items():
+      o = old['tables'].get(table)
+      if not o:
+        s[0] += t['create']
+        if t['constraints']:
+          s[1] += f'ALTER TABLE {table}\n' + ',\n'.join('  ADD '+c for c in t['constraints']) + '\n;\n\n'
+        continue
+      changes = []
+      for name, d in t['columns'].items():
+        if name not in o['columns']:
+          changes.append('ADD COLUMN '+d)
+        elif d != o['columns'][name]:
+          changes.append('MODIFY COLUMN '+d)
+      for name, d in t['indexes'].items():
+        if name not in o['indexes']:
+          changes.append('ADD '+d)
+        elif d != o['indexes'][name]:
+          changes += ['DROP INDEX '+name, 'ADD '+d]
+      if changes:
+        s[0] += f'ALTER TABLE {table}\n' + ',\n'.join('  '+c for c in changes) + '\n;\n\n'
+      constraints = [c for c in t['constraints'] if c not in o['constraints']]
+      if constraints:
+        s[1] += f'ALTER TABLE {table}\n' + ',\n'.join('  ADD '+c for c in constraints) + '\n;\n\n'
+    for i, kind in ((2, 'triggers'), (3, 'views')):
+      for name, d in new[kind].items():
+        if old[kind].get(name) != d:
+          s[i] += d
+      for name in old[kind].keys() - new[kind].keys():
+        s[i] += f'DROP {kind[:-1].upper()} IF EXISTS {name};\n\n'
+    return ''.join(s)
+  def serialize_mysql_retention(self):
+    tables = ['version'] + [sqlName(t) for t in sorted(filter(None, (c.getSQLTable() for c in self.classes.values())))]
+    return sql_partition_procedures + '''\
+DROP PROCEDURE IF EXISTS `retention`;
+DELIMITER //
+CREATE PROCEDURE `retention`(IN keep_months INT, IN ahead_months INT)
+BEGIN
+  DECLARE cutoff DATE DEFAULT DATE_FORMAT(CURDATE() - INTERVAL keep_months MONTH, '%Y-%m-01');
+  DECLARE upto DATE DEFAULT CURDATE() + INTERVAL ahead_months MONTH;
+''' + ''.join(f'''\
+  CALL `partition prune`({escapeSQLstr(t)}, cutoff);
+  CALL `partition split`({escapeSQLstr(t)}, upto);
+''' for t in tables) + '''\
+END //
+DELIMITER ;
+'''
   def info(self):
     in_ontology = {str(x) for x in chain(self.classes.keys(), self.property.keys()) if ':' in x}
+    if self.pruned:
+      for kind, l in self.pruned.items():
+        print(f"Pruned {len(l)} {kind}")
+        for x in l:
+          print('  '+x)
+      in_ontology |= set(self.pruned['classes']) | set(self.pruned['properties'])
     for context in self.context.values():
       print(f"Checking for context entries not in any ontology in context <{context.uri}>")
       for iri in sorted(set(context.fldmap.values())):
@@ -145,13 +675,15 @@ class Registry:
           print('  '+x)
 
 class Context:
+  __slots__ = ('registry', 'index', 'uri', 'ldmap', 'fldmap', 'ldext', 'imports')
   def __init__(self, registry, uri):
     self.registry = registry
-    self.g = registry.g
+    self.index = registry.index
     self.uri = uri
     self.ldmap = {}
     self.fldmap = {}
     self.ldext = {}
+    self.imports = set()
     with open('download/context/'+self.uri,'r') as f:
       context = json.load(f)['@context']
       if not isinstance(context, list):
@@ -159,6 +691,7 @@ class Context:
       for ctx in context:
         if isinstance(ctx, str):
           mc = self.registry.getOrCreateContext(ctx)
+          self.imports.add(mc.uri)
           self.ldmap = {**self.ldmap, **mc.ldmap}
         if not isinstance(ctx, dict):
           continue
@@ -170,8 +703,8 @@ class Context:
     self.fldmap = self.ldmap
     for k,v in self.fldmap.items():
       self.fldmap[k] = self.expand(v)
-    for s, p, o in self.g['*'].triples((self.uri, URIRef('http://dpa.li/ns/owl/fixes/meta#ldmap'), None)):
-      for s, p, o in self.g['*'].triples((o, None, None)):
+    for s, p, o in self.index.triples((self.uri, URIRef('http://dpa.li/ns/owl/fixes/meta#ldmap'), None)):
+      for s, p, o in self.index.triples((o, None, None)):
         self.ldext[p] = o
   def expand(self, key):
     while True:
@@ -186,6 +719,33 @@ class Context:
         continue
       break
     return key
+  # Same as ContextHelper::expand, except that it gives up on cycles
+  @staticmethod
+  def expandIn(key, mappings):
+    seen = set()
+    while key not in seen:
+      seen.add(key)
+      if key in mappings:
+        key = mappings[key]
+        continue
+      x = [*key.split(':',1),None]
+      if x[1] is not None and x[0] in mappings:
+        key = mappings[x[0]] + x[1]
+        continue
+      break
+    return key
+  # The lookup tables ContextHelper would build from MAPPING and MAPPING_EXT if only this context is loaded
+  def genTables(self, mapping, mapping_ext):
+    mapping_ext = {**mapping, **mapping_ext}
+    mappings = phpUnion(mapping, mapping_ext)
+    mapping = {k: self.expandIn(v, mappings) for k, v in mapping.items()}
+    mappings = phpUnion(mapping, mapping_ext)
+    expanded = {k: self.expandIn(k, mappings) for k in mappings}
+    reverse = {}
+    for k, v in mappings.items():
+      reverse.setdefault(v, k)
+    lengths = sorted({len(v.encode()) for v in mappings.values() if v}, reverse=True)
+    return expanded, reverse, lengths
   def getAbsNS(self):
     return '\\'.join(split_uri(self.uri))
   def getDirPath(self):
@@ -194,19 +754,21 @@ class Context:
     return '/'.join(u)
   def getAbsPath(self):
     return self.getDirPath() + '/__module__.inc.php'
-  def serialize_php(self):
+  def getPHPClassNames(self):
+    return [self.getAbsNS() + '\\__module__']
+  def genPHP(self):
     ldext_c = {}
     ldext_p = {}
     ldext_a = {}
-    for cls in self.registry.classes.values():
+    for cls in byuri(self.registry.classes.values()):
       if self.uri not in cls.context:
         continue
       ldext_c[cls.getName()] = cls.uri
-    for prop in self.registry.property.values():
+    for prop in byuri(set(self.registry.property.values())):
       if self.uri not in prop.context:
         continue
       ldext_p[prop.getName()] = prop.uri
-      for uri in prop.uris:
+      for uri in sorted(prop.uris, key=str):
         uname = getName(uri)
         ldext_p[uname] = prop.uri
         ldext_a[uri] = prop.uri
@@ -216,7 +778,7 @@ class Context:
       + sorted(ldext_a.items())
     )
     ldext = dict((k,v) for k,v in ldext.items() if str(k) != str(v) and k not in self.ldmap)
-    s = """\
+    s = ["""\
 <?php
 
 declare(strict_types = 1);
@@ -225,43 +787,137 @@ namespace """+self.getAbsNS()+""";
 class __module__ {
   const META = [
     "CONTEXT" => """+json.dumps(self.uri)+""",
-"""
-    s += """\
     "MAPPING" => [
-"""
+"""]
     for prefix, value in self.ldmap.items():
-      s += '      ' + json.dumps(prefix) + " => " + json.dumps(value) + ',\n'
-    s += """\
+      s.append('      ' + json.dumps(prefix) + " => " + json.dumps(value) + ',\n')
+    s.append("""\
     ],
     "MAPPING_EXT" => [
-"""
+""")
     for prefix, value in chain(self.ldext.items(), ldext.items()):
-      s += '      ' + json.dumps(prefix) + " => " + json.dumps(value) + ',\n'
-    s += """\
-    ]
+      s.append('      ' + json.dumps(prefix) + " => " + json.dumps(value) + ',\n')
+    expanded, reverse, lengths = self.genTables(
+      {str(k): str(v) for k, v in self.ldmap.items()},
+      {str(k): str(v) for k, v in chain(self.ldext.items(), ldext.items())}
+    )
+    s.append("""\
+    ],
+    "EXPANDED" => [
+""")
+    for key, value in expanded.items():
+      s.append('      ' + json.dumps(key) + " => " + json.dumps(value) + ',\n')
+    s.append("""\
+    ],
+    "REVERSE" => [
+""")
+    for value, key in reverse.items():
+      s.append('      ' + json.dumps(value) + " => " + json.dumps(key) + ',\n')
+    s.append("""\
+    ],
+    "PREFIX_LENGTHS" => """+json.dumps(lengths)+""",
   ];
 }
-"""
-    Path(self.getDirPath()).mkdir(parents=True, exist_ok=True)
-    with open(self.getAbsPath(), 'w') as f:
-      print(s, file=f)
 
-def getRdfObjectList(g, first):
+""")
+    return ''.join(s)
+
+sql_partition_clause = '''
+PARTITION BY RANGE COLUMNS(`created`) (
+  PARTITION `p_max` VALUES LESS THAN (MAXVALUE)
+)'''
+
+# Partitioned tables can't have foreign keys. The ones of version are replaced by a trigger, the
+# type and reference ones aren't enforced anymore. Tables which are already partitioned are left
+# alone, so applying the schema again keeps their monthly partitions.
+sql_partition_version = '''
+DROP PROCEDURE IF EXISTS `partition table`;
+DELIMITER //
+CREATE PROCEDURE `partition table`(IN tbl VARCHAR(64))
+BEGIN
+  DECLARE fks TEXT;
+  IF NOT EXISTS (SELECT 1 FROM `information_schema`.`PARTITIONS`
+      WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = tbl AND `PARTITION_NAME` IS NOT NULL) THEN
+    SELECT GROUP_CONCAT('DROP FOREIGN KEY `', REPLACE(`CONSTRAINT_NAME`, '`', '``'), '`') INTO fks
+      FROM `information_schema`.`TABLE_CONSTRAINTS`
+      WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = tbl AND `CONSTRAINT_TYPE` = 'FOREIGN KEY';
+    IF fks IS NOT NULL THEN
+      SET @sql = CONCAT('ALTER TABLE `', REPLACE(tbl, '`', '``'), '` ', fks);
+      PREPARE stmt FROM @sql;
+      EXECUTE stmt;
+      DEALLOCATE PREPARE stmt;
+    END IF;
+    SET @sql = CONCAT('ALTER TABLE `', REPLACE(tbl, '`', '``'), '`', ''' + escapeSQLstr(sql_partition_clause) + ''');
+    PREPARE stmt FROM @sql;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END //
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS `c version`;
+CREATE TRIGGER `c version` AFTER DELETE ON `id`
+  FOR EACH ROW DELETE FROM `version` WHERE `id` = old.`id`;
+
+'''
+
+# All tables get the same monthly partitions, p<yyyymm> holding everything before the next month.
+# Dropping them doesn't run any triggers, so retention has to prune all tables alike.
+sql_partition_procedures = '''\
+DROP PROCEDURE IF EXISTS `partition split`;
+DELIMITER //
+CREATE PROCEDURE `partition split`(IN tbl VARCHAR(64), IN upto DATE)
+BEGIN
+  DECLARE bound DATE;
+  SELECT MAX(STR_TO_DATE(TRIM(BOTH '\\'' FROM `PARTITION_DESCRIPTION`), '%Y-%m-%d %H:%i:%s')) + INTERVAL 1 MONTH INTO bound
+    FROM `information_schema`.`PARTITIONS`
+    WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = tbl AND `PARTITION_NAME` <> 'p_max';
+  SET bound = IFNULL(bound, DATE_FORMAT(CURDATE(), '%Y-%m-01') + INTERVAL 1 MONTH);
+  WHILE bound <= upto + INTERVAL 1 MONTH DO
+    SET @sql = CONCAT('ALTER TABLE `', REPLACE(tbl, '`', '``'), '` REORGANIZE PARTITION `p_max` INTO (',
+      'PARTITION `p', DATE_FORMAT(bound - INTERVAL 1 MONTH, '%Y%m'), '` VALUES LESS THAN (\\'', bound, '\\'), ',
+      'PARTITION `p_max` VALUES LESS THAN (MAXVALUE))');
+    PREPARE stmt FROM @sql;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+    SET bound = bound + INTERVAL 1 MONTH;
+  END WHILE;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS `partition prune`;
+DELIMITER //
+CREATE PROCEDURE `partition prune`(IN tbl VARCHAR(64), IN cutoff DATE)
+BEGIN
+  DECLARE names TEXT;
+  SELECT GROUP_CONCAT('`', `PARTITION_NAME`, '`') INTO names
+    FROM `information_schema`.`PARTITIONS`
+    WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = tbl AND `PARTITION_NAME` <> 'p_max'
+      AND STR_TO_DATE(TRIM(BOTH '\\'' FROM `PARTITION_DESCRIPTION`), '%Y-%m-%d %H:%i:%s') <= cutoff;
+  IF names IS NOT NULL THEN
+    SET @sql = CONCAT('ALTER TABLE `', REPLACE(tbl, '`', '``'), '` DROP PARTITION ', names);
+    PREPARE stmt FROM @sql;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END //
+DELIMITER ;
+
+'''
+
+def getRdfObjectList(index, first):
   n = first
-  while n and n != URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#nil'):
-    c = n
+  while n and n != rdf_nil:
+    po = index.spo.get(n, {})
+    yield from po.get(rdf_first, ())
     n = None
-    for s, p, o in g['*'].triples((c, None, None)):
-      if p == URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#rest'):
-        n = o
-      elif p == URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#first'):
-        yield o
+    for n in po.get(rdf_rest, ()):
+      pass
 
 class Class:
+  __slots__ = ('index', 'kind', 'context', 'registry', 'uri', 'comment', 'implements', 'property', 'label', 'restrictions', 'memo')
   def __init__(self, registry, uri):
-    Class.i += 1
-    self.i = Class.i
-    self.g = registry.g
+    self.index = registry.index
     self.kind = 'unknown'
     self.context = set()
     self.registry = registry
@@ -270,34 +926,36 @@ class Class:
     self.implements = set()
     self.property = {}
     self.label = None
+    self.restrictions = []
+    self.memo = {}
     if str(self.uri) in native_types:
       self.kind = 'class'
   def addProperty(self, iri, property):
     self.property[iri] = property
   def setMeta(self, key, value):
     if   key == URIRef('http://www.w3.org/2000/01/rdf-schema#label'):
-      self.label = value
+      self.label = str(value)
     elif key == URIRef('http://www.w3.org/2000/01/rdf-schema#comment'):
-      self.comment.append(value)
+      self.comment.append(str(value))
     elif key == dpa_context:
       self.context.add(value)
     elif key == URIRef('http://www.w3.org/2000/01/rdf-schema#subClassOf'):
       self.implements.add(self.registry.getOrCreateClass(value))
     elif key == URIRef('http://www.w3.org/2002/07/owl#unionOf'):
       self.kind = 'union'
-      for t in getRdfObjectList(self.g, value):
+      for t in getRdfObjectList(self.index, value):
         self.implements.add(self.registry.getOrCreateClass(t))
     elif key == URIRef('http://www.w3.org/2002/07/owl#intersectionOf'):
       self.kind = 'intersection'
-      for t in getRdfObjectList(self.g, value):
+      for t in getRdfObjectList(self.index, value):
         self.implements.add(self.registry.getOrCreateClass(t))
     elif key == URIRef('http://www.w3.org/2002/07/owl#complementOf'):
       self.kind = 'complement'
-      for t in getRdfObjectList(self.g, value):
+      for t in getRdfObjectList(self.index, value):
         self.implements.add(self.registry.getOrCreateClass(t))
     elif key == URIRef('http://www.w3.org/2002/07/owl#complementOf'):
       self.kind = 'complement'
-      for t in getRdfObjectList(self.g, value):
+      for t in getRdfObjectList(self.index, value):
         self.implements.add(self.registry.getOrCreateClass(t))
     elif key == 'kind':
       if self.kind == 'unknown':
@@ -307,7 +965,17 @@ class Class:
     elif key == owl_onDatatype:
       self.kind = 'datatype'
       self.implements.add(self.registry.getOrCreateClass(value))
-      # TODO: Deal with constraints
+    elif key == owl_withRestrictions:
+      for r in getRdfObjectList(self.index, value):
+        for _, facet, v in self.index.triples((r, None, None)):
+          facet = str(facet).removeprefix(xsd_ns)
+          if facet not in supported_facets:
+            print(f"unsupported facet <{facet}> of datatype <{self.uri}>", file=sys.stderr)
+            continue
+          if facet == 'pattern' and xsdPatternToPCRE(str(v)) is None:
+            print(f"unsupported pattern {json.dumps(str(v))} of datatype <{self.uri}>", file=sys.stderr)
+            continue
+          self.restrictions.append((facet, v.toPython() if isinstance(v, Literal) else v))
   def getAbsNS(self, t='I'):
     if t == 'I' and str(self.uri) in native_types and native_types[str(self.uri)][0]:
       return native_types[str(self.uri)][0]
@@ -331,7 +999,7 @@ class Class:
     return p+' ' + str(self.uri)
   def getModifiers(self):
     res = set()
-    for t in self.getConstituents({'direct'}):
+    for t in byuri(self.getConstituents({'direct'})):
       if str(t.uri) in native_types and native_types[str(t.uri)][1]:
         res.add((t.getAbsNS('I'), native_types[str(t.uri)][1]))
     return res
@@ -345,7 +1013,22 @@ class Class:
     u = split_uri(self.uri)
     u[0] = 'pojo'
     return '/'.join(u) + '.inc.php'
+  # The classes the autoloader may look for in the file. For overridden types, the
+  # file loads the override, which is expected to define the I_ and C_ classes.
+  def getPHPClassNames(self):
+    nt = native_types.get(str(self.uri)) or [None, None, None, None]
+    prefixes = ['I', 'C']
+    if nt[2]:
+      prefixes += ['D', 'A']
+    if self.getPHPTraitProperties():
+      prefixes += ['T']
+    return [self.getAbsNS(None) + '\\' + p + '_' + self.getName() for p in prefixes]
   def getConstituents(self, flags=set(), rec=None):
+    if rec is None and self.registry.subclasses is not None:
+      key = ('constituents', frozenset(flags))
+      if key not in self.memo:
+        self.memo[key] = self.getConstituents(flags, set())
+      return set(self.memo[key])
     if rec is None:
       rec = set()
     res = set()
@@ -360,13 +1043,33 @@ class Class:
       for t in self.implements:
         res |= t.getConstituents(flags - {'derived'}, rec=rec)
     if 'derived' in flags:
-      newres = set()
-      for c in self.registry.classes.values():
-        for t in res:
-          if t in c.implements and c not in res:
-            newres |= c.getConstituents(flags, rec=rec)
-      res |= newres
+      for t in [*res]:
+        for c in t.getDescendants():
+          if c not in res:
+            res |= c.getConstituents(flags - {'derived'}, rec=rec)
     return res
+  def getAncestors(self):
+    if 'ancestors' in self.memo:
+      return self.memo['ancestors'].keys()
+    res = {}
+    for parent in byuri(self.implements):
+      if parent is not self:
+        res[parent] = None
+        res |= dict.fromkeys(parent.getAncestors())
+    if self.registry.subclasses is not None:
+      self.memo['ancestors'] = res
+    return res.keys()
+  def getDescendants(self):
+    if 'descendants' not in self.memo:
+      res = {}
+      todo = [self]
+      while todo:
+        for c in self.registry.subclasses.get(todo.pop(), ()):
+          if c not in res and c is not self:
+            res[c] = None
+            todo.append(c)
+      self.memo['descendants'] = res
+    return self.memo['descendants'].keys()
   def getInstTypes(self):
     res = set()
     if   self.kind == 'class':
@@ -379,122 +1082,296 @@ class Class:
   def genTypeConstraint(self, flags):
     parts = set(t.getAbsNS('I') for t in self.getConstituents(flags))
     return parts
-  def serialize_php(self):
+  # The direct constituents, each with the facets of all the datatypes they were restricted by
+  def getRestrictions(self, outer=[], rec=None):
+    if rec is None:
+      rec = set()
+    if self in rec:
+      return []
+    rec.add(self)
+    if self.kind == 'class':
+      return [(self, [*xsd_facets.get(str(self.uri), {}).items(), *outer])]
+    if self.kind == 'datatype':
+      outer = [*self.restrictions, *outer]
+    elif self.kind != 'union':
+      return []
+    return [x for t in byuri(self.implements) for x in t.getRestrictions(outer, rec)]
+  # The PHP condition under which a value of this type meets the facet, if it can be checked
+  def genPHPFacet(self, facet, value):
+    nt = native_types.get(str(self.uri)) or [None, None, None, None]
+    if facet in {'minInclusive', 'maxInclusive', 'minExclusive', 'maxExclusive'}:
+      value = phpNumber(value)
+      if nt[0] not in {'int', 'float'} or value is None:
+        return None
+      op = {'minInclusive': '>=', 'maxInclusive': '<=', 'minExclusive': '>', 'maxExclusive': '<'}[facet]
+      return '$v '+op+' '+value
+    if nt[0] in {'int', 'float', 'bool'} or not (nt[0] == 'string' or nt[2]):
+      return None
+    sv = '$v' if nt[0] == 'string' else '(string)$v'
+    if facet == 'pattern':
+      return 'preg_match('+phpStr('/^(?:'+xsdPatternToPCRE(str(value))+')$/Du')+', '+sv+')'
+    op = {'length': '==', 'minLength': '>=', 'maxLength': '<='}[facet]
+    return 'mb_strlen('+sv+') '+op+' '+str(int(value))
+  def genPHPTypeTest(self):
+    nt = native_types.get(str(self.uri)) or [None, None, None, None]
+    t = nt[0] or self.getAbsNS('I')
+    return php_type_tests.get(t, '$v instanceof '+t)
+  def genPHP(self):
     extra_context = set()
     for p in self.property.values():
       extra_context |= p.context
     extra_context = sorted(extra_context)
     if self.kind != 'class':
-      return
+      return None
     nt = native_types.get(str(self.uri)) or [None, None, None, None]
     if nt[0] and not nt[2]:
-      return
-    s = '<?php\n\n'
-    s += 'declare(strict_types = 1);\n'
-    s += 'namespace '+self.getAbsNS(None)+';\n\n'
+      return None
+    s = ['<?php\n\n']
+    s.append('declare(strict_types = 1);\n')
+    s.append('namespace '+self.getAbsNS(None)+';\n\n')
     if extra_context:
-      s += f'const EC{self.i} = {json.dumps(extra_context)};\n\n'
+      s.append(f'const EC_{self.getName()} = {json.dumps(extra_context)};\n\n')
     if self.comment:
-      s += '/**\n' + ''.join([f" * {s}\n" for s in wrapper.wrap(text='\n'.join(self.comment))]) + ' */\n'
+      s.append('/**\n' + ''.join([f" * {s}\n" for s in wrapper.wrap(text='\n'.join(self.comment))]) + ' */\n')
     if nt[2]:
-      s += 'interface D_'
+      s.append('interface D_')
     else:
-      s += 'interface I_'
-    s += self.getName()+' extends \\dpa\\jsonld\\POJO'
+      s.append('interface I_')
+    s.append(self.getName()+' extends \\dpa\\jsonld\\POJO')
     if len(self.implements):
-      s += ', '
-      s += ', '.join([cls.getAbsNS('I') for cls in self.implements])
-    s += ' {\n'
-    s += '  const NS = '+json.dumps(sorted(self.context))+';\n'
-    s += '  const IRI = '+json.dumps(self.uri)+';\n\n'
+      s.append(', ')
+      s.append(', '.join([cls.getAbsNS('I') for cls in byuri(self.implements)]))
+    s.append(' {\n')
+    s.append('  const NS = '+json.dumps(sorted(self.context))+';\n')
+    s.append('  const IRI = '+json.dumps(self.uri)+';\n\n')
     for piri, property in self.property.items():
       pname = getName(piri)
       if property.comment:
-        s += '  /**\n' + ''.join([f"   * {s}\n" for s in wrapper.wrap(text='\n'.join(property.comment))]) + '   */\n'
+        s.append('  /**\n' + ''.join([f"   * {s}\n" for s in wrapper.wrap(text='\n'.join(property.comment))]) + '   */\n')
       t  = property.genTypeConstraint({'direct'})
       tv = property.genTypeConstraint({'varadic'})
       st = property.getType()
       pp = json.dumps(property.uri)
       pp += ',' + json.dumps(st.uri if st else None)
-      pp += ',['+','.join(f'EC{self.i}[{extra_context.index(s)}]' for s in property.context)+']'
-      s += '  #[\\dpa\\jsonld\\Property('+pp+')]\n'
-      s += '  public function get_'+pname+'()'
-      s += ' : ' + t
-      s += ';\n'
-      s += '  public function set_'+pname+'('+tv+' $value) : void;\n'
+      pp += ',['+','.join(f'EC_{self.getName()}[{extra_context.index(s)}]' for s in sorted(property.context))+']'
+      s.append('  #[\\dpa\\jsonld\\Property('+pp+')]\n')
+      s.append('  public function get_'+pname+'()')
+      s.append(' : ' + t)
+      s.append(';\n')
+      s.append('  public function set_'+pname+'('+tv+' $value) : void;\n')
       if property.isArray():
-        s += '  public function add_'+pname+'('+tv+' $value) : void;\n'
-        s += '  public function del_'+pname+'('+tv+' $value) : void;\n'
-      s += '\n'
-    s += '}\n\n'
+        s.append('  public function add_'+pname+'('+tv+' $value) : void;\n')
+        s.append('  public function del_'+pname+'('+tv+' $value) : void;\n')
+      s.append('\n')
+    s.append('}\n\n')
+    if self.getPHPTraitProperties():
+      s.append('trait T_' + self.getName() + ' {\n')
+      s.append(self.genPHPAccessors(self.getPHPTraitProperties().items()))
+      s.append('}\n\n')
     if nt[2]:
-      s += 'abstract class A_' + self.getName() + ' implements D_' + self.getName() + ' {\n'
+      s.append('abstract class A_' + self.getName() + ' implements D_' + self.getName() + ' {\n')
     else:
-      s += 'class C_' + self.getName() + ' implements I_' + self.getName() + ' {\n'
+      s.append('class C_' + self.getName() + ' implements I_' + self.getName() + ' {\n')
+    s.append(self.genPHPIRIMap())
+    s.append(self.genPHPUse())
+    if specialize:
+      s.append(self.genPHPToArray(('string|null|' if nt[2] else '')+'array'))
+      s.append(self.genPHPFromArray())
+    else:
+      s.append("""\
+  public function toArray(\\dpa\\jsonld\\ContextHelper $context=null) : """+('string|null|' if nt[2] else '')+"""array { return \\dpa\\jsonld\\f::toArrayHelper($this,$context); }
+  public function fromArray(array $data, \\dpa\\jsonld\\ContextHelper $context=null) : void { \\dpa\\jsonld\\f::fromArrayHelper($this, $data, $context); }
+""")
+    s.append("""\
+  public function serialize() : ?string { $a=json_encode($this->toArray(),JSON_PRETTY_PRINT|JSON_UNESCAPED_SLASHES); return $a!==false?$a:null; }
+  public function unserialize(string $data) : void { $this->fromArray(json_decode($data,true)); } // @phpstan-ignore-line
+""")
+    s.append('}\n')
+    if nt[2]:
+      s.append('\\dpa\\load(' + json.dumps(nt[2]) + ');')
+    s.append('\n')
+    return ''.join(s)
+  # The private fields and accessors of properties. The same for every class using them,
+  # so they go in a trait of the class declaring the property.
+  def genPHPAccessors(self, properties):
+    s = []
     pvs = set()
-    for piri, property in self.getAllProperties().items():
+    for piri, property in properties:
       pname = getName(piri)
       cname = property.getName()
       t  = property.genTypeConstraint({'direct'})
       tv = property.genTypeConstraint({'varadic'})
       if property not in pvs:
         pvs.add(property)
-        s += '  private '+t+' $var_'+cname
+        s.append('  private '+t+' $var_'+cname)
         if   property.isArray():
-          s += ' = []'
+          s.append(' = []')
         elif property.nullable or not property.type:
-          s += ' = null'
-        s += ';\n'
-      s += '  public function get_'+pname+'()'
-      s += ' : ' + t + ' '
-      s += '{ return $this->var_'+cname+'; }\n'
-      s += '  public function set_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = '
-      types = []
-      m = ''
-      if property.type:
-        types = sorted([*property.type.getInstTypes()])
-        m = json.dumps([*property.type.getModifiers()])
-      ser = json.dumps(types)
+          s.append(' = null')
+        s.append(';\n')
+      s.append('  public function get_'+pname+'()')
+      s.append(' : ' + t + ' ')
+      s.append('{ return $this->var_'+cname+'; }\n')
+      s.append('  public function set_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = ')
+      deser = property.genPHPDeser()
+      if deser and property.isArray():
+        value = 'array_map(self::deser_'+pname+'(...), \\dpa\\jsonld\\f::array_flatten($value))'
+      elif deser:
+        value = 'self::deser_'+pname+'($value)'
+      elif property.isArray():
+        m = json.dumps(sorted(property.type.getModifiers())) if property.type else ''
+        value = '\\dpa\\jsonld\\f::array_flatten($value,[],'+m+')'
+      else:
+        value = '$value'
+      s.append(value + '; }\n')
       if property.isArray():
-        s += '\\dpa\\jsonld\\f::array_flatten($value,'+ser+','+m+')'
+        s.append('  public function add_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = array_merge($this->var_'+cname+', '+value+'); }\n')
+        s.append('  public function del_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = array_diff ($this->var_'+cname+', '+value+'); }\n')
+      if deser:
+        s.append('  private static function deser_'+pname+'(mixed $v) : mixed {\n')
+        s.append(''.join(deser))
+        s.append('    return $v;\n')
+        s.append('  }\n')
+      s.append('\n')
+    return ''.join(s)
+  # The properties in the trait of this class, those an ancestor's trait doesn't already have
+  def getPHPTraitProperties(self):
+    if 'trait' not in self.memo:
+      nt = native_types.get(str(self.uri)) or [None, None, None, None]
+      inherited = {}
+      for c in self.getAncestors():
+        inherited |= c.getPHPTraitProperties()
+      if self.kind != 'class' or (nt[0] and not nt[2]):
+        self.memo['trait'] = {}
       else:
-        if len(types):
-          s += '\\dpa\\jsonld\\f::deser($value,'+ser+','+m+')'
-        else:
-          s += '$value'
-      s += '; }\n'
+        self.memo['trait'] = {k:v for k,v in self.property.items() if inherited.get(k) is not v}
+    return self.memo['trait']
+  # Where an accessor is in the traits of more than one ancestor, the one of the class
+  # declaring it last wins, like it did when they were all copied into the class.
+  def genPHPUse(self):
+    properties = self.getAllProperties(True)
+    traits = [c for c in [*self.getAncestors(), self] if c.getPHPTraitProperties()]
+    s = []
+    if traits:
+      s.append('  use ' + ', '.join(c.getAbsNS('T') for c in traits))
+      rules = []
+      for piri, (owner, property) in properties.items():
+        having = [c for c in traits if piri in c.getPHPTraitProperties()]
+        if len(having) < 2:
+          continue
+        winner = owner if owner in having else having[-1]
+        others = ', '.join(c.getAbsNS('T') for c in having if c is not winner)
+        methods = ['get', 'set', 'add', 'del'] if property.isArray() else ['get', 'set']
+        if property.genPHPDeser():
+          methods.append('deser')
+        for m in methods:
+          rules.append('    ' + winner.getAbsNS('T') + '::' + m + '_' + getName(piri) + ' insteadof ' + others + ';\n')
+      if rules:
+        s.append(' {\n' + ''.join(rules) + '  }\n\n')
+      else:
+        s.append(';\n\n')
+    provided = set()
+    for c in traits:
+      provided |= c.getPHPTraitProperties().keys()
+    s.append(self.genPHPAccessors((piri, property) for piri, (owner, property) in properties.items() if piri not in provided))
+    return ''.join(s)
+  # What \dpa\jsonld\f::getIRItoNameMap would otherwise collect from the #[Property] attributes
+  def getIRIMap(self):
+    iri_map = {}
+    for piri, property in self.getAllProperties().items():
+      iri_map[re.sub('^https?:', 'http?:', str(property.uri))] = (getName(piri), property)
+    return sorted(iri_map.items())
+  def genPHPIRIMap(self):
+    s = ['  const IRI_MAP = [\n']
+    for key, (name, property) in self.getIRIMap():
+      st = property.getType()
+      value = [str(property.uri), name, str(st.uri) if st else None, [str(x) for x in sorted(property.context)]]
+      s.append('    ' + json.dumps(key) + ' => ' + json.dumps(value) + ',\n')
+    s.append('  ];\n\n')
+    return ''.join(s)
+  # Same result as \dpa\jsonld\f::toArrayHelper, unrolled over IRI_MAP
+  def genPHPToArray(self, rtype):
+    s = ['  public function toArray(\\dpa\\jsonld\\ContextHelper $context=null) : '+rtype+' {\n']
+    s.append('    $toplevel = !$context;\n')
+    s.append('    if(!$context)\n')
+    s.append('      $context = new \\dpa\\jsonld\\ContextHelper();\n')
+    s.append("    $result = ['@type' => static::IRI];\n")
+    s.append('    $contexts = array_fill_keys(static::NS, INF);\n')
+    for key, (name, property) in self.getIRIMap():
+      parts = property.type.genTypeConstraint({'direct'}) if property.type else set()
+      if not parts:
+        parts = {'mixed'}
+      plain = parts <= {'bool', 'float', 'int', 'string', 'null'}
       if property.isArray():
-        s += '  public function add_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = array_merge($this->var_'+cname+', \\dpa\\jsonld\\f::array_flatten($value,'+ser+','+m+')); }\n'
-        s += '  public function del_'+pname+'('+tv+' $value) : void { $this->var_'+cname+' = array_diff ($this->var_'+cname+', \\dpa\\jsonld\\f::array_flatten($value,'+ser+','+m+')); }\n'
-      s += '\n'
-    s += """\
-  public function toArray(\\dpa\\jsonld\\ContextHelper $context=null) : """+('string|null|' if nt[2] else '')+"""array { return \\dpa\\jsonld\\f::toArrayHelper($this,$context); }
-  public function fromArray(array $data) : void { \\dpa\\jsonld\\f::fromArrayHelper($this, $data); }
-  public function serialize() : ?string { $a=json_encode($this->toArray(),JSON_PRETTY_PRINT|JSON_UNESCAPED_SLASHES); return $a!==false?$a:null; }
-  public function unserialize(string $data) : void { $this->fromArray(json_decode($data,true)); } // @phpstan-ignore-line
-"""
-    s += '}\n'
-    if nt[2]:
-      s += '\\dpa\\load(' + json.dumps(nt[2]) + ');';
-    Path(self.getDirPath()).mkdir(parents=True, exist_ok=True)
-    with open(self.getAbsPath(), 'w') as f:
-      print(s, file=f)
-  def serialize_mysql(self):
+        s.append('    if($v = $this->get_'+name+'()){\n')
+        if plain:
+          value = 'count($v) == 1 ? $v[0] : $v'
+        else:
+          value = '\\dpa\\jsonld\\f::toArrayValue($v, $context)'
+      elif plain:
+        s.append('    if(($v = $this->get_'+name+'()) !== null){\n')
+        value = '$v'
+      elif 'mixed' in parts or 'array' in parts:
+        s.append('    if(($v = $this->get_'+name+'()) !== null && $v !== []){\n')
+        value = '\\dpa\\jsonld\\f::toArrayValue($v, $context)'
+      else:
+        s.append('    if(($v = $this->get_'+name+'()) !== null){\n')
+        value = '$v instanceof \\dpa\\jsonld\\POJO ? $v->toArray($context) : ($v instanceof \\dpa\\jsonld\\simple_type ? $v->__toString() : $v)'
+      s.append('      $result['+json.dumps(str(property.uri))+'] = '+value+';\n')
+      for ctx in sorted(property.context):
+        c = json.dumps(str(ctx))
+        s.append('      $contexts['+c+'] = ($contexts['+c+'] ?? 0) + 1;\n')
+      s.append('    }\n')
+    s.append('    asort($contexts);\n')
+    s.append('    $context->merge(...array_keys($contexts)); // @phpstan-ignore-line\n')
+    s.append('    if($toplevel)\n')
+    s.append('      return \\dpa\\jsonld\\f::g_compact($result, $context);\n')
+    s.append('    return $result;\n')
+    s.append('  }\n')
+    return ''.join(s)
+  # Same result as \dpa\jsonld\f::fromArrayHelper, dispatching on the expanded key
+  def genPHPFromArray(self):
+    s = ['  public function fromArray(array $data, \\dpa\\jsonld\\ContextHelper $context=null) : void {\n']
+    s.append('    if(!$context)\n')
+    s.append("      $context = (new \\dpa\\jsonld\\ContextHelper())->merge(@$data['@context'], static::IRI);\n")
+    s.append('    foreach($data as $key => $value){\n')
+    s.append('      switch($iri = $context->key2iri($key)){\n')
+    for key, (name, property) in self.getIRIMap():
+      st = property.getType()
+      if key.startswith('http?:'):
+        variants = ['http:' + key[6:], 'https:' + key[6:]]
+      else:
+        variants = [key]
+      s.append('        ' + ' '.join('case '+json.dumps(v)+':' for v in variants) + '\n')
+      s.append('          $this->set_'+name+'(...\\dpa\\jsonld\\f::fromArrayValue($value, $context, '+json.dumps(str(st.uri) if st else None)+'));\n')
+      s.append('          break;\n')
+    s.append('        default:\n')
+    s.append("          if($iri[0] != '@')\n")
+    s.append('            trigger_error("No mapping for IRI: $iri\\n");\n')
+    s.append('      }\n')
+    s.append('    }\n')
+    s.append('  }\n')
+    return ''.join(s)
+  def serialize_mysql(self, model=None):
     table = self.getSQLTable()
     if not table:
       return []
+    flat = sql_layout == 'flat'
     keys = {}
     constraints = []
-    #{*self.getAllProperties().values()}:
-    for prop in {*self.property.values()}:
+    indexes = {}
+    # In the flat layout, each table holds the columns of all ancestors too
+    for prop in byuri({*(self.getAllProperties() if flat else self.property).values()}):
       if str(prop.uri) == '@id':
         continue
-      prop.serialize_mysql(keys, constraints)
-    keys = [keys[k] for _,k in sorted([(len(k),k) for k in keys.keys()])]
+      prop.serialize_mysql(keys, constraints, indexes)
+    columns = {k: keys[k] for _,k in sorted([(len(k),k) for k in keys.keys()])}
+    indexes = dict(indexes[k] for _,k in sorted([(len(k),k) for k in indexes.keys()]))
+    keys = [*columns.values(), *indexes.values()]
     keys.insert(0, '`id` INT NOT NULL')
     keys.insert(0, '`created` DATETIME NOT NULL')
     keys.insert(0, 'PRIMARY KEY (`created`,`id`)')
-    for part in self.implements:
+    for part in byuri(self.implements) if not flat else []:
       t = part.getSQLTable()
       if not t:
         continue
@@ -505,23 +1382,159 @@ class Class:
     s = ''
     s += f'CREATE TABLE IF NOT EXISTS {escapeSQLid(table)} (\n'
     s += ',\n'.join(keys)
-    s += '\n);\n\n'
-    s += f'INSERT IGNORE INTO `id` (`uri`) VALUES ({escapeSQLstr(self.uri)});\n\n'
+    s += '\n)' + (sql_partition_clause if sql_partition else '') + ';\n\n'
     l.append(s)
-    constraints = ['  ADD '+c for c in constraints]
     s = ''
-    s += f'ALTER TABLE {escapeSQLid(table)}\n'
-    s += ',\n'.join(constraints)
-    s += '\n;\n\n'
+    # Partitioned tables can't have foreign keys
+    if not sql_partition:
+      s += f'ALTER TABLE {escapeSQLid(table)}\n'
+      s += ',\n'.join('  ADD '+c for c in constraints)
+      s += '\n;\n\n'
     l.append(s)
-    l.append(f'''\
+    if sql_partition:
+      # Instead of cascading from version, and the other way around. Both at once won't work with triggers.
+      l.append(f'''\
+DROP TRIGGER IF EXISTS {escapeSQLid("c "+table[2:])};
+CREATE TRIGGER {escapeSQLid("c "+table[2:])} AFTER DELETE ON `version`
+  FOR EACH ROW DELETE FROM {escapeSQLid(table)} WHERE `created` = old.`created` AND `id` = old.`id`;
+
+''')
+    else:
+      l.append(f'''\
 DROP TRIGGER IF EXISTS {escapeSQLid("c "+table[2:])};
 CREATE TRIGGER {escapeSQLid("c "+table[2:])} BEFORE DELETE ON {escapeSQLid(table)}
   FOR EACH ROW DELETE FROM `version` WHERE `created` = old.`created` AND `id` = old.`id`;
 
 ''')
-    l.append(self.serialize_mysql_view())
+    l.append(self.serialize_mysql_flat_view() if flat else self.serialize_mysql_view())
+    if model is not None:
+      model['tables'][escapeSQLid(table)] = {
+        'create': l[0],
+        'columns': columns,
+        'indexes': indexes,
+        'constraints': [] if sql_partition else constraints,
+      }
+      model['triggers'][escapeSQLid("c "+table[2:])] = l[2]
+      model['views'][escapeSQLid(self.getSQLTable('v'))] = l[3]
     return l
+  # The columns of the table of this class, as (escaped name, sql type, is reference, column name)
+  def getSQLColumns(self):
+    covered = set()
+    columns = []
+    props = self.getAllProperties() if sql_layout == 'flat' else self.property
+    for prop in byuri({*props.values()}):
+      if str(prop.uri) == '@id':
+        continue
+      for table, name, sqlt, t, column in prop.sqlPropInfos():
+        if name not in covered:
+          covered.add(name)
+          columns.append((name, sqlt, bool(table), column))
+    return [c for _,c in sorted([(len(c[0]),c) for c in columns])]
+  # Takes a JSON array of objects, keyed by "@id" and the column names. References are given as IRIs.
+  # All objects get a new version of this type, created now, in all tables of the type.
+  def serialize_mysql_bulk(self):
+    table = self.getSQLTable()
+    if not table:
+      return ''
+    if sql_layout == 'flat':
+      chain = [self]
+    else:
+      chain = [c for c in [self, *self.getAncestors()] if c.getSQLTable()]
+      # Parents first, for the foreign keys
+      chain = sorted(chain, key=lambda c: (-len(c.getDescendants()), str(c.uri)))
+    columns = {}
+    for c in chain:
+      for name, sqlt, ref, column in c.getSQLColumns():
+        columns[name] = ('VARCHAR(512)' if ref else sqlt, column)
+    jcols = ['      `@id` VARCHAR(512) PATH \'$."@id"\'']
+    for name, (sqlt, column) in columns.items():
+      jcols.append(f'      {name} {sqlt} PATH {escapeSQLstr("$." + json.dumps(column))}')
+    s = [f'''\
+DROP PROCEDURE IF EXISTS {escapeSQLid("b "+table[2:])};
+DELIMITER //
+CREATE PROCEDURE {escapeSQLid("b "+table[2:])}(IN objects JSON)
+BEGIN
+  DECLARE v_created DATETIME DEFAULT NOW();
+  DECLARE v_type INT DEFAULT {self.registry.getIRIIds()[str(self.uri)]};
+  DROP TEMPORARY TABLE IF EXISTS `bulk`;
+  CREATE TEMPORARY TABLE `bulk` AS SELECT * FROM JSON_TABLE(objects, '$[*]' COLUMNS(
+{(","+chr(10)).join(jcols)}
+  )) AS `j`;
+  INSERT IGNORE INTO `id` (`uri`) SELECT `@id` FROM `bulk` WHERE `@id` IS NOT NULL;
+''']
+    for name, sqlt, ref, _ in (x for c in chain for x in c.getSQLColumns()):
+      if ref:
+        s.append(f'  INSERT IGNORE INTO `id` (`uri`) SELECT {name} FROM `bulk` WHERE {name} IS NOT NULL;\n')
+    s.append(f'''\
+  INSERT IGNORE INTO `version` (`created`,`id`,`type`)
+    SELECT v_created, `i`.`id`, v_type FROM `bulk` INNER JOIN `id` AS `i` ON `i`.`uri` = `bulk`.`@id`;
+''')
+    for c in chain:
+      cols = c.getSQLColumns()
+      fields = ['v_created AS `created`', '`i`.`id`']
+      joins = ['INNER JOIN `id` AS `i` ON `i`.`uri` = `bulk`.`@id`']
+      for n, (name, sqlt, ref, _) in enumerate(cols):
+        if ref:
+          fields.append(f'`r{n}`.`id` AS {name}')
+          joins.append(f'LEFT JOIN `id` AS `r{n}` ON `r{n}`.`uri` = `bulk`.{name}')
+        else:
+          fields.append(f'`bulk`.{name}')
+      names = ','.join(['`created`','`id`'] + [c[0] for c in cols])
+      select = f'SELECT {", ".join(fields)} FROM `bulk` {" ".join(joins)}'
+      if cols:
+        update = ', '.join(f'{c[0]} = `new`.{c[0]}' for c in cols)
+        s.append(f'  INSERT INTO {escapeSQLid(c.getSQLTable())} ({names})\n    SELECT * FROM ({select}) AS `new`\n    ON DUPLICATE KEY UPDATE {update};\n')
+      else:
+        s.append(f'  INSERT IGNORE INTO {escapeSQLid(c.getSQLTable())} ({names})\n    {select};\n')
+    s.append('''\
+  DROP TEMPORARY TABLE `bulk`;
+END //
+DELIMITER ;
+
+''')
+    return ''.join(s)
+  # An object is stored in the table of its type only, so the view of a type
+  # has to collect the rows of all its subtypes.
+  def serialize_mysql_flat_view(self):
+    view = self.getSQLTable('v')
+    if not view:
+      return ''
+    fields = []
+    covered = {'`s @id`'}
+    for prop in self.getAllProperties().values():
+      if str(prop.uri) == '@id':
+        continue
+      for table, name, sqlt, t, _ in prop.sqlPropInfos():
+        if name in covered:
+          continue
+        covered.add(name)
+        fields.append(f'  `t0`.{name}')
+    fields = sorted(sorted(fields),key=len)
+    fields.insert(0,'  `version`.`type`')
+    fields.insert(0,'  `version`.`id`')
+    fields.insert(0,'  `version`.`created`')
+    fields.insert(0,'  `id`.`uri`')
+    fields = ",\n".join(fields)
+    selects = []
+    for cls in [self, *byuri(self.getDescendants())]:
+      table = cls.getSQLTable()
+      if not table:
+        continue
+      selects.append(f'''\
+SELECT
+{fields}
+FROM {escapeSQLid(table)} as `t0`
+  INNER JOIN `id` ON `t0`.`id` = `id`.`id`
+  INNER JOIN `version` ON `t0`.`created` = `version`.`created` AND `t0`.`id` = `version`.`id`
+''')
+    selects = '\nUNION ALL\n'.join(selects)
+    s = f'''\
+DROP VIEW IF EXISTS {escapeSQLid(view)};
+CREATE VIEW {escapeSQLid(view)} AS
+{selects};
+
+'''
+    return s
   def serialize_mysql_view(self):
     view = self.getSQLTable('v')
     if not view:
@@ -537,7 +1550,7 @@ CREATE TRIGGER {escapeSQLid("c "+table[2:])} BEFORE DELETE ON {escapeSQLid(table
         types[typ] = _i
         _i += 1
       i = types[typ]
-      for table, name, sqlt, t in prop.sqlPropInfos():
+      for table, name, sqlt, t, _ in prop.sqlPropInfos():
         if name in covered:
           continue
         covered.add(name)
@@ -565,25 +1578,29 @@ FROM {escapeSQLid(self.getSQLTable())} as `t0`
 '''
     return s
   def getAllProperties(self, with_class=False):
+    key = ('properties', with_class)
+    if key in self.memo:
+      return self.memo[key]
     properties = {}
-    for parent in self.implements:
+    for parent in byuri(self.implements):
       properties |= parent.getAllProperties(with_class)
     if with_class:
       properties |= {k:(self,v) for k,v in self.property.items()}
     else:
       properties |= self.property
+    if self.registry.subclasses is not None:
+      self.memo[key] = properties
     return properties
   def getTypes(self):
     return [self]
-Class.i = 0
 
 class Property:
+  __slots__ = ('context', 'registry', 'index', 'classes', 'uri', 'uris', 'type', 'comment', 'nullable',
+               'objectproperty', 'datatypeproperty', 'functionalproperty', 'indexed')
   def __init__(self, registry, uri):
-    Property.i += 1
-    self.i = Property.i
     self.context = set()
     self.registry = registry
-    self.g = registry.g
+    self.index = registry.index
     self.classes = set()
     self.uri = uri
     self.uris = {self.uri}
@@ -593,17 +1610,17 @@ class Property:
     self.objectproperty = False
     self.datatypeproperty = False
     self.functionalproperty = False
+    self.indexed = False
   def getName(self):
     return getName(self.uri)
   def setMeta(self, key, value, alias):
     if key == URIRef('http://www.w3.org/2000/01/rdf-schema#range'):
       self.type = self.registry.getOrCreateClass(value)
     elif key == URIRef('http://www.w3.org/2000/01/rdf-schema#comment'):
-      self.comment.append(value)
+      self.comment.append(str(value))
     elif key == rdf_domain:
       if str(value) == '*':
-        for s, p, o in chain(self.g['*'].triples((None, RDF.type, owl_Class)),
-                             self.g['*'].triples((None, RDF.type, rdfs_Class))):
+        for s in [*self.index.subjects(RDF.type, owl_Class), *self.index.subjects(RDF.type, rdfs_Class)]:
           self.setMeta(key, s, alias)
       else:
         cls = self.registry.getOrCreateClass(value)
@@ -619,6 +1636,8 @@ class Property:
         self.objectproperty = True
     elif key == dpa_context:
       self.context.add(value)
+    elif key == dpa_index:
+      self.indexed = not (isinstance(value, Literal) and value.toPython() is False)
   def sameAs(self, value):
     if value in self.registry.property:
       prev = self.registry.property[value]
@@ -647,22 +1666,67 @@ class Property:
     return res
   def isArray(self):
     return not self.datatypeproperty
+  # The statements of the deser_ method of this property, or None if its values are taken
+  # as they are. Like \dpa\jsonld\f::deser, but deciding by the type of the value what to
+  # construct, instead of trying all the types until one of them doesn't throw.
+  def genPHPDeser(self):
+    if not self.type:
+      return None
+    s = []
+    # Only strings are constructed into the range's class, anything else is kept as it is.
+    # That is a change from f::deser, which constructed whatever it got: null now stays null,
+    # where it used to become an empty object, or the current time for xsd:dateTime.
+    # Of several overridden types, a string always becomes the first one, and if its
+    # constructor throws, so does the setter. f::deser_sub tried them in the same order, but
+    # went on to the next one instead. The only such range in the current vocabularies is
+    # that of as:url, whose first one is xsd:anyURI. It takes any string, so nothing changes.
+    types = sorted([*self.type.getInstTypes()])
+    if types:
+      s.append('    if(is_string($v))\n      $v = new '+types[0]+'($v);\n')
+    for ns, md in sorted(self.type.getModifiers()):
+      # The ranges of the xsd integer types are checked as facets instead
+      if ns in php_type_tests:
+        continue
+      s.append('    if($v instanceof '+ns+' && !'+md+'($v))\n      \\dpa\\jsonld\\f::constraint_failed('+phpStr(md)+', $v);\n')
+    restricted = []
+    unrestricted = []
+    for t, facets in self.type.getRestrictions():
+      conds = cleanlist(t.genPHPFacet(facet, value) for facet, value in facets)
+      if conds:
+        restricted.append((t.genPHPTypeTest(), conds))
+      else:
+        unrestricted.append(t.genPHPTypeTest())
+    if len(restricted) == 1 and not unrestricted:
+      test, conds = restricted[0]
+      s.append('    if('+test+' && !('+' && '.join(conds)+'))\n')
+    elif restricted:
+      ok = ['('+test+' && '+' && '.join(conds)+')' for test, conds in restricted] + unrestricted
+      tests = dict.fromkeys(test for test, conds in restricted)
+      s.append('    if(('+' || '.join(tests)+') && !('+' || '.join(ok)+'))\n')
+    if restricted:
+      s.append('      \\dpa\\jsonld\\f::constraint_failed('+phpStr(str(self.uri))+', $v);\n')
+    return s or None
   # If it can be only 1 type, return it
   def getType(self):
     if self.type and self.type.kind == 'class':
       return self.type
     return None
-  def serialize_mysql(self, keys, constraints):
+  def serialize_mysql(self, keys, constraints, indexes):
     info = self.sqlPropInfos()
     nullable = '' if self.nullable or len(info) != 1 else 'NOT NULL'
-    for table, name, sqlt, t in info:
+    for table, name, sqlt, t, column in info:
       if not name in keys:
         keys[name] = ' '.join(cleanlist([name, sqlt, nullable]))
+        iname = escapeSQLid('i ' + column)
         if t.getSQLTable():
           constraints.append('FOREIGN KEY ('+name+') REFERENCES `id` (`id`)')
+          # Also serves the foreign key, and lets lookups by reference come out ordered by version
+          indexes[name] = (iname, 'INDEX '+iname+' ('+name+',`created`)')
+        elif self.indexed:
+          indexes[name] = (iname, 'INDEX '+iname+' ('+name+')')
   def sqlPropInfos(self):
     l = []
-    types = self.type.getConstituents({'direct'}) if self.type else []
+    types = byuri(self.type.getConstituents({'direct'})) if self.type else []
     if not types:
       types = [self.registry.getOrCreateClass(URIRef('http://dpa.li/ns/owl/fixes/types#JSON'))]
     for t in types:
@@ -685,12 +1749,11 @@ class Property:
         prefix = 'J'
       elif 'DATETIME' == sqlt:
         prefix = 'D'
-      name = prefix + ' ' + str(self.uri)
-      name = escapeSQLid(name);
-      l.append((table, name, sqlt, t))
+      column = prefix + ' ' + str(self.uri)
+      name = escapeSQLid(column);
+      l.append((table, name, sqlt, t, column))
     return l
 
-Property.i = 1
 
 
 def fixup(x):
@@ -703,80 +1766,217 @@ def fixup(x):
       x = URIRef(new + x[len(old):])
   return x
 
-def filesof(g, t):
-  res = set()
-  for f, g in g.items():
-    if f != '*' and (t in g):
-      res.add(f)
-  return res
+def triple_key(t):
+  return tuple(x.n3() for x in t)
+
+# Graphs iterate in hash order, so the triples are sorted to get reproducible output
+def parse_vocab(f):
+  g2 = Graph()
+  g2.parse(f, format='turtle')
+  triples = set()
+  for s, p, o in g2:
+    s=fixup(s)
+    p=fixup(p)
+    o=fixup(o)
+    triples.add((s,p,o))
+  return sorted(triples, key=triple_key)
+
+def vocab_cache_key(f, data):
+  h = hashlib.sha256()
+  h.update(f"{GENERATOR_VERSION}\0{rdflib.__version__}\0{os.path.abspath(f)}\0".encode())
+  h.update(data)
+  return h.hexdigest()
 
-def generate(files,cfiles):
-  ga = Graph()
-  g = {}
-  for f in files:
+def load_vocab(f, use_cache=True):
+  if not use_cache:
     print("parsing file: "+f)
-    g2 = Graph()
-    g3 = Graph()
-    g2.parse(f, format='turtle')
-    for s, p, o in g2:
-      s=fixup(s)
-      p=fixup(p)
-      o=fixup(o)
-      g3.add((s,p,o))
-    g[f] = g3
-    ga += g3
-  g['*'] = ga
-  r = Registry(g)
+    return parse_vocab(f)
+  with open(f, 'rb') as fd:
+    key = vocab_cache_key(f, fd.read())
+  cache = os.path.join(vocab_cache_dir, key + '.pickle')
+  try:
+    with open(cache, 'rb') as fd:
+      triples = pickle.load(fd)
+    print("loading cached file: "+f)
+    return triples
+  except (OSError, pickle.UnpicklingError, EOFError):
+    pass
+  print("parsing file: "+f)
+  triples = parse_vocab(f)
+  Path(vocab_cache_dir).mkdir(parents=True, exist_ok=True)
+  with open(cache + '.tmp', 'wb') as fd:
+    pickle.dump(triples, fd, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(cache + '.tmp', cache)
+  return triples
+
+# The workers are forked, so they share the fully built registry with the parent
+# and only the items' indices and the results have to be passed around.
+parallel_items = None
+
+def parallel_call(args):
+  fn, i = args
+  return fn(parallel_items[i])
+
+def parallel_map(fn, items, jobs):
+  global parallel_items
+  parallel_items = items
+  try:
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+      return pool.map(parallel_call, [(fn, i) for i in range(len(items))], chunksize=max(1, len(items)//(jobs*4)))
+  finally:
+    parallel_items = None
+
+def genPHP(v):
+  return v.genPHP()
+
+def load_vocab_args(args):
+  return load_vocab(*args)
+
+def clear_vocab_cache():
+  for f in glob(os.path.join(vocab_cache_dir, '*.pickle*')):
+    os.unlink(f)
+
+def generate(files, cfiles, use_cache=True, manifest=None, jobs=1, specialized=False, layout='normalized', partition=False, migrate_from=None, roots=None):
+  global specialize, sql_layout, sql_partition
+  stats = Stats()
+  specialize = specialized
+  sql_layout = layout
+  sql_partition = partition
+  load_native_types()
+  index = Index()
+  subjects = {}
+  ontologies = {}
+  if jobs > 1:
+    vocabs = parallel_map(load_vocab_args, [(f, use_cache) for f in files], jobs)
+  else:
+    vocabs = (load_vocab(f, use_cache) for f in files)
+  ntriples = 0
+  nfiles = len(files)
+  # The vocabularies are parsed or unpickled separately, so the same IRI is in there
+  # many times over. Only keep one of them.
+  terms = {}
+  for f, triples in zip(files, vocabs):
+    fs = subjects[f] = {}
+    ntriples += len(triples)
+    for t in triples:
+      t = tuple(terms.setdefault(x, x) for x in t)
+      index.add(t)
+      fs[t[0]] = None
+      if t[1] == RDF.type and t[2] == owl_Ontology:
+        ontologies.setdefault(t[0], set()).add(f)
+  vocabs = terms = None
+  stats.phase('parse')
+  output = Output(manifest, {
+    'specialize': specialized,
+    'sql-layout': layout,
+    'sql-partition': partition,
+    'root': sorted(roots or []),
+  })
+  r = Registry(index, output)
+  if os.path.exists(iri_ids_file):
+    with open(iri_ids_file, 'r') as f:
+      r.previous_ids = json.load(f)
+  # Read before anything is written, it may well be the pojo/schema.json about to be replaced
+  if migrate_from:
+    with open(migrate_from, 'r') as f:
+      r.previous_schema = json.load(f)
+    r.addPreviousIds(r.previous_schema.get('ids', {}), migrate_from)
   r.getOrCreateClass(URIRef('http://dpa.li/ns/owl/fixes/types#JSON'))
   for context in cfiles:
     ctx = r.getOrCreateContext(context)
     for v in ctx.fldmap.values():
       if v.startswith('http://') or v.startswith('https://'):
-        g['*'].add((URIRef(v), dpa_context, URIRef(ctx.uri)))
+        index.add((URIRef(v), dpa_context, URIRef(ctx.uri)))
     files = set()
-    for s, p, o in g['*'].triples((context, URIRef('http://dpa.li/ns/owl/fixes/meta#target-ontology'), None)):
-      files |= filesof(g, (o, RDF.type, owl_Ontology))
+    for s, p, o in index.triples((context, URIRef('http://dpa.li/ns/owl/fixes/meta#target-ontology'), None)):
+      files |= ontologies.get(o, set())
       if not files:
         print(f"no file found containing ontology <{o}>", file=sys.stderr)
-    for s, p, o in g['*'].triples((context, URIRef('http://dpa.li/ns/owl/fixes/meta#target-file'), None)):
+    for s, p, o in index.triples((context, URIRef('http://dpa.li/ns/owl/fixes/meta#target-file'), None)):
       files.add(str(o))
     for f in files:
-      for s in g[f].subjects():
-        t = (s, dpa_context, context)
-        g[f].add(t)
-        g['*'].add(t)
-  for s, p, o in chain(g['*'].triples((None, RDF.type, owl_Class)),
-                       g['*'].triples((None, RDF.type, rdfs_Class)),
-                       g['*'].triples((None, RDF.type, rdfs_Datatype))):
+      for s in sorted(subjects[f], key=lambda x: x.n3()):
+        index.add((s, dpa_context, context))
+  for s, p, o in chain(index.triples((None, RDF.type, owl_Class)),
+                       index.triples((None, RDF.type, rdfs_Class)),
+                       index.triples((None, RDF.type, rdfs_Datatype))):
     ci = r.getOrCreateClass(s)
     ci.setMeta('kind', o)
-    for s, p, o in g['*'].triples((s, None, None)):
+    for s, p, o in index.triples((s, None, None)):
       ci.setMeta(p, o)
   for pt in owl_properties:
-    for s, p, o in g['*'].triples((None, RDF.type, pt)):
-      for s, p, o in chain(g['*'].triples((s, owl_equivalentProperty, None)),
-                           g['*'].triples((s, owl_sameAs, None))):
+    for s, p, o in index.triples((None, RDF.type, pt)):
+      for s, p, o in chain(index.triples((s, owl_equivalentProperty, None)),
+                           index.triples((s, owl_sameAs, None))):
         property = r.getOrCreateProperty(s)
         property.sameAs(o)
       property = r.getOrCreateProperty(s)
       property.setMeta('kind', pt, s)
-      for s, p, o in chain(g['*'].triples((s, None, None))):
+      for s, p, o in index.triples((s, None, None)):
         property.setMeta(p, o, s)
-  r.serialize_php()
+  index = subjects = ontologies = None
+  r.release()
+  if roots:
+    r.prune(roots)
+  r.resolve()
+  stats.phase('registry')
+  r.serialize_php(jobs)
+  stats.phase('php')
   r.serialize_mysql()
+  stats.phase('sql')
+  output.finish()
   r.info()
+  stats.phase('info')
+  stats.counts = {
+    'files': nfiles,
+    'triples': ntriples,
+    'classes': len(r.classes),
+    'properties': len(set(r.property.values())),
+    'contexts': len(r.context),
+    'written': output.written,
+  }
+  return stats
 
 def filterfiles(l):
   return (f for f in l if os.path.isfile(f))
 
-owl = [*filterfiles(
-    glob('vocab/**/*.owl', recursive=True)
-  + glob('vocab/**/*.ttl', recursive=True)
-  + glob('download/vocab/**/*.owl', recursive=True)
-  + glob('download/vocab/**/*.ttl', recursive=True)
-)]
-context = [*filterfiles(glob('download/context/http*:/**/*', recursive=True))]
-context = [re.sub('^(https?:/)','\\1/',c[17:]) for c in context]
+def main():
+  parser = argparse.ArgumentParser(description='Generate the PHP classes and SQL schema from the vocabularies')
+  parser.add_argument('--no-cache', action='store_true', help='always parse the vocabularies, bypassing '+vocab_cache_dir)
+  parser.add_argument('--clear-cache', action='store_true', help='remove all cached vocabulary graphs before generating')
+  parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='parse the vocabularies and generate the PHP files using N processes')
+  parser.add_argument('--incremental', action='store_true', help='only write changed files and remove stale ones, tracked in '+pojo_manifest)
+  parser.add_argument('--specialize', action='store_true', help='emit per-class toArray/fromArray code instead of calling the generic helpers')
+  parser.add_argument('--sql-layout', choices=['normalized', 'flat'], default='normalized', help='one table per class joined in the views (normalized), or one table per class with all inherited columns (flat)')
+  parser.add_argument('--sql-partition', action='store_true', help='partition version and the class tables by month of creation, and add a retention procedure')
+  parser.add_argument('--sql-migrate-from', metavar='SCHEMA_JSON', help='also write pojo/migration.sql, with the statements needed to get from the schema.json of a previous build to this one')
+  parser.add_argument('--stats', action='store_true', help='print the time taken by each phase, the size of the input and the peak memory use to stderr')
+  parser.add_argument('--profile', metavar='FILE', help='run the generator under cProfile and write the result to FILE, for use with pstats. With -j, only the main process is profiled')
+  parser.add_argument('--root', action='append', metavar='IRI', help='only generate the types and contexts reachable from this type or context IRI, may be given more than once')
+  args = parser.parse_args()
+
+  if args.clear_cache:
+    clear_vocab_cache()
+
+  owl = [*filterfiles(
+      sorted(glob('vocab/**/*.owl', recursive=True))
+    + sorted(glob('vocab/**/*.ttl', recursive=True))
+    + sorted(glob('download/vocab/**/*.owl', recursive=True))
+    + sorted(glob('download/vocab/**/*.ttl', recursive=True))
+  )]
+  context = [*filterfiles(sorted(glob('download/context/http*:/**/*', recursive=True)))]
+  context = [re.sub('^(https?:/)','\\1/',c[17:]) for c in context]
 
-generate(owl, context)
+  run = lambda: generate(owl, context, use_cache=not args.no_cache, manifest=pojo_manifest if args.incremental else None, jobs=args.jobs, specialized=args.specialize, layout=args.sql_layout, partition=args.sql_partition, migrate_from=args.sql_migrate_from, roots=args.root)
+  if args.profile:
+    import cProfile
+    profile = cProfile.Profile()
+    stats = profile.runcall(run)
+    profile.dump_stats(args.profile)
+  else:
+    stats = run()
+  if args.stats:
+    stats.report()
 
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,23 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/../lib/loader.inc.php';
+
+// A failed check is reported, but the script goes on, so one run shows all of them.
+$check_failed = false;
+
+function check(bool $ok, string $what, mixed ...$details) : void {
+  global $check_failed;
+  if($ok)
+    return;
+  $check_failed = true;
+  fwrite(STDERR, "FAILED: $what\n");
+  foreach($details as $detail)
+    fwrite(STDERR, '  '.json_encode($detail, JSON_UNESCAPED_SLASHES)."\n");
+}
+
+function check_done() : never {
+  global $check_failed;
+  echo $check_failed ? "FAILED\n" : "OK\n";
+  exit($check_failed ? 1 : 0);
+}
@@ -0,0 +1,94 @@
+# The same as check.inc.php, for the checks of the generator. Those run script/mkphpclass.py
+# on the vocabulary in test/fixture/, in a temporary directory, so nothing is downloaded.
+import io
+import os
+import sys
+import json
+import shutil
+import atexit
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+
+base = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(base / 'script'))
+from bench_mkphpclass import override_meta
+
+ns = 'https://example.org/ns/test#'
+context = 'https://example.org/ns/test'
+
+# A failed check is reported, but the script goes on, so one run shows all of them.
+check_failed = False
+
+def check(ok, what, *details):
+  global check_failed
+  if ok:
+    return
+  check_failed = True
+  print('FAILED: ' + what, file=sys.stderr)
+  for detail in details:
+    print('  ' + repr(detail), file=sys.stderr)
+
+def check_done():
+  print('FAILED' if check_failed else 'OK')
+  sys.exit(1 if check_failed else 0)
+
+# A directory to run the generator in, with the fixture vocabulary and its context
+class Tree:
+  def __init__(self):
+    self.path = Path(tempfile.mkdtemp(prefix='dpa-mkphpclass-check-'))
+    atexit.register(shutil.rmtree, self.path, True)
+    (self.path / 'build').mkdir()
+    (self.path / 'vocab').mkdir()
+    (self.path / 'download/context/https:/example.org/ns').mkdir(parents=True)
+    shutil.copy(base / 'base.sql', self.path / 'base.sql')
+    shutil.copy(base / 'vocab/ld.owl', self.path / 'vocab/ld.owl')
+    shutil.copy(base / 'test/fixture/test.ttl', self.path / 'vocab/test.ttl')
+    shutil.copy(base / 'test/fixture/context.json', self.path / 'download/context/https:/example.org/ns/test')
+    self.write('build/override_meta.json', json.dumps(override_meta()))
+
+  # Runs the generator, and returns what it printed
+  def run(self, *args, ok=True):
+    p = subprocess.run([sys.executable, str(base / 'script/mkphpclass.py'), *args], cwd=self.path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    check((p.returncode == 0) == ok, 'mkphpclass.py ' + ' '.join(args) + (' succeeds' if ok else ' fails'), p.stdout, p.stderr)
+    return p.stdout + p.stderr
+
+  def read(self, path):
+    with open(self.path / path, 'r') as f:
+      return f.read()
+
+  def write(self, path, content):
+    (self.path / path).parent.mkdir(parents=True, exist_ok=True)
+    with open(self.path / path, 'w') as f:
+      f.write(content)
+
+  def exists(self, path):
+    return (self.path / path).exists()
+
+  # All files below a directory, by path relative to the tree
+  def files(self, directory='pojo'):
+    res = {}
+    for f in sorted((self.path / directory).rglob('*')):
+      if f.is_file():
+        res[str(f.relative_to(self.path))] = f.read_bytes()
+    return res
+
+  # Runs the generator in this process instead, and returns the registry it built
+  def registry(self, **kwargs):
+    import mkphpclass
+    registries = []
+    resolve = mkphpclass.Registry.resolve
+    def capture(r):
+      registries.append(r)
+      resolve(r)
+    cwd = os.getcwd()
+    mkphpclass.Registry.resolve = capture
+    os.chdir(self.path)
+    try:
+      with contextlib.redirect_stdout(io.StringIO()):
+        mkphpclass.generate(['vocab/ld.owl', 'vocab/test.ttl'], [context], use_cache=False, **kwargs)
+    finally:
+      os.chdir(cwd)
+      mkphpclass.Registry.resolve = resolve
+    return registries[0]
@@ -0,0 +1,103 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/check.inc.php';
+
+use dpa\http\HTTPDoc;
+use dpa\http\VerificationResult;
+
+// A body of $size bytes that counts how much of it was read
+class CountingStream {
+  public static int $size = 0;
+  public static int $read = 0;
+  public $context;
+  private int $position = 0;
+  public function stream_open(string $path, string $mode, int $options, ?string &$opened_path) : bool {
+    $this->position = 0;
+    return true;
+  }
+  public function stream_read(int $count) : string {
+    $n = max(0, min($count, self::$size - $this->position));
+    $this->position += $n;
+    self::$read += $n;
+    return str_repeat('x', $n);
+  }
+  public function stream_eof() : bool {
+    return $this->position >= self::$size;
+  }
+  public function stream_stat() : array {
+    return [];
+  }
+}
+stream_wrapper_register('counting', CountingStream::class);
+
+function counting_body(int $size) {
+  CountingStream::$size = $size;
+  CountingStream::$read = 0;
+  $body = fopen('counting://body', 'rb');
+  stream_set_read_buffer($body, 0);
+  return $body;
+}
+
+// Only headers the signature covers are kept, so there has to be one that covers the digest
+function doc(?string $digest, ?string $message, mixed $body=null, ?int $max_size=null) : HTTPDoc {
+  return new HTTPDoc('POST', '/inbox', $message, [
+    'Date' => gmdate('D, d M Y H:i:s \G\M\T'),
+    'Digest' => $digest,
+    'Signature' => 'keyId="check",algorithm="rsa-sha256",headers="date digest",signature="AAAA"',
+  ], $body, $max_size);
+}
+
+$message = '{"hello": "world"}';
+$sha256 = hash('sha256', $message);
+$sha512 = hash('sha512', $message);
+$sha256_b64 = base64_encode(hex2bin($sha256));
+$sha512_b64 = base64_encode(hex2bin($sha512));
+
+// The forms a Digest header comes in
+check($sha256_b64 === 'X48E9qOokqqrvdts8nOJRJN3OWDUoyWxBf7kbu9DBPE=', "the test vector is right");
+foreach([
+  "SHA-256=$sha256_b64",
+  "SHA-256=$sha256",
+  "SHA-512=$sha512_b64",
+  "SHA-512=$sha512",
+  "sha-256=$sha256_b64",
+  "SHA-256=$sha256_b64, SHA-512=$sha512",
+  "SHA-512=$sha512_b64,SHA-256=$sha256",
+] as $digest)
+  check(doc($digest, $message)->checkDigest('digest') === VerificationResult::VALID, "Digest: $digest is valid");
+$wrong = hash('sha256', 'something else');
+foreach([
+  "SHA-256=$wrong",
+  "SHA-256=" . base64_encode(hex2bin($wrong)),
+  "SHA-256=$sha256_b64, SHA-512=" . hash('sha512', 'something else'),
+  "SHA-512=$sha256",
+] as $digest)
+  check(doc($digest, $message)->checkDigest('digest') === VerificationResult::INVALID, "Digest: $digest is invalid");
+check(doc(null, $message)->checkDigest('digest') === VerificationResult::NO_SIGNATURE, "no Digest is no signature");
+
+// A streamed body is hashed as it's read, and is still there afterwards
+$stream = fopen('php://memory', 'w+b');
+fwrite($stream, $message);
+rewind($stream);
+$doc = doc("SHA-256=$sha256_b64, SHA-512=$sha512_b64", null, $stream);
+check($doc->checkDigest('digest') === VerificationResult::VALID, "the digest of a streamed body is valid");
+check($doc->has_message(), "the streamed body isn't empty");
+check($doc->hash(['sha256']) === ['sha256' => $sha256], "hashing the streamed body again gives the same hash");
+check($doc->message === $message, "the streamed body can be read after it was hashed", $doc->message);
+check($doc->checkDigest('digest') === VerificationResult::VALID, "the digest is still valid once the body was read");
+
+// A body bigger than max_size is rejected without reading all of it
+$max_size = 100000;
+$doc = doc("SHA-256=$sha256_b64", null, counting_body(10 * 1024 * 1024), $max_size);
+check($doc->hash(['sha256']) === null, "hashing a body over max_size fails");
+check(CountingStream::$read <= $max_size + 65536, "a body over max_size isn't read in full", CountingStream::$read);
+check($doc->checkDigest('digest') === VerificationResult::INVALID, "the digest of a body over max_size is invalid");
+$read = CountingStream::$read;
+check($doc->hash([]) === null && CountingStream::$read === $read, "a body over max_size isn't read again", CountingStream::$read);
+
+$doc = doc(null, null, counting_body($max_size), $max_size);
+check($doc->hash(['sha256']) === ['sha256' => hash('sha256', str_repeat('x', $max_size))], "a body of exactly max_size is hashed");
+check(strlen($doc->message) === $max_size, "a body of exactly max_size can be read");
+
+check_done();
@@ -0,0 +1,149 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/check.inc.php';
+
+use dpa\jsonld\f;
+use dpa\jsonld\ContextHelper;
+use dpa\jsonld\Property;
+
+// What f::getIRItoNameMap finds in the #[Property] attributes, for classes without IRI_MAP
+function attribute_map(string $class) : array {
+  $info = [];
+  foreach(f::getAllParents($class) as $reflection){
+    foreach($reflection->getMethods() as $entry){
+      if(!($attr = @$entry->getAttributes(Property::class)[0]))
+        continue;
+      if(!($name = @explode('_', $entry->getName(), 2)[1]))
+        continue;
+      $prop = $attr->newInstance();
+      $info[preg_replace('/^https?:/','http?:',$prop->iri)] = [$prop->iri, $name, $prop->defaultType, $prop->context];
+    }
+  }
+  ksort($info);
+  return $info;
+}
+
+$lookup = f::iri_lookup();
+check($lookup !== null, "pojo/__iri__.inc.php is there");
+
+// The generated IRI_MAP has to be what the attributes would have given
+foreach(require \dpa\CLASSMAP as $class => $file){
+  if(!str_starts_with(substr(strrchr($class, '\\'), 1), 'C_') || !defined($class.'::IRI_MAP'))
+    continue;
+  $map = [];
+  foreach(f::getIRItoNameMap($class) as $key => $prop)
+    $map[$key] = [$prop->iri, $prop->name, $prop->defaultType, $prop->context];
+  check($map == attribute_map($class), "IRI_MAP of $class matches its attributes", $map, attribute_map($class));
+}
+
+// The type table has to agree with deriving the class from the IRI
+foreach($lookup['TYPES'] ?? [] as $iri => $class){
+  $fragment = explode('#', $iri, 2)[1] ?? null;
+  if($fragment === null)
+    continue;
+  check(f::lookup_type_by_iri($iri) === $class, "type table has $iri");
+  check(f::lookup_type_by_iri($iri, $fragment) === $class, "class derived from $iri is $class", f::lookup_type_by_iri($iri, $fragment));
+}
+
+// The precomputed tables of a context module have to resolve like the ones ContextHelper
+// computes itself, which it does as soon as anything else is in the context.
+foreach(array_unique(array_values($lookup['CONTEXTS'] ?? [])) as $module){
+  $meta = $module::META;
+  check(f::lookup_context($meta['CONTEXT']) === $meta, "context table has {$meta['CONTEXT']}");
+  $tables = new ContextHelper($meta['CONTEXT']);
+  $computed = (new ContextHelper())->merge($meta['CONTEXT'], [['x-check' => 'urn:x-check:']]);
+  $iris = [];
+  foreach(array_keys($meta['MAPPING'] + $meta['MAPPING_EXT']) as $key){
+    $key = (string)$key;
+    $iri = $tables->key2iri($key);
+    check($iri === $computed->key2iri($key), "key2iri($key) in {$meta['CONTEXT']}", $iri, $computed->key2iri($key));
+    $iris[] = $iri;
+    $iris[] = $iri.'x-check';
+  }
+  foreach($iris as $iri){
+    $a = [];
+    $b = [];
+    check($tables->iri2key($iri, $a) === $computed->iri2key($iri, $b) && $a == $b, "iri2key($iri) in {$meta['CONTEXT']}", [$tables->iri2key($iri), $a], [$computed->iri2key($iri), $b]);
+  }
+}
+
+$documents = [
+  '{
+    "@context": ["https://www.w3.org/ns/activitystreams", "https://w3id.org/security/v1"],
+    "type": "Person",
+    "id": "https://example.com/users/alice",
+    "inbox": "https://example.com/users/alice/inbox",
+    "outbox": "https://example.com/users/alice/outbox",
+    "preferredUsername": "alice",
+    "published": "2022-12-28T00:00:00Z",
+    "icon": [
+      {"type": "Link", "http://www.w3.org/ns/activitystreams#href": "https://example.com/a.png"},
+      {"@context": "http://www.w3.org/ns/activitystreams", "@type": "http://www.w3.org/ns/activitystreams#Link", "href": "https://example.com/b.png"},
+      "https://example.com/c.png"
+    ],
+    "publicKey": {
+      "id": "https://example.com/users/alice#main-key",
+      "owner": "https://example.com/users/alice",
+      "publicKeyPem": "-----BEGIN PUBLIC KEY-----\nMIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAvXc4vkECU2/CeuSo1wtn\n-----END PUBLIC KEY-----\n"
+    }
+  }',
+  '{
+    "@context": ["https://www.w3.org/ns/activitystreams", {"toot": "http://joinmastodon.org/ns#", "Emoji": "toot:Emoji"}],
+    "id": "https://example.com/@alice/hello-world",
+    "type": "Note",
+    "content": "Hello world :kappa:",
+    "tag": [{
+      "id": "https://example.com/emoji/123",
+      "type": "Emoji",
+      "name": ":kappa:",
+      "icon": {"type": "Image", "mediaType": "image/png", "url": "https://example.com/files/kappa.png"}
+    }],
+    "attachment": [{"type": "Image", "mediaType": "image/png", "url": "https://example.com/files/cats.png"}]
+  }',
+  '{
+    "@context": "https://www.w3.org/ns/activitystreams",
+    "type": "Collection",
+    "totalItems": 2,
+    "items": ["https://example.com/1", {"type": "Link", "href": "https://example.com/2", "width": 3}]
+  }',
+];
+
+// fromArray(toArray(x)) has to give back x, through the generated code and the generic helpers alike
+foreach($documents as $i => $json){
+  $object = f::fromArray(json_decode($json, true));
+  check($object !== null, "document $i deserializes");
+  if(!$object)
+    continue;
+  $array = $object->toArray();
+  check($array == f::toArrayHelper($object), "toArray of document $i is what f::toArrayHelper gives", $array, f::toArrayHelper($object));
+  $again = f::fromArray($array);
+  check($again !== null && $again->toArray() == $array, "document $i round-trips through fromArray", $array, $again?->toArray());
+  $class = get_class($object);
+  $helper = new $class();
+  f::fromArrayHelper($helper, $array);
+  check($helper->toArray() == $array, "document $i round-trips through f::fromArrayHelper", $array, $helper->toArray());
+}
+
+// What the generated setters make of values, and what they reject
+function fails(callable $f) : bool {
+  try {
+    $f();
+  } catch(\Exception $e) {
+    return str_starts_with($e->getMessage(), 'Constraint failed: ');
+  }
+  return false;
+}
+$object = new \dpa\pojo\www_w3_org\ns\activitystreams\C_Object();
+$object->set_published('2022-12-28T00:00:00Z');
+check($object->get_published() instanceof \DateTimeInterface, "a string is constructed into the class of the range");
+$object->set_published(null);
+check($object->get_published() === null, "null stays null, it isn't the current time");
+$object->set_url('https://example.com/', new \dpa\pojo\www_w3_org\ns\activitystreams\C_Link());
+check(get_class($object->get_url()[0]) === \dpa\pojo\www_w3_org\_2001\XMLSchema\C_anyURI::class, "of several classes a string becomes the first one", $object->get_url());
+check($object->get_url()[1] instanceof \dpa\pojo\www_w3_org\ns\activitystreams\C_Link, "anything else is kept as it is", $object->get_url());
+$object->set_accuracy(100.0);
+check(fails(fn() => $object->set_accuracy(100.5)), "a value beyond the facets of the range is rejected");
+check(fails(fn() => (new \dpa\pojo\www_w3_org\ns\activitystreams\C_Link())->set_width(-1)), "a negative xsd:nonNegativeInteger is rejected");
+
+check_done();
@@ -0,0 +1,91 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/check.inc.php';
+
+use dpa\jsonld\f;
+use dpa\jsonld\ContextHelper;
+
+function cache() : array {
+  return (new \ReflectionProperty(ContextHelper::class, 'cache'))->getValue();
+}
+
+function cache_key(array $context) : string {
+  return json_encode($context, JSON_UNESCAPED_SLASHES);
+}
+
+// A hit reuses the resolved instance and makes it the most recently used one
+$a = [['x-a' => 'urn:x-a:']];
+$b = [['x-b' => 'urn:x-b:']];
+(new ContextHelper())->merge($a);
+$resolved = cache()[cache_key($a)] ?? null;
+check($resolved !== null, "a resolved context is cached");
+(new ContextHelper())->merge($b);
+$count = count(cache());
+$helper = (new ContextHelper())->merge($a);
+check(count(cache()) === $count, "a hit doesn't add an entry");
+check((cache()[cache_key($a)] ?? null) === $resolved, "a hit reuses the cached instance");
+check(array_key_last(cache()) === cache_key($a), "a hit makes the entry the most recently used");
+
+// What is merged into a helper afterwards doesn't leak into the cached instance
+$helper->merge([['x-c' => 'urn:x-c:']]);
+check($helper->key2iri('x-c') === 'urn:x-c:', "the helper has what was merged into it");
+check(!isset($resolved->mapping_ext['x-c']), "the cached instance is left as it was");
+
+// Evictions drop the least recently used entry, and keep the size bounded
+for($i=0; $i<ContextHelper::CACHE_SIZE; $i++)
+  (new ContextHelper())->merge([["x-$i" => "urn:x-$i:"]]);
+check(count(cache()) === ContextHelper::CACHE_SIZE, "the cache holds at most CACHE_SIZE entries", count(cache()));
+check(!isset(cache()[cache_key($a)]), "the least recently used entry was evicted");
+(new ContextHelper())->merge([['x-0' => 'urn:x-0:']]);
+(new ContextHelper())->merge([['x-new' => 'urn:x-new:']]);
+check(count(cache()) === ContextHelper::CACHE_SIZE, "the cache stays at CACHE_SIZE entries", count(cache()));
+check(isset(cache()[cache_key([['x-0' => 'urn:x-0:']])]), "an entry used again isn't evicted next");
+check(!isset(cache()[cache_key([['x-1' => 'urn:x-1:']])]), "the entry used longest ago is evicted instead");
+
+// Contexts which differ only in the order of their terms are cached apart, each picks its own first term
+$ab = [['x-first' => 'urn:x-same:', 'x-second' => 'urn:x-same:']];
+$ba = [['x-second' => 'urn:x-same:', 'x-first' => 'urn:x-same:']];
+check((new ContextHelper())->merge($ab)->iri2key('urn:x-same:') === 'x-first', "the first of two terms with the same IRI is used");
+check((new ContextHelper())->merge($ba)->iri2key('urn:x-same:') === 'x-second', "the same terms in another order give the other one");
+check(isset(cache()[cache_key($ab)], cache()[cache_key($ba)]), "both orders have their own entry");
+
+// What json_encode can't encode is resolved, but not cached
+$count = count(cache());
+$last = array_key_last(cache());
+$helper = (new ContextHelper())->merge([["x-\xff" => 'urn:x-invalid:']]);
+check($helper->key2iri("x-\xff") === 'urn:x-invalid:', "a context that can't be encoded is still resolved");
+check(count(cache()) === $count && array_key_last(cache()) === $last, "a context that can't be encoded isn't cached");
+
+$documents = [
+  ['type' => 'Note', 'content' => 'first'],
+  ['@context' => 'https://www.w3.org/ns/activitystreams', 'type' => 'Link', 'href' => 'https://example.com/'],
+  'not a document',
+  ['type' => 'NoSuchType'],
+  ['type' => 'Note', 'content' => 'last', 'tag' => [['type' => 'Mention', 'href' => 'https://example.com/users/bob']]],
+];
+$context = 'https://www.w3.org/ns/activitystreams';
+
+function as_array(?\dpa\jsonld\POJO $o) : mixed {
+  return $o?->toArray();
+}
+
+// The batch has to give what fromArray gives for each document on its own
+$batch = iterator_to_array(f::fromArrayBatch($documents, $context));
+check(array_keys($batch) === array_keys($documents), "the batch keeps the keys", array_keys($batch));
+foreach($documents as $i => $document){
+  $expected = is_array($document) ? as_array(f::fromArray($document, $context)) : null;
+  check(as_array($batch[$i] ?? null) == $expected, "batch item $i is what fromArray gives", as_array($batch[$i] ?? null), $expected);
+}
+
+// A malformed line in the middle gives null for that line, and the rest still comes through
+$stream = fopen('php://memory', 'w+b');
+fwrite($stream, json_encode($documents[0])."\n\n{\"type\": \"Note\", \"con\n".json_encode($documents[4])."\n");
+rewind($stream);
+$lines = iterator_to_array(f::fromNDJSON($stream, $context));
+check(count($lines) === 3, "empty lines are skipped, the malformed one isn't", count($lines));
+check(as_array($lines[0] ?? null) == as_array(f::fromArray($documents[0], $context)), "the line before the malformed one");
+check(array_key_exists(1, $lines) && $lines[1] === null, "the malformed line gives null");
+check(as_array($lines[2] ?? null) == as_array(f::fromArray($documents[4], $context)), "the line after the malformed one");
+
+check_done();
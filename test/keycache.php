@@ -0,0 +1,110 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/check.inc.php';
+
+use dpa\crypto\KeyCache;
+use dpa\crypto\FileKeyStore;
+use dpa\crypto\APCuKeyStore;
+use dpa\http\HTTPDoc;
+use dpa\http\VerificationResult;
+
+function new_key() : array {
+  $private = openssl_pkey_new(['private_key_bits' => 2048, 'private_key_type' => OPENSSL_KEYTYPE_RSA]);
+  return [$private, openssl_pkey_get_details($private)['key']];
+}
+
+function signed_request(\OpenSSLAsymmetricKey $private, string $keyId) : HTTPDoc {
+  $date = gmdate('D, d M Y H:i:s \G\M\T');
+  openssl_sign("(request-target): post /inbox\nhost: example.com\ndate: $date", $signature, $private, OPENSSL_ALGO_SHA256);
+  return new HTTPDoc('POST', '/inbox', '', [
+    'Host' => 'example.com',
+    'Date' => $date,
+    'Signature' => 'keyId="'.$keyId.'",algorithm="rsa-sha256",headers="(request-target) host date",signature="'.base64_encode($signature).'"',
+  ]);
+}
+
+// rsa-sha256 is deprecated, so that's the best a valid signature gets here
+const GOOD = VerificationResult::VALID_BUT_INSECURE;
+
+[$private1, $pem1] = new_key();
+[$private2, $pem2] = new_key();
+$pems = ['one' => $pem1];
+$calls = 0;
+$lookup = function(string $keyId) use(&$pems, &$calls) : ?string {
+  $calls++;
+  return $pems[$keyId] ?? null;
+};
+$directory = sys_get_temp_dir() . '/dpa-keycache-check-' . getmypid();
+
+// Hit: fetched once, then from memory, then from the store in another instance
+$store = new FileKeyStore($directory);
+$cache = new KeyCache($lookup, $store);
+check(count($cache->get('one')) === 1, "the key is found");
+$cache->get('one');
+check($calls === 1, "a second get is a hit", $calls);
+check(signed_request($private1, 'one')->verify($cache) === GOOD, "a signature by the cached key verifies");
+check($calls === 1, "verifying with a cached key doesn't look it up again", $calls);
+$other = new KeyCache($lookup, $store);
+check(count($other->get('one')) === 1 && $calls === 1, "another instance gets the key from the store", $calls);
+
+// Miss: the failed lookup is cached too, and not retried right away
+$calls = 0;
+check($cache->get('nobody') === [], "an unknown keyId has no keys");
+$cache->get('nobody');
+check($calls === 1, "a miss is cached", $calls);
+check($store->get('nobody')['pem'] === null, "the miss is in the store");
+check(signed_request($private1, 'nobody')->verify($cache) === VerificationResult::INVALID, "a signature with an unknown keyId is invalid");
+check($calls === 1, "a failed verification right after the lookup doesn't look it up again", $calls);
+
+// Stale: an expired entry in the store is fetched again
+$calls = 0;
+$store->set('one', ['pem' => $pem2, 'fetched' => time() - 200, 'expires' => time() - 100]);
+$fresh = new KeyCache($lookup, $store);
+check(signed_request($private1, 'one')->verify($fresh) === GOOD, "an expired entry is fetched again");
+check($calls === 1, "the expired entry was fetched once", $calls);
+check($store->get('one')['pem'] === $pem1 && $store->get('one')['expires'] > time(), "the store has the new entry");
+
+// Rotation: the old key is still cached, but the keys were fetched long enough ago to look again
+$calls = 0;
+$pems['one'] = $pem2;
+$store->set('one', ['pem' => $pem1, 'fetched' => time() - 120, 'expires' => time() + 3600]);
+$rotated = new KeyCache($lookup, $store, min_refresh_interval: 60);
+check(signed_request($private2, 'one')->verify($rotated) === GOOD, "a signature by the rotated key verifies");
+check($calls === 1, "the rotated key was fetched once", $calls);
+check(signed_request($private2, 'one')->verify($rotated) === GOOD && $calls === 1, "the rotated key is cached afterwards", $calls);
+
+// Bounded: signatures no key matches don't cause a lookup each time
+$calls = 0;
+$bounded = new KeyCache($lookup, null, min_refresh_interval: 60);
+for($i=0; $i<5; $i++)
+  check(signed_request($private1, 'one')->verify($bounded) === VerificationResult::INVALID, "a signature by a key that isn't there anymore is invalid");
+check($calls === 1, "bad signatures don't refetch within min_refresh_interval", $calls);
+check($bounded->refresh('one') === null, "refresh refuses within min_refresh_interval");
+$eager = new KeyCache($lookup, null, min_refresh_interval: 0);
+$eager->get('one');
+$calls = 0;
+check(count($eager->refresh('one') ?? []) === 1 && $calls === 1, "refresh fetches again once the interval passed", $calls);
+
+array_map('unlink', glob("$directory/*"));
+rmdir($directory);
+
+// The APCu store, if there is APCu
+if(function_exists('apcu_enabled') && apcu_enabled()){
+  $apcu = new APCuKeyStore('dpa.crypto.key.check.' . getmypid() . '.');
+  check($apcu->get('one') === null, "APCu: nothing there at first");
+  $entry = ['pem' => $pem1, 'fetched' => time(), 'expires' => time() + 60];
+  $apcu->set('one', $entry);
+  check($apcu->get('one') === $entry, "APCu: an entry comes back as it was stored");
+  $calls = 0;
+  $pems['one'] = $pem1;
+  $first = new KeyCache($lookup, $apcu);
+  $second = new KeyCache($lookup, $apcu);
+  check(count($first->get('one')) === 1 && count($second->get('one')) === 1 && $calls === 0, "APCu: the stored entry is a hit", $calls);
+  $apcu->set('one', ['pem' => $pem1, 'fetched' => time() - 200, 'expires' => time() - 100]);
+  check(count((new KeyCache($lookup, $apcu))->get('one')) === 1 && $calls === 1, "APCu: an expired entry is fetched again", $calls);
+}else{
+  fwrite(STDERR, "APCu isn't enabled, skipping the APCuKeyStore checks\n");
+}
+
+check_done();
@@ -0,0 +1,25 @@
+#!/bin/bash
+
+. "$(dirname -- "${BASH_SOURCE[0]}")/../script/env"
+
+set -x
+[ OK = "$(python3 test/mkphpclass_cache.py)" ]
+[ OK = "$(python3 test/mkphpclass_incremental.py)" ]
+[ OK = "$(python3 test/mkphpclass_jobs.py)" ]
+[ OK = "$(python3 test/mkphpclass_index.py)" ]
+[ OK = "$(python3 test/mkphpclass_hierarchy.py)" ]
+[ OK = "$(python3 test/mkphpclass_classmap.py)" ]
+[ OK = "$(python3 test/mkphpclass_irimap.py)" ]
+[ OK = "$(python3 test/mkphpclass_specialize.py)" ]
+[ OK = "$(python3 test/mkphpclass_lookup.py)" ]
+[ OK = "$(python3 test/mkphpclass_sqlindex.py)" ]
+[ OK = "$(python3 test/mkphpclass_flat.py)" ]
+[ OK = "$(python3 test/mkphpclass_partition.py)" ]
+[ OK = "$(python3 test/mkphpclass_bulk.py)" ]
+[ OK = "$(python3 test/mkphpclass_migration.py)" ]
+[ OK = "$(python3 test/mkphpclass_ids.py)" ]
+[ OK = "$(python3 test/mkphpclass_stats.py)" ]
+[ OK = "$(python3 test/mkphpclass_root.py)" ]
+[ OK = "$(python3 test/mkphpclass_traits.py)" ]
+[ OK = "$(python3 test/mkphpclass_model.py)" ]
+[ OK = "$(python3 test/mkphpclass_deser.py)" ]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+def procedures(tree):
+  bulk = tree.read('pojo/bulk.sql')
+  res = {}
+  for name, body in re.findall(r'^DROP PROCEDURE IF EXISTS (`b [^`]*`);\nDELIMITER //\nCREATE PROCEDURE \1\(IN objects JSON\)\nBEGIN\n(.*?)^END //\nDELIMITER ;\n', bulk, re.M | re.S):
+    res[name] = body
+  check(bulk.count('CREATE PROCEDURE') == len(res), "every procedure is complete")
+  return res
+
+def inserts(body):
+  return re.findall(r'^  INSERT INTO (`t [^`]*`) \(`created`,`id`((?:,`[^`]*`)*)\)$', body, re.M)
+
+def ancestors(model, table):
+  parents = re.findall(r'^FOREIGN KEY \(`created`,`id`\) REFERENCES (`t [^`]*`)', '\n'.join(model['tables'][table]['constraints']), re.M)
+  return [a for p in parents for a in ancestors(model, p)] + [table]
+
+tree = Tree()
+tree.run()
+model = json.loads(tree.read('pojo/schema.json'))
+bulk = procedures(tree)
+check(sorted(bulk) == sorted('`b ' + t[3:] for t in model['tables']), "every class with a table has a procedure", sorted(bulk))
+
+for name, body in bulk.items():
+  table = '`t ' + name[3:]
+  iri = name[3:-1]
+  check(f'  DECLARE v_type INT DEFAULT {model["ids"][iri]};\n' in body, f"{name} stores the id of its type in version")
+  # The table of every ancestor, each before those that derive from it
+  got = inserts(body)
+  tables = [t for t, columns in got]
+  check(sorted(tables) == sorted(set(ancestors(model, table))), f"{name} inserts into the tables of the class and its ancestors", tables)
+  check(all(tables.index(a) <= tables.index(t) for t in tables for a in ancestors(model, t)), f"{name} inserts into the tables of the parents first", tables)
+  for t, columns in got:
+    check(sorted(re.findall('`[^`]*`', columns)) == sorted(model['tables'][t]['columns']), f"{name} sets every column of {t}", columns)
+  # Everything is read from the JSON in one go
+  read = re.findall(r'^      (`[^`]*`) (.*) PATH \'\$\."(.*)"\',?$', body, re.M)
+  check(read[0] == ('`@id`', 'VARCHAR(512)', '@id'), f"{name} reads the IRI of the objects", read[0])
+  check(sorted(c for c, t, p in read[1:]) == sorted({c for t, columns in got for c in re.findall('`[^`]*`', columns)}), f"{name} reads every column", read)
+  check(all(c == '`' + p + '`' for c, t, p in read), f"{name} reads each column from the member of the same name")
+  # References are IRIs in the JSON, and get an id if they don't have one yet
+  for c, t, p in read[1:]:
+    if c.startswith('`* '):
+      check(t == 'VARCHAR(512)', f"{name} reads the IRI of {c}")
+      check(f'  INSERT IGNORE INTO `id` (`uri`) SELECT {c} FROM `bulk` WHERE {c} IS NOT NULL;\n' in body, f"{name} creates ids for {c}")
+      check(re.search(r'`(r\d+)`\.`id` AS ' + re.escape(c) + '.* LEFT JOIN `id` AS `\\1` ON `\\1`.`uri` = `bulk`.' + re.escape(c), body), f"{name} looks up the id of {c}")
+  check(body.index('INSERT IGNORE INTO `id`') < body.index('INSERT IGNORE INTO `version`') < body.index('INSERT INTO `t '), f"{name} creates the ids and the version first")
+  check(body.count('ON DUPLICATE KEY UPDATE') == len(got), f"{name} updates what's already there")
+check(len(inserts(bulk['`b https://example.org/ns/test#Note`'])) == 5, "a Note is stored in five tables")
+
+# In the flat layout, there's only the table of the class itself
+tree.run('--sql-layout', 'flat')
+flat = json.loads(tree.read('pojo/schema.json'))
+for name, body in procedures(tree).items():
+  table = '`t ' + name[3:]
+  got = inserts(body)
+  check([t for t, columns in got] == [table], f"{name} inserts only into {table} in the flat layout", got)
+  check(sorted(re.findall('`[^`]*`', got[0][1])) == sorted(flat['tables'][table]['columns']), f"{name} sets every column of {table} in the flat layout")
+
+check_done()
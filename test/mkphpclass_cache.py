@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+from check import *
+
+tree = Tree()
+
+# The first run parses, the second one loads what the first one cached
+out = tree.run()
+check('parsing file: vocab/test.ttl' in out, "the first run parses the vocabulary", out)
+first = tree.files()
+check(len(list(tree.path.glob('build/cache/vocab/*.pickle'))) == 2, "each vocabulary is cached")
+out = tree.run()
+check('loading cached file: vocab/test.ttl' in out and 'parsing file' not in out, "the second run uses the cache", out)
+check(tree.files() == first, "the output is the same from the cache")
+
+# --no-cache parses, a changed vocabulary is parsed again, and --clear-cache empties the cache
+out = tree.run('--no-cache')
+check('parsing file: vocab/test.ttl' in out, "--no-cache parses the vocabulary", out)
+tree.write('vocab/test.ttl', tree.read('vocab/test.ttl') + '\n:Extra a owl:Class .\n')
+out = tree.run()
+check('parsing file: vocab/test.ttl' in out and 'loading cached file: vocab/ld.owl' in out, "only the changed vocabulary is parsed again", out)
+check(tree.exists('pojo/example_org/ns/test/Extra.inc.php'), "the change is in the output")
+tree.run('--clear-cache', '--no-cache')
+check(not list(tree.path.glob('build/cache/vocab/*')), "--clear-cache empties the cache")
+
+check_done()
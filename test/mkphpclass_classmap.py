@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+files = tree.files()
+
+def php_array(content):
+  return {json.loads(k): json.loads(v) for k, v in re.findall(r'^  ("(?:[^"\\]|\\.)*") => ("(?:[^"\\]|\\.)*"),$', content, re.M)}
+
+classmap = php_array(tree.read('pojo/__classmap__.inc.php'))
+generated = [f for f in files if f.endswith('.inc.php') and not os.path.basename(f).startswith('__classmap__') and not os.path.basename(f).startswith('__iri__')]
+check(set(classmap.values()) == set(generated), "every generated file is in the classmap, and nothing else", set(classmap.values()) ^ set(generated))
+
+# Everything declared in a file is mapped to it
+for f in generated:
+  content = files[f].decode()
+  namespace = re.search(r'^namespace (\S+);$', content, re.M).group(1)
+  declared = {namespace + '\\' + name for name in re.findall(r'^(?:abstract class|class|interface|trait) (\w+)', content, re.M)}
+  check(declared and {x for x in declared if classmap.get(x) == f} == declared, f"what {f} declares is in the classmap", declared - {x for x in classmap if classmap[x] == f})
+
+# An overridden type's file loads the override, which has the I_ and C_ classes
+p = 'dpa\\pojo\\www_w3_org\\_2001\\XMLSchema\\'
+anyuri = 'pojo/www_w3_org/_2001/XMLSchema/anyURI.inc.php'
+check(all(classmap.get(p + x + '_anyURI') == anyuri for x in 'IDCA'), "the I_, D_, C_ and A_ classes of an overridden type are in the classmap")
+check('\\dpa\\load("lib/override/xsd.php");' in files[anyuri].decode(), "the file of an overridden type loads the override")
+
+t = 'dpa\\pojo\\example_org\\ns\\test\\'
+check(classmap.get(t + '__module__') == 'pojo/example_org/ns/test/__module__.inc.php', "the context module is in the classmap")
+check(classmap.get(t + 'T_Note') == 'pojo/example_org/ns/test/Note.inc.php', "traits are in the classmap")
+check(t + 'T_Other' in classmap and t + 'T_Thing' in classmap, "every class with properties of its own has a trait")
+
+preload = tree.read('pojo/__preload__.php')
+check("require_once __DIR__ . '/../lib/loader.inc.php';" in preload and "require __DIR__ . '/__classmap__.inc.php'" in preload, "the preload script loads everything in the classmap")
+
+check_done()
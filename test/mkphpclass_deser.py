@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import re
+from check import *
+from mkphpclass import xsdPatternToPCRE
+
+tree = Tree()
+tree.run()
+code = {f: content.decode() for f, content in tree.files().items() if f.endswith('.inc.php')}
+xsd = '\\dpa\\pojo\\www_w3_org\\_2001\\XMLSchema\\'
+
+def deser(name):
+  for content in code.values():
+    m = re.search(r'^  private static function deser_' + name + r'\(mixed \$v\) : mixed \{\n(.*?)^  \}\n', content, re.M | re.S)
+    if m:
+      return m[1]
+  return None
+
+def setter(name):
+  for content in code.values():
+    m = re.search(r'^  public function set_' + name + r'\(.*\{ (.*) \}$', content, re.M)
+    if m:
+      return m[1]
+  return None
+
+# Only strings are constructed, so null and objects are kept as they are
+published = deser('published')
+check(published is not None and published.startswith('    if(is_string($v))\n      $v = new ' + xsd + 'C_dateTime($v);\n'), "a string is constructed into the class of the range", published)
+check(all('new ' not in m or 'if(is_string($v))\n      $v = new ' in m for m in map(deser, ['published', 'link', '_id'])), "nothing but strings is constructed")
+check('f::deser(' not in ''.join(code.values()), "no setter goes through f::deser anymore")
+check(setter('name') == '$this->var_name = $value;', "a property without anything to check is assigned as it is", setter('name'))
+
+# Of several classes, strings become the first one
+link = deser('link')
+check(link is not None and link.startswith('    if(is_string($v))\n      $v = new ' + xsd + 'C_anyURI($v);\n'), "a string becomes the first of the classes of the range", link)
+check(link is not None and '$v instanceof \\DateTimeInterface && !' + xsd + 'C_dateTime::fixup($v)' in link, "the modifiers of the other classes still apply", link)
+check(setter('link') == '$this->var_link = array_map(self::deser_link(...), \\dpa\\jsonld\\f::array_flatten($value));', "array properties map the values through it", setter('link'))
+
+# Facets are compared directly, behind a test for the type they belong to
+check(deser('rating') == "    if(is_int($v) && !($v >= 0 && $v <= 100))\n      \\dpa\\jsonld\\f::constraint_failed('https://example.org/ns/test#rating', $v);\n    return $v;\n", "owl:withRestrictions is checked", deser('rating'))
+check(deser('replies') == "    if(is_int($v) && !($v >= 0))\n      \\dpa\\jsonld\\f::constraint_failed('https://example.org/ns/test#replies', $v);\n    return $v;\n", "the range of a derived xsd integer type is checked", deser('replies'))
+check(deser('code') is not None and "preg_match('/^(?:[A-Z]{2}\\\\p{Nd}+)$/Du', $v)" in deser('code'), "an xsd:pattern is translated for PCRE", deser('code'))
+
+# XSD regular expressions have no anchors, and their escapes are Unicode aware
+check(xsdPatternToPCRE('\\d+') == '\\p{Nd}+', "\\d is any decimal digit", xsdPatternToPCRE('\\d+'))
+check(xsdPatternToPCRE('^a$') == '\\^a\\$', "^ and $ match themselves", xsdPatternToPCRE('^a$'))
+check(xsdPatternToPCRE('[^a]') == '[^a]', "^ still negates a character class", xsdPatternToPCRE('[^a]'))
+check(xsdPatternToPCRE('\\p{IsBasicLatin}') is None, "block escapes PCRE doesn't have aren't translated")
+
+check_done()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+normalized = json.loads(tree.read('pojo/schema.json'))
+tree.run('--sql-layout', 'flat')
+flat = json.loads(tree.read('pojo/schema.json'))
+check(normalized['tables'].keys() == flat['tables'].keys() and normalized['views'].keys() == flat['views'].keys(), "the flat layout has the same tables and views")
+
+# The parents of a table are what its foreign keys reference in the normalized layout
+def parents(table):
+  return re.findall(r'^FOREIGN KEY \(`created`,`id`\) REFERENCES (`t [^`]*`)', '\n'.join(normalized['tables'][table]['constraints']), re.M)
+def ancestors(table):
+  return {table}.union(*(ancestors(p) for p in parents(table)))
+
+for table, t in flat['tables'].items():
+  inherited = {}
+  for a in ancestors(table):
+    inherited.update(normalized['tables'][a]['columns'])
+  check(t['columns'] == inherited, f"{table} has the columns of all its ancestors", sorted(t['columns']), sorted(inherited))
+  inherited = {}
+  for a in ancestors(table):
+    inherited.update(normalized['tables'][a]['indexes'])
+  check(t['indexes'] == inherited, f"{table} has the indexes of all its ancestors", t['indexes'], inherited)
+  check(not [c for c in t['constraints'] if 'REFERENCES `t ' in c], f"{table} references no other table", t['constraints'])
+  check('REFERENCES `version`' in t['constraints'][0], f"{table} still references version")
+check(len(ancestors('`t https://example.org/ns/test#Note`')) == 5, "Note has all its ancestors")
+
+# A view reads one table per class, and is the union of those of the class and what derives from it
+select = r'SELECT\n((?:  .*,?\n)*)FROM (`t [^`]*`) as `t0`\n((?:  .*\n)*)'
+for view, d in flat['views'].items():
+  table = '`t ' + view[3:]
+  parts = re.findall(select, d)
+  tables = {p[1] for p in parts}
+  expected = {t for t in flat['tables'] if table in ancestors(t)}
+  check(tables == expected, f"{view} reads every table of the class and what derives from it", tables, expected)
+  check(d.count('\nUNION ALL\n') == len(parts) - 1, f"{view} is a UNION ALL")
+  columns = [re.sub(r'^`t\d+`\.', '', c.strip().rstrip(',')) for c in parts[0][0].splitlines()]
+  expected = [re.sub(r'^`t\d+`\.', '', c.strip().rstrip(',')) for c in re.search(select, normalized['views'][view])[1].splitlines()]
+  check(sorted(columns) == sorted(expected), f"{view} has the same columns as in the normalized layout", columns, expected)
+  for p in parts:
+    check(p[0] == parts[0][0], f"every part of {view} selects the same columns")
+    check(p[2] == '  INNER JOIN `id` ON `t0`.`id` = `id`.`id`\n  INNER JOIN `version` ON `t0`.`created` = `version`.`created` AND `t0`.`id` = `version`.`id`\n', f"{view} only joins id and version", p[2])
+
+# The rest stays as it is
+check(flat['ids'] == normalized['ids'] and flat['triggers'] == normalized['triggers'], "the ids and triggers are the same")
+check(tree.read('pojo/schema.sql').startswith(open(base / 'base.sql').read()), "the id and version tables are still there")
+
+check_done()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+from check import *
+from rdflib import URIRef
+
+r = Tree().registry()
+classes = [*r.classes.values()]
+
+def cls(name):
+  return r.classes[URIRef(ns + name)]
+
+# What the memoized results have to be, worked out the slow way
+def ancestors(c):
+  res = set()
+  todo = [*c.implements]
+  while todo:
+    x = todo.pop()
+    if x not in res and x is not c:
+      res.add(x)
+      todo += x.implements
+  return res
+
+def properties(c):
+  res = {}
+  for x in [*ancestors(c), c]:
+    res.update(x.property)
+  return res
+
+for c in classes:
+  check(set(c.getAncestors()) == ancestors(c), f"ancestors of {c.uri}", set(c.getAncestors()), ancestors(c))
+  check(set(c.getDescendants()) == {x for x in classes if c in ancestors(x)}, f"descendants of {c.uri}", {x.uri for x in c.getDescendants()}, {x.uri for x in classes if c in ancestors(x)})
+  check(c.getAllProperties().keys() == properties(c).keys(), f"properties of {c.uri}", sorted(c.getAllProperties()), sorted(properties(c)))
+  check('ancestors' in c.memo and 'descendants' in c.memo and ('properties', False) in c.memo, f"the results for {c.uri} are memoized", c.memo.keys())
+
+check(set(cls('Note').getAncestors()) == {cls('Post'), cls('Named'), cls('Dated'), cls('Thing')}, "Note has all of its ancestors")
+check({c for c in cls('Thing').getDescendants() if c.kind == 'class'} == {cls('Named'), cls('Dated'), cls('Post'), cls('Note')}, "Thing has all of its descendants")
+check(not cls('Other').getDescendants() and not cls('Other').getAncestors(), "Other is on its own")
+check(cls('Post').getConstituents({'derived'}) == {cls('Post'), cls('Note')}, "derived constituents include the subclasses")
+
+# Where two ancestors have the same property, the one declaring it last wins, as before
+owners = cls('Note').getAllProperties(True)
+check(owners[URIRef(ns + 'label')][0] is cls('Named'), "the label of Note is the one of Named", owners[URIRef(ns + 'label')][0].uri)
+check(owners[URIRef(ns + 'rating')][0] is cls('Note'), "Note declares rating itself")
+
+# The memoized results are also a copy for the callers which change them
+constituents = cls('Note').getConstituents()
+constituents.add(cls('Other'))
+check(cls('Other') not in cls('Note').getConstituents(), "changing the constituents a caller got doesn't change the memoized ones")
+
+check_done()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import re
+import shutil
+import hashlib
+from check import *
+
+def iri_ids(tree):
+  lookup = tree.read('pojo/__iri__.inc.php')
+  ids = re.search(r'^  "IDS" => \[\n(.*?)^  \],$', lookup, re.M | re.S)[1]
+  return {json.loads(k): int(v) for k, v in re.findall(r'^    ("(?:[^"\\]|\\.)*") => (\d+),$', ids, re.M)}
+
+def variants(ids):
+  return {re.sub('^https?:', scheme, iri): n for iri, n in ids.items() for scheme in ['http:', 'https:']}
+
+def seeded(sql):
+  seed = re.search(r"^INSERT INTO `iri ids` \(`id`,`uri`\) VALUES\n(.*?);$", sql, re.M | re.S)
+  return {iri: int(n) for n, iri in re.findall(r"^  \((\d+), '(.*)'\),?$", seed[1], re.M)} if seed else {}
+
+def hashed(iri):
+  return int.from_bytes(hashlib.sha256(iri.encode()).digest()[:8], 'big') % ((1 << 24) - 2) + 2
+
+tree = Tree()
+tree.run()
+ids = json.loads(tree.read('vocab/ids.json'))
+schema = tree.read('pojo/schema.sql')
+check(variants(ids) == iri_ids(tree) and ids == json.loads(tree.read('pojo/schema.json'))['ids'] == seeded(schema), "the ids are the same in vocab/ids.json, the PHP code and the SQL schema", ids)
+check(ids[ns + 'Note'] == hashed(ns + 'Note'), "an IRI gets the id its hash gives")
+
+# A plain INSERT, so an id or IRI which is already there with another IRI or id fails it
+check(not re.search(r'INSERT IGNORE INTO `id` \(`id`', schema[len(open(base / 'base.sql').read()):]), "the ids aren't inserted with INSERT IGNORE")
+check('INSERT INTO `id` (`id`,`uri`)\n  SELECT `n`.`id`, `n`.`uri` FROM `iri ids` AS `n`\n  WHERE NOT EXISTS (SELECT 1 FROM `id` WHERE `id`.`id` = `n`.`id` AND `id`.`uri` = `n`.`uri`);\nDROP TEMPORARY TABLE `iri ids`;\nALTER TABLE `id` AUTO_INCREMENT = 16777216;\n' in schema, "only rows which are there as they are are left out")
+
+# What's generated can go, the ids stay
+shutil.rmtree(tree.path / 'pojo')
+shutil.rmtree(tree.path / 'build/cache')
+tree.run()
+check(iri_ids(tree) == variants(ids), "the ids are the same after a clean build")
+
+# New IRIs get new ids, ids of IRIs which are gone aren't given out again
+tree.write('vocab/test.ttl', tree.read('vocab/test.ttl').replace(':Other a owl:Class .\n', '').replace('rdfs:domain :Other ;', 'rdfs:domain :Note ;') + '\n:Extra a owl:Class .\n')
+tree.write('vocab/ids.json', json.dumps({**ids, ns + 'Gone': hashed(ns + 'Extra')}))
+tree.run()
+now = iri_ids(tree)
+check(ns + 'Other' not in now and ns + 'Gone' not in now, "IRIs which are gone have no id in the PHP code")
+check(all(now[iri] == n for iri, n in ids.items() if iri in now), "the other IRIs keep their ids")
+check(now[ns + 'Extra'] == hashed(ns + 'Extra') + 1, "a new IRI doesn't get an id which was given out before", now[ns + 'Extra'])
+saved = json.loads(tree.read('vocab/ids.json'))
+check(saved[ns + 'Other'] == ids[ns + 'Other'] and saved[ns + 'Gone'] == hashed(ns + 'Extra') and saved[ns + 'Extra'] == now[ns + 'Extra'], "vocab/ids.json keeps every id given out", saved)
+check(tree.read('vocab/ids.json') == json.dumps(saved, indent=0, sort_keys=True) + '\n', "vocab/ids.json is sorted, one id per line")
+
+# Those in the database win over those in vocab/ids.json
+database = json.loads(tree.read('pojo/schema.json'))
+database['ids'][ns + 'Note'] = 42
+tree.write('build/schema.json', json.dumps(database))
+out = tree.run('--sql-migrate-from', 'build/schema.json')
+check(f'<{ns}Note> has id 42 in build/schema.json, not {ids[ns + "Note"]} as in vocab/ids.json' in out, "a different id in the database is reported", out)
+check(iri_ids(tree)[ns + 'Note'] == 42 and json.loads(tree.read('vocab/ids.json'))[ns + 'Note'] == 42, "the id in the database is used")
+check(seeded(tree.read('pojo/migration.sql')) == {}, "the migration has no ids to add", tree.read('pojo/migration.sql'))
+
+# Two IRIs with the same id can't be, it fails instead of going on with one of them
+tree.write('vocab/ids.json', json.dumps({**saved, ns + 'Gone': saved[ns + 'Post']}))
+out = tree.run(ok=False)
+check(f"<{ns}Post> and <{ns}Gone> both have id {saved[ns + 'Post']}" in out, "two IRIs with the same id are reported", out)
+
+check_done()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import os
+from check import *
+
+note = 'pojo/example_org/ns/test/Note.inc.php'
+thing = 'pojo/example_org/ns/test/Thing.inc.php'
+other = 'pojo/example_org/ns/test/Other.inc.php'
+
+tree = Tree()
+tree.run('--incremental')
+first = tree.files()
+manifest = json.loads(tree.read('build/pojo.manifest.json'))
+check(sorted(manifest['files']) == sorted(first), "the manifest lists every generated file", sorted(manifest['files']))
+check(manifest['flags'] == {'specialize': False, 'sql-layout': 'normalized', 'sql-partition': False, 'root': []}, "the manifest has the flags", manifest['flags'])
+
+# Nothing changed, nothing written
+out = tree.run('--incremental')
+check(f'0 files written, {len(first)} unchanged, 0 removed' in out, "a second run writes nothing", out)
+check(tree.files() == first, "a second run gives the same files")
+
+# Files changed or removed by hand are written again, even if their size stays the same
+tree.write(note, tree.read(note).replace('class C_Note', 'class X_Note'))
+os.unlink(tree.path / thing)
+out = tree.run('--incremental')
+check('2 files written' in out, "the changed and the removed file are written again", out)
+check(tree.files() == first, "they are as generated again")
+
+# What isn't generated anymore is removed
+tree.write('vocab/test.ttl', tree.read('vocab/test.ttl').replace(':Other a owl:Class .', ''))
+out = tree.run('--incremental')
+check(not tree.exists(other), "the file of a class that's gone is removed", out)
+check(tree.exists(note), "the other files stay")
+
+# Other flags regenerate everything, and remove whatever else is in pojo/
+tree.write('pojo/stray.inc.php', '<?php\n')
+tree.run('--incremental', '--specialize')
+check(not tree.exists('pojo/stray.inc.php'), "a file the manifest doesn't know is removed when the flags change")
+check('public function toArray(\\dpa\\jsonld\\ContextHelper $context=null) : array {\n' in tree.read(note), "the files are generated with the new flags")
+check(json.loads(tree.read('build/pojo.manifest.json'))['flags']['specialize'], "the manifest has the new flags")
+tree.run('--incremental')
+check('f::toArrayHelper' in tree.read(note), "going back to the old flags regenerates the files too")
+
+# Without a manifest it's a full build, which gives the same as an incremental one
+fresh = Tree()
+fresh.write('vocab/test.ttl', tree.read('vocab/test.ttl'))
+fresh.run()
+check(fresh.files() == tree.files(), "an incremental build gives the same files as a full one")
+
+check_done()
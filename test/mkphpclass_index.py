@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+from check import *
+import mkphpclass
+from rdflib import Graph, URIRef, RDF
+from rdflib.collection import Collection
+
+# The index has to answer the queries the registry makes like an rdflib graph with the same triples would
+triples = mkphpclass.parse_vocab(str(base / 'test/fixture/test.ttl'))
+index = mkphpclass.Index()
+graph = Graph()
+for t in triples:
+  index.add(t)
+  graph.add(t)
+
+for s in {t[0] for t in triples}:
+  check(set(index.triples((s, None, None))) == set(graph.triples((s, None, None))), f"triples of {s}")
+  for p in {t[1] for t in triples if t[0] == s}:
+    check(set(index.triples((s, p, None))) == set(graph.triples((s, p, None))), f"objects of {s} {p}")
+for p, o in {(t[1], t[2]) for t in triples}:
+  check(set(index.triples((None, p, o))) == set(graph.triples((None, p, o))), f"subjects of {p} {o}")
+  check(set(index.subjects(p, o)) == set(graph.subjects(p, o)), f"subjects() of {p} {o}")
+check(list(index.triples((URIRef(ns + 'nothing'), None, None))) == [], "no triples of an unknown subject")
+check(list(index.subjects(RDF.type, URIRef(ns + 'nothing'))) == [], "no subjects of an unknown object")
+
+# In the order they were added, so the output doesn't depend on hash order
+classes = [s for s, p, o in triples if p == RDF.type and o == mkphpclass.owl_Class]
+check(list(index.subjects(RDF.type, mkphpclass.owl_Class)) == list(dict.fromkeys(classes)), "subjects come in the order they were added")
+
+# The members of the rdf:List of a union, like rdflib's Collection gives them
+unions = [o for s, p, o in triples if p == URIRef('http://www.w3.org/2002/07/owl#unionOf')]
+check(len(unions) == 2, "the fixture has two unions", unions)
+for first in unions:
+  check(list(mkphpclass.getRdfObjectList(index, first)) == list(Collection(graph, first)), f"the list at {first}")
+check(list(mkphpclass.getRdfObjectList(index, mkphpclass.rdf_nil)) == [], "rdf:nil is the empty list")
+
+check_done()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+files = {f: content.decode() for f, content in tree.files().items()}
+
+# What f::getIRItoNameMap collects from the #[Property] attributes, by reflection
+interfaces = {}
+constants = {}
+for f, content in files.items():
+  namespace = (re.search(r'^namespace (\S+);$', content, re.M) or [None, ''])[1]
+  for name, value in re.findall(r'^const (EC_\w+) = (.*);$', content, re.M):
+    constants[namespace + '\\' + name] = json.loads(value)
+  for name, extends, body in re.findall(r'^interface (\w+) extends ([^{]*) \{\n(.*?)^\}', content, re.M | re.S):
+    properties = re.findall(r'#\[\\dpa\\jsonld\\Property\((.*)\)\]\n  public function get_(\w+)\(', body)
+    interfaces[namespace + '\\' + name] = ([x.strip().lstrip('\\') for x in extends.split(',')], namespace, properties)
+
+def attribute_value(namespace, value):
+  value = re.sub(r'(EC_\w+)\[(\d+)\]', lambda m: json.dumps(constants[namespace + '\\' + m[1]][int(m[2])]), value)
+  return json.loads('[' + value + ']')
+
+def reflected(interface, res):
+  if interface not in interfaces:
+    return res
+  extends, namespace, properties = interfaces[interface]
+  for value, name in properties:
+    iri, default_type, contexts = attribute_value(namespace, value)
+    res[re.sub('^https?:', 'http?:', iri)] = [iri, name, default_type, contexts]
+  for parent in extends:
+    reflected(parent, res)
+  return res
+
+def iri_map(f, name):
+  content = files[f]
+  body = re.search(r'^(?:abstract )?class ' + name + r'\b.*?\n  const IRI_MAP = \[\n(.*?)^  \];$', content, re.M | re.S)[1]
+  return [(json.loads(k), json.loads(v)) for k, v in re.findall(r'^    ("(?:[^"\\]|\\.)*") => (.*),$', body, re.M)]
+
+count = 0
+for f, content in files.items():
+  namespace = (re.search(r'^namespace (\S+);$', content, re.M) or [None, ''])[1]
+  for name, implements in re.findall(r'^(?:abstract )?class ([CA]_\w+) implements (\S+) \{', content, re.M):
+    if 'const IRI_MAP' not in content:
+      continue
+    got = iri_map(f, name)
+    expected = reflected(namespace + '\\' + implements, {})
+    check(got == sorted(expected.items()), f"the IRI_MAP of {name} is what reflection on its attributes gives", got, sorted(expected.items()))
+    count += 1
+check(count >= 6, "every generated class has an IRI_MAP", count)
+
+t = 'pojo/example_org/ns/test/'
+note = dict(iri_map(t + 'Note.inc.php', 'C_Note'))
+check(note['http?://example.org/ns/test#published'] == [ns + 'published', 'published', 'http://www.w3.org/2001/XMLSchema#dateTime', [context]], "the IRI_MAP has the IRI, the name, the default type and the contexts", note)
+check(note['@id'] == ['@id', '_id', 'http://www.w3.org/2001/XMLSchema#anyURI', []], "keywords are kept as they are", note)
+check(note['http?://example.org/ns/test#link'][2] is None, "a property with more than one type has no default type", note)
+check([k for k, v in iri_map(t + 'Other.inc.php', 'C_Other')] == ['@id', 'http?://example.org/ns/test#other'], "classes only get their own properties", iri_map(t + 'Other.inc.php', 'C_Other'))
+
+check_done()
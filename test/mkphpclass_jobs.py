@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+from check import *
+
+# The workers only generate, the parent writes, in the same order. So the output can't differ.
+for flags in ([], ['--specialize', '--sql-layout', 'flat']):
+  serial = Tree()
+  serial.run('--no-cache', *flags)
+  parallel = Tree()
+  out = parallel.run('--no-cache', '--jobs', '3', *flags)
+  check('parsing file: vocab/test.ttl' in out, "the workers parse the vocabularies", out)
+  check(serial.files() == parallel.files(), "--jobs 3 gives the same files as --jobs 1 with " + ' '.join(flags or ['no flags']), sorted(set(serial.files().items()) ^ set(parallel.files().items())))
+
+  # The same goes for what they load from the cache
+  parallel.run('--jobs', '3', *flags)
+  out = parallel.run('--jobs', '3', *flags)
+  check('loading cached file: vocab/test.ttl' in out, "the workers load the cached vocabularies", out)
+  check(serial.files() == parallel.files(), "--jobs 3 gives the same files from the cache")
+
+check_done()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+files = {f: content.decode() for f, content in tree.files().items()}
+
+def php_array(content):
+  return {json.loads(k): json.loads(v) for k, v in re.findall(r'^    ("(?:[^"\\]|\\.)*") => ("(?:[^"\\]|\\.)*"),$', content, re.M)}
+
+lookup = files['pojo/__iri__.inc.php']
+types = php_array(re.search(r'^  "TYPES" => \[\n(.*?)^  \],$', lookup, re.M | re.S)[1])
+contexts = php_array(re.search(r'^  "CONTEXTS" => \[\n(.*?)^  \],$', lookup, re.M | re.S)[1])
+classmap = {json.loads(k) for k in re.findall(r'^  ("(?:[^"\\]|\\.)*") => ', files['pojo/__classmap__.inc.php'], re.M)}
+
+# How f::lookup_type_by_iri and f::lookup_context find the class without the table
+def by_name(iri, last):
+  m = re.match(r'^([^:]*:(//)?)([^#]*)(#(.*))?$', iri)
+  if not m or not m[3]:
+    return None
+  path = m[3].split('/' if m[2] else ':')
+  if last == 'C_' and m[5]:
+    path.append(m[5])
+  if last == 'C_' and len(path) != 1:
+    path[-1] = 'C_' + path[-1]
+  if last != 'C_':
+    path.append(last)
+  path = re.sub(r'[^a-zA-Z0-9_\x7f-\xff\\]', '_', '\\'.join(path))
+  path = re.sub(r'(\\)([0-9])', r'\1_\2', path)
+  return '\\dpa\\pojo\\' + path if 'dpa\\pojo\\' + path in classmap else None
+
+for iri, name in types.items():
+  check(by_name(iri, 'C_') == name, f"the table has the class lookup_type_by_iri would find for {iri}", name, by_name(iri, 'C_'))
+for iri, name in contexts.items():
+  check(by_name(iri, '__module__') == name, f"the table has the module lookup_context would find for {iri}", name, by_name(iri, '__module__'))
+
+# Every generated class, overridden or not, and every module, with its IRI in both forms
+expected = {}
+for f, content in files.items():
+  namespace = (re.search(r'^namespace (\S+);$', content, re.M) or [None, ''])[1]
+  for name, iri in re.findall(r'^interface [ID]_(\w+) extends [^{]*\{\n(?:  const NS = .*\n)?  const IRI = ("[^"]*");$', content, re.M):
+    iri = json.loads(iri)
+    if namespace + '\\C_' + name in classmap:
+      for scheme in ['http:', 'https:']:
+        expected[re.sub('^https?:', scheme, iri)] = '\\' + namespace + '\\C_' + name
+check(types == expected, "the table has every class there is", set(types.items()) ^ set(expected.items()))
+check(contexts == {'http://example.org/ns/test': '\\dpa\\pojo\\example_org\\ns\\test\\__module__', 'https://example.org/ns/test': '\\dpa\\pojo\\example_org\\ns\\test\\__module__'}, "the table has the context modules", contexts)
+check(types.get('http://example.org/ns/test#Note') == types.get('https://example.org/ns/test#Note') == '\\dpa\\pojo\\example_org\\ns\\test\\C_Note', "the http and https forms give the same class")
+
+check_done()
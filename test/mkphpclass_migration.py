@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+check(not tree.exists('pojo/migration.sql'), "without --sql-migrate-from there is no migration")
+
+# Nothing changed, nothing to do. The previous schema can be the one that gets replaced.
+tree.run('--sql-migrate-from', 'pojo/schema.json')
+check(tree.read('pojo/migration.sql') == '', "nothing changed gives an empty migration", tree.read('pojo/migration.sql'))
+old = json.loads(tree.read('pojo/schema.json'))
+
+ttl = tree.read('vocab/test.ttl')
+ttl = ttl.replace(':Other a owl:Class .\n', '')
+ttl = ttl.replace('rdfs:domain :Other ;', 'rdfs:domain :Note ;')
+ttl = ttl.replace('  rdfs:range xsd:nonNegativeInteger .', '  rdfs:range xsd:integer .')
+ttl = ttl.replace('  rdfs:range xsd:string ;\n  meta:index false .', '  rdfs:range xsd:string ;\n  meta:index true .')
+ttl += '\n:Event a owl:Class ; rdfs:subClassOf :Dated .\n:where a owl:ObjectProperty, owl:FunctionalProperty ;\n  rdfs:domain :Event ;\n  rdfs:range :Thing .\n'
+tree.write('vocab/test.ttl', ttl)
+tree.run('--sql-migrate-from', 'pojo/schema.json')
+new = json.loads(tree.read('pojo/schema.json'))
+migration = tree.read('pojo/migration.sql')
+check(migration, "there is a migration from the schema.json it replaces")
+t = '`t https://example.org/ns/test#'
+
+# New IRIs get their ids, the others are already there
+added = sorted(set(new['ids']) - set(old['ids']))
+check(added == [ns + 'Event', ns + 'where'], "only the new IRIs are added to id", added)
+check(all(f"({new['ids'][iri]}, '{iri}')" in migration for iri in added) and not any(f"'{iri}')" in migration for iri in old['ids']), "the migration adds their ids", migration)
+
+# New tables are created, new columns added, changed columns modified, nothing is dropped
+check(new['tables'][t + 'Event`']['create'] in migration, "the new table is created")
+check(f'ALTER TABLE {t}Event`\n  ADD FOREIGN KEY' in migration, "the foreign keys of the new table are added")
+note = re.search('^ALTER TABLE ' + re.escape(t) + r'Note`\n((?:  .*\n)*);$', migration, re.M)
+changes = note[1].splitlines() if note else []
+check(changes == [
+  '  ADD COLUMN `s https://example.org/ns/test#other` VARCHAR(512),',
+  '  MODIFY COLUMN `i https://example.org/ns/test#replies` BIGINT',
+], "a new column is added, and a changed one modified", changes)
+check(f'ALTER TABLE {t}Dated`\n  ADD INDEX `i s https://example.org/ns/test#summary` (`s https://example.org/ns/test#summary`)\n;' in migration, "a new index is added", migration)
+check(not re.search(r'DROP (TABLE|COLUMN)', migration), "tables and columns which are gone are kept")
+check(f'CREATE TABLE IF NOT EXISTS {t}Note`' not in migration and f'ALTER TABLE {t}Thing`' not in migration, "tables which are the same are left alone")
+
+# Views and triggers which changed are made again, those which are gone are dropped
+for name in ['`v https://example.org/ns/test#Note`', '`v https://example.org/ns/test#Event`']:
+  check(new['views'][name] in migration, f"{name} is made again")
+check(new['views']['`v https://example.org/ns/test#Thing`'] not in migration, "a view which didn't change is left alone")
+check('DROP VIEW IF EXISTS `v https://example.org/ns/test#Other`;\n' in migration and 'DROP TRIGGER IF EXISTS `c https://example.org/ns/test#Other`;\n' in migration, "the view and trigger of the class which is gone are dropped")
+check(new['triggers']['`c https://example.org/ns/test#Event`'] in migration and new['triggers']['`c https://example.org/ns/test#Note`'] not in migration, "only new triggers are made")
+
+# In the order it can be run in
+check(migration.index('INSERT') < migration.index('CREATE TABLE') < migration.index('ADD FOREIGN KEY') < migration.index('CREATE TRIGGER') < migration.index('CREATE VIEW'), "ids, tables, constraints, triggers, views", migration)
+
+# An index which isn't the same anymore is replaced
+old = json.loads(tree.read('pojo/schema.json'))
+index = '`i D https://example.org/ns/test#published`'
+old['tables'][t + 'Dated`']['indexes'][index] = 'INDEX ' + index + ' (`created`)'
+tree.write('build/schema.json', json.dumps(old))
+tree.run('--sql-migrate-from', 'build/schema.json')
+migration = tree.read('pojo/migration.sql')
+check(f'ALTER TABLE {t}Dated`\n  DROP INDEX {index},\n  ADD INDEX {index} (`D https://example.org/ns/test#published`)\n;' in migration, "a changed index is dropped and added again", migration)
+
+tree.run('--sql-migrate-from', 'build/nothing.json', ok=False)
+
+check_done()
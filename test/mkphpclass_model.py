@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import tempfile
+from check import *
+import mkphpclass
+from rdflib import URIRef
+
+tree = Tree()
+r = tree.registry()
+
+# Slotted records, with nothing of the index left once the registry is built
+for kind, items in (('Context', r.context.values()), ('Class', r.classes.values()), ('Property', r.property.values())):
+  items = list(items)
+  check(items and all(not hasattr(x, '__dict__') for x in items), f"{kind} has __slots__")
+  check(all(x.index is None for x in items), f"{kind} doesn't keep the index")
+check(r.index is None, "the registry doesn't keep the index")
+thing = r.classes[URIRef(ns + 'Thing')]
+check(thing.comment == ['Anything at all.'] and type(thing.comment[0]) is str, "comments are plain strings", thing.comment)
+
+# The same as before, in process
+check(sorted(str(x) for x in r.classes if str(x).startswith(ns)) == [ns + x for x in ['Dated', 'Named', 'Note', 'Other', 'Post', 'Thing']], "every class is there")
+
+# Writing in chunks gives what writing it at once does
+cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(dir=tree.path))
+try:
+  chunks = ['a' * 1000, 'ö', '', 'b\n' * 100]
+  output = mkphpclass.Output('manifest.json')
+  output.write('pojo/whole', ''.join(chunks))
+  output.write('pojo/chunks', iter(chunks))
+  with open('pojo/whole', 'rb') as f:
+    whole = f.read()
+  with open('pojo/chunks', 'rb') as f:
+    check(f.read() == whole == ''.join(chunks).encode(), "a file written in chunks has the same content")
+  check(output.files['pojo/whole'][:2] == output.files['pojo/chunks'][:2], "and the same hash and size in the manifest", output.files)
+  check(not os.path.exists('pojo/chunks.tmp'), "the temporary file is gone")
+finally:
+  os.chdir(cwd)
+
+check_done()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+normalized = json.loads(tree.read('pojo/schema.json'))
+tree.run('--sql-partition')
+partitioned = json.loads(tree.read('pojo/schema.json'))
+schema = tree.read('pojo/schema.sql')
+tables = sorted(partitioned['tables'])
+partition = 'PARTITION BY RANGE COLUMNS(`created`) (\n  PARTITION `p_max` VALUES LESS THAN (MAXVALUE)\n);\n'
+
+# MySQL has no foreign keys on partitioned tables, so triggers on version do what they did
+for table in tables:
+  t = partitioned['tables'][table]
+  check(t['create'].startswith(normalized['tables'][table]['create'].split(';\n')[0][:-1] + ')\n' + partition), f"{table} is partitioned by created", t['create'])
+  check(t['constraints'] == [], f"{table} has no foreign keys", t['constraints'])
+  check(t['columns'] == normalized['tables'][table]['columns'] and t['indexes'] == normalized['tables'][table]['indexes'], f"{table} has the same columns and indexes")
+  trigger = '`c ' + table[3:]
+  check(partitioned['triggers'][trigger] == f'DROP TRIGGER IF EXISTS {trigger};\nCREATE TRIGGER {trigger} AFTER DELETE ON `version`\n  FOR EACH ROW DELETE FROM {table} WHERE `created` = old.`created` AND `id` = old.`id`;\n\n', f"deleting a version deletes its row in {table}", partitioned['triggers'][trigger])
+check(partitioned['views'] == normalized['views'], "the views are the same")
+check(not re.search('^ALTER TABLE `t ', schema, re.M), "no foreign keys are added")
+check('CREATE TRIGGER `c version` AFTER DELETE ON `id`\n  FOR EACH ROW DELETE FROM `version` WHERE `id` = old.`id`;\n' in schema, "deleting an id deletes its versions")
+
+# Tables of an existing schema are partitioned after they're created, version last
+calls = re.findall(r"^CALL `partition table`\('(.*)'\);$", schema, re.M)
+check(calls == [t[1:-1] for t in tables] + ['version'], "every table is partitioned, version last", calls)
+check(schema.index('CREATE PROCEDURE `partition table`') < schema.index('CREATE TABLE IF NOT EXISTS `t ') < schema.rindex('CREATE TABLE IF NOT EXISTS `t ') < schema.index('CALL `partition table`') < schema.index('CREATE TRIGGER `c https:'), "the tables are partitioned once they're all there, before the triggers")
+
+# Old partitions are dropped and new ones split off by the retention procedure
+for procedure in ['partition table', 'partition prune', 'partition split', 'retention']:
+  check(f'DROP PROCEDURE IF EXISTS `{procedure}`;\nDELIMITER //\nCREATE PROCEDURE `{procedure}`(' in schema, f"the {procedure} procedure is created")
+retention = schema[schema.index('CREATE PROCEDURE `retention`'):]
+pruned = re.findall(r"^  CALL `partition prune`\('(.*)', cutoff\);\n  CALL `partition split`\('\1', upto\);$", retention, re.M)
+check(pruned == ['version'] + [t[1:-1] for t in tables], "retention prunes and splits every table", pruned)
+check(schema.count('DELIMITER //') == schema.count('DELIMITER ;') == 4, "every procedure resets the delimiter")
+
+# Without it, nothing about partitions
+check('PARTITION' not in json.dumps(normalized) and 'partition' not in json.dumps(normalized), "without --sql-partition the tables aren't partitioned")
+
+# The flat layout can be partitioned too
+tree.run('--sql-partition', '--sql-layout', 'flat')
+flat = json.loads(tree.read('pojo/schema.json'))
+check(all(partition in t['create'] and t['constraints'] == [] for t in flat['tables'].values()), "flat tables are partitioned too")
+
+check_done()
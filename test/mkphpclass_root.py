@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+from check import *
+
+t = 'pojo/example_org/ns/test/'
+xsd = 'pojo/www_w3_org/_2001/XMLSchema/'
+
+tree = Tree()
+tree.run('--incremental')
+full = tree.files()
+
+# A context as the root keeps all of its terms, which here is everything
+tree.run('--incremental', '--root', context)
+check(tree.files() == full, "the context as the root gives the same as a full build", set(tree.files()) ^ set(full))
+
+# A type keeps its ancestors, the ranges and domains of its properties, and their contexts
+out = tree.run('--incremental', '--root', ns + 'Note')
+files = tree.files()
+check(t + 'Other.inc.php' not in files, "a type nothing refers to is left out", sorted(files))
+check(all(t + x + '.inc.php' in files for x in ['Thing', 'Named', 'Dated', 'Post', 'Note']), "the type and its ancestors are there", sorted(files))
+check(xsd + 'anyURI.inc.php' in files and xsd + 'dateTime.inc.php' in files, "the ranges of its properties are there", sorted(files))
+check(t + '__module__.inc.php' in files, "its context is there")
+# The module has the whole JSON-LD context, which still has the terms
+check(all(b'example.org/ns/test#Other' not in content and b'example.org/ns/test#other' not in content for f, content in files.items() if not f.endswith('__module__.inc.php')), "nothing refers to what was left out")
+check(set(files) < set(full), "nothing new is generated")
+check(all(files[f] == full[f] for f in files if f.startswith(t) and not f.endswith('__module__.inc.php')), "what's kept is generated as before")
+check(f'Pruned 1 classes\n  {ns}Other\n' in out and f'Pruned 1 properties\n  {ns}other\n' in out, "what was left out is listed", out)
+check(f'  {ns}other\n' not in out.split('Checking for context entries not in any ontology')[1], "what was left out isn't reported as missing from the ontology", out)
+
+# Roots can be given more than once
+tree.run('--incremental', '--root', ns + 'Other', '--root', ns + 'Post')
+files = tree.files()
+check(t + 'Other.inc.php' in files and t + 'Post.inc.php' in files and t + 'Note.inc.php' not in files, "every root is kept, and nothing that derives from them", sorted(files))
+
+out = tree.run('--root', ns + 'Nothing', ok=False)
+check(f'unknown root types or contexts: {ns}Nothing' in out, "an unknown root fails", out)
+
+check_done()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+generic = {f: content.decode() for f, content in tree.files().items()}
+tree.run('--specialize')
+specialized = {f: content.decode() for f, content in tree.files().items()}
+check(generic.keys() == specialized.keys(), "--specialize generates the same files")
+
+to_array = '  public function toArray(\\dpa\\jsonld\\ContextHelper $context=null) : array { return \\dpa\\jsonld\\f::toArrayHelper($this,$context); }\n'
+from_array = '  public function fromArray(array $data, \\dpa\\jsonld\\ContextHelper $context=null) : void { \\dpa\\jsonld\\f::fromArrayHelper($this, $data, $context); }\n'
+method = r'^  public function {}\(.*?^  \}}\n'
+
+count = 0
+for f, content in specialized.items():
+  for name, iri_map, body in re.findall(r'^class (C_\w+) implements \S+ \{\n  const IRI_MAP = \[\n(.*?)^  \];$(.*?)^\}', content, re.M | re.S):
+    count += 1
+    entries = [(json.loads(k), json.loads(v)) for k, v in re.findall(r'^    ("(?:[^"\\]|\\.)*") => (.*),$', iri_map, re.M)]
+    to = re.search(method.format('toArray'), body, re.M | re.S)
+    to = to[0] if to else ''
+    fr = re.search(method.format('fromArray'), body, re.M | re.S)
+    fr = fr[0] if fr else ''
+    check('toArrayHelper' not in body and 'fromArrayHelper' not in body, f"{name} doesn't call the generic helpers")
+    # Everything in IRI_MAP, in its order
+    got = re.findall(r'\$this->get_(\w+)\(\)', to)
+    check(got == [v[1] for k, v in entries], f"toArray of {name} gets every property", got)
+    got = re.findall(r'\$result\[("[^"]*")\]', to)
+    check([json.loads(x) for x in got] == [v[0] for k, v in entries], f"toArray of {name} sets every IRI", got)
+    got = re.findall(r'^        ((?:case "[^"]*": ?)+)\n          \$this->set_(\w+)\(\.\.\.\\dpa\\jsonld\\f::fromArrayValue\(\$value, \$context, (.*)\)\);$', fr, re.M)
+    expected = []
+    for k, (iri, prop, default_type, contexts) in entries:
+      variants = ['http:' + k[6:], 'https:' + k[6:]] if k.startswith('http?:') else [k]
+      expected.append((' '.join('case ' + json.dumps(v) + ':' for v in variants), prop, json.dumps(default_type)))
+    check(got == expected, f"fromArray of {name} has a case for the http and https form of every IRI", got, expected)
+    check(fr.count('case ') == sum(len(e[0].split('case ')) - 1 for e in expected), f"fromArray of {name} has no other cases")
+    # Apart from the two methods, it's the same as without --specialize
+    check(re.sub(method.format('fromArray'), lambda m: from_array, re.sub(method.format('toArray'), lambda m: to_array, content, flags=re.M | re.S), flags=re.M | re.S) == generic[f], f"{f} only differs in toArray and fromArray")
+check(count >= 6, "every generated class is specialized", count)
+
+note = specialized['pojo/example_org/ns/test/Note.inc.php']
+check('$result["https://example.org/ns/test#rating"] = $v;\n' in note, "plain values are used as they are")
+check('$result["https://example.org/ns/test#author"] = \\dpa\\jsonld\\f::toArrayValue($v, $context);\n' in note, "arrays of objects go through toArrayValue")
+check('$contexts["https://example.org/ns/test"] = ($contexts["https://example.org/ns/test"] ?? 0) + 1;\n' in note, "the contexts of the properties that are set are counted")
+
+check_done()
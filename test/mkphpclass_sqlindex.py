@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+def indexes(tree):
+  model = json.loads(tree.read('pojo/schema.json'))
+  return {(table, d) for table, t in model['tables'].items() for d in t['indexes'].values()}
+
+tree = Tree()
+tree.run()
+schema = tree.read('pojo/schema.sql')
+
+# References get one to go with their foreign key, other columns only if the vocabulary asks for it
+expected = {
+  ('`t https://example.org/ns/test#Post`', 'INDEX `i * https://example.org/ns/test#author` (`* https://example.org/ns/test#author`,`created`)'),
+  ('`t https://example.org/ns/test#Dated`', 'INDEX `i D https://example.org/ns/test#published` (`D https://example.org/ns/test#published`)'),
+}
+check(indexes(tree) == expected, "there is an index on the reference and on the column with meta:index true", indexes(tree))
+for table, d in expected:
+  check(re.search('^CREATE TABLE IF NOT EXISTS ' + re.escape(table) + r' \(\n(?:  .*\n)*  ' + re.escape(d) + '\n\);$', schema, re.M), f"the index is created with {table}")
+check('summary` (' not in schema, "meta:index false gives no index")
+
+# Names longer than MySQL allows are shortened like those of the columns
+long = 'aPropertyWithANameThatIsFarTooLongForAnIndexInMySQL'
+tree.write('vocab/test.ttl', tree.read('vocab/test.ttl') + f'''
+:{long} a owl:DatatypeProperty, owl:FunctionalProperty ;
+  rdfs:domain :Other ;
+  rdfs:range xsd:dateTime ;
+  meta:index true .
+:{long}Reference a owl:ObjectProperty, owl:FunctionalProperty ;
+  rdfs:domain :Other ;
+  rdfs:range :Note .
+''')
+tree.write('build/schema.json', tree.read('pojo/schema.json'))
+tree.run('--sql-migrate-from', 'build/schema.json')
+added = {d for table, d in indexes(tree) - expected if table == '`t https://example.org/ns/test#Other`'}
+check(len(added) == 2 and len(indexes(tree)) == 4, "the new properties get an index", indexes(tree))
+columns = json.loads(tree.read('pojo/schema.json'))['tables']['`t https://example.org/ns/test#Other`']['columns']
+for d in added:
+  name, column = re.match(r'^INDEX (`[^`]*`) \((`[^`]*`)(?:,`created`)?\)$', d).groups()
+  check(len(name) - 2 <= 64 and '\t' in name, "the index name is shortened", name)
+  check(column in columns and '\t' in column, "the index is on the shortened column name", column, columns)
+check(any(d.endswith(',`created`)') for d in added), "the index on the reference includes created", added)
+migration = tree.read('pojo/migration.sql')
+check(all('  ADD ' + d in migration for d in added), "the migration adds the indexes", migration)
+
+check_done()
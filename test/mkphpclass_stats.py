@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import re
+import pstats
+import subprocess
+from check import *
+
+phases = ['parse', 'registry', 'php', 'sql', 'info']
+
+tree = Tree()
+out = tree.run()
+check('total:' not in out, "without --stats there are no stats", out)
+
+# --stats goes to stderr, after everything else
+p = subprocess.run([sys.executable, str(base / 'script/mkphpclass.py'), '--stats'], cwd=tree.path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+report = dict(re.findall(r'^ *([a-z ]+): (.*)$', p.stderr, re.M))
+check(p.returncode == 0 and list(report) == ['files', 'triples', 'classes', 'properties', 'contexts', 'written', *phases, 'total', 'peak memory'], "--stats reports the counts, each phase, the total and the peak memory", p.stderr)
+check(report.get('files') == '2' and report.get('contexts') == '1' and int(report.get('triples', 0)) > 50, "the counts are those of the input", report)
+check(all(re.match(r'^\d+\.\d{3}s$', report.get(x, '')) for x in [*phases, 'total']), "the phases are timed", report)
+check(re.match(r'^\d+\.\dMiB$', report.get('peak memory', '')), "the peak memory is in MiB", report)
+
+# generate() can be imported, and returns the same
+import mkphpclass
+os.chdir(tree.path)
+stdout = sys.stdout
+sys.stdout = open(os.devnull, 'w')
+try:
+  stats = mkphpclass.generate(['vocab/ld.owl', 'vocab/test.ttl'], [context], use_cache=False)
+finally:
+  sys.stdout.close()
+  sys.stdout = stdout
+  os.chdir(base)
+check(list(stats.phases) == phases, "generate() returns the time of each phase", stats.phases)
+check({k: str(v) for k, v in stats.counts.items() if k != 'written'} == {k: v for k, v in report.items() if k in stats.counts and k != 'written'}, "generate() returns the same counts", stats.counts)
+check(stats.counts['written'] == len(tree.files()), "generate() counts the files it wrote", stats.counts)
+check(stats.last - stats.start >= sum(stats.phases.values()) - 1e-6, "the total covers the phases")
+
+# --profile writes what pstats reads
+tree.run('--profile', 'build/profile')
+profile = pstats.Stats(str(tree.path / 'build/profile'))
+check(any(name == 'generate' and file.endswith('mkphpclass.py') for file, line, name in profile.stats), "the profile has generate()")
+
+# The benchmark runs on ontologies it makes itself, and the sizes show
+p = subprocess.run([sys.executable, str(base / 'script/bench_mkphpclass.py'), '5', '20'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+rows = [line.split() for line in p.stdout.splitlines()]
+check(p.returncode == 0 and len(rows) == 3, "the benchmark gives a row per size", p.stdout, p.stderr)
+if len(rows) == 3:
+  header = rows[0]
+  check(header[:2] == ['files', 'triples'] and header[-3:] == ['total', 'peak', 'MiB'], "the benchmark has a column per count and phase", header)
+  classes = header.index('classes')
+  check(int(rows[2][classes]) - int(rows[1][classes]) == 15, "each size has that many classes", rows)
+
+check_done()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import re
+from check import *
+
+tree = Tree()
+tree.run()
+files = {f: content.decode() for f, content in tree.files().items() if f.endswith('.inc.php')}
+
+traits = {}
+interfaces = {}
+classes = {}
+for f, content in files.items():
+  namespace = (re.search(r'^namespace (\S+);$', content, re.M) or [None, ''])[1]
+  for name, body in re.findall(r'^trait (\w+) \{\n(.*?)^\}', content, re.M | re.S):
+    traits['\\' + namespace + '\\' + name] = re.findall(r'^  public function (\w+)\(', body, re.M)
+  for name, extends, body in re.findall(r'^interface (\w+) extends ([^{]*) \{\n(.*?)^\}', content, re.M | re.S):
+    interfaces['\\' + namespace + '\\' + name] = ([x.strip() for x in extends.split(',')], re.findall(r'^  public function (\w+)\(', body, re.M))
+  for name, implements, body in re.findall(r'^(?:abstract )?class (\w+) implements (\S+) \{\n(.*?)^\}', content, re.M | re.S):
+    classes[name] = (f, '\\' + namespace + '\\' + implements, body)
+
+def interface_methods(name):
+  if name not in interfaces:
+    return set()
+  extends, methods = interfaces[name]
+  return set(methods).union(*(interface_methods(x) for x in extends))
+
+t = '\\dpa\\pojo\\example_org\\ns\\test\\'
+check(sorted(traits) == sorted(t + 'T_' + x for x in ['Dated', 'Named', 'Note', 'Other', 'Post', 'Thing']) + ['\\dpa\\pojo\\www_w3_org\\_2001\\XMLSchema\\T_anyURI', '\\dpa\\pojo\\www_w3_org\\_2001\\XMLSchema\\T_dateTime'], "every class with properties of its own has a trait", sorted(traits))
+
+# Each accessor is only generated once, in the trait of the class the property is declared for
+defined = {}
+for trait, methods in traits.items():
+  for m in methods:
+    defined.setdefault(m, []).append(trait)
+check(defined['get_link'] == [t + 'T_Thing'] and defined['get_published'] == [t + 'T_Dated'] and defined['get_author'] == [t + 'T_Post'], "accessors are in the trait of the class they're declared for", defined)
+check(sorted(defined['get_label']) == [t + 'T_Dated', t + 'T_Named'], "a property of a union of classes is in the trait of each of them", defined['get_label'])
+
+for name, (f, implements, body) in classes.items():
+  use = re.search(r'^  use ([^;{]*)(?:;| \{\n(.*?)^  \})$', body, re.M | re.S)
+  used = [x.strip() for x in use[1].split(',')] if use else []
+  rules = re.findall(r'^    (\S+)::(\w+) insteadof (.*);$', use[2] or '', re.M) if use else []
+  check(all(x in traits for x in used), f"{name} uses traits which are there", used)
+  check(not re.search(r'^  (?:private|protected|public) .*\$var_', body, re.M) and not re.search(r'^  public function (?:get|set|add|del)_', body, re.M), f"{name} has no copies of the accessors", body)
+  # Every accessor its interface has comes from exactly one trait
+  provided = {}
+  for trait in used:
+    for m in traits[trait]:
+      provided.setdefault(m, []).append(trait)
+  own = set(re.findall(r'^  public function (\w+)\(', body, re.M))
+  missing = interface_methods(implements) - provided.keys() - own
+  check(not missing, f"{name} has every method of its interface", missing)
+  for m, ts in provided.items():
+    if len(ts) == 1:
+      check(not [r for r in rules if r[1] == m], f"{name} has no rule for {m}, which only one trait has")
+      continue
+    rule = [r for r in rules if r[1] == m]
+    check(len(rule) == 1 and rule[0][0] in ts and sorted([rule[0][0], *[x.strip() for x in rule[0][2].split(',')]]) == sorted(ts), f"{name} says which trait {m} comes from", rule, ts)
+  check(len(rules) == len({r[1] for r in rules}), f"{name} has one rule per method")
+
+note = classes['C_Note'][2]
+check(note.count(' insteadof ') == 2, "Note has a rule for get_label and set_label", note)
+
+check_done()
@@ -0,0 +1,10 @@
+#!/bin/bash
+
+. "$(dirname -- "${BASH_SOURCE[0]}")/../script/env"
+
+set -x
+[ OK = "$(php test/jsonld.php)" ]
+[ OK = "$(php test/jsonld_batch.php)" ]
+[ OK = "$(php test/keycache.php)" ]
+[ OK = "$(php test/http_digest.php)" ]
+[ OK = "$(php test/router.php)" ]
@@ -0,0 +1,121 @@
+<?php
+
+declare(strict_types = 1);
+require_once __DIR__.'/check.inc.php';
+
+use dpa\router\Router;
+use dpa\router\Route;
+use dpa\router\RouteMatch;
+use dpa\router\URLLocation;
+
+// How Router::lookup used to do it, before the routes were compiled
+function linear_lookup(array $routes, URLLocation $location) : ?RouteMatch {
+  $count = INF;
+  $best_route = null;
+  foreach($routes as $route){
+    $match = $route->match($location);
+    if(!$match)
+      continue;
+    $c = count($match->arguments);
+    if($count <= $c)
+      continue;
+    $count = $c;
+    $best_route = $match;
+  }
+  return $best_route;
+}
+
+$spec = [
+  ['get', []],
+  [null, ['actor']],
+  ['get', ['actor', null]],
+  ['post', ['actor', null]],
+  ['get', ['actor', null, 'inbox']],
+  ['post', ['actor', null, 'inbox']],
+  [null, [null, null, 'inbox']],
+  ['get', ['actor', 'admin']],
+  [null, ['actor', 'admin']],
+  [null, [null, 'admin']],
+  ['get', [null, 'admin']],
+  [null, [null, null]],
+  ['get', [null, null]],
+  ['get', ['actor', null, null]],
+  ['post', [null, 'admin', null]],
+  ['get', [1, 'x']],
+  ['put', ['01']],
+  ['get', ['actor', null, 'inbox']],
+];
+
+function build(array $spec) : array {
+  $router = new Router();
+  $routes = [];
+  foreach($spec as [$method, $components]){
+    $routes[] = $route = new Route($method, $components, fn() => null);
+    $router->add($route);
+  }
+  return [$router, $routes];
+}
+
+function locations() : iterable {
+  $pool = ['actor', 'admin', 'inbox', 'bob', '1', '01', 'x'];
+  $paths = [[]];
+  for($n=0; $n<3; $n++)
+    foreach($paths as $path)
+      if(count($path) == $n)
+        foreach($pool as $component)
+          $paths[] = [...$path, $component];
+  foreach($paths as $path)
+    foreach(['get', 'post', 'put'] as $method)
+      yield new URLLocation($path, $method);
+}
+
+// Which route, by index, and with which arguments
+function describe(array $routes, ?RouteMatch $match) : ?array {
+  return $match ? [array_search($match->route, $routes, true), $match->arguments] : null;
+}
+
+function check_lookups(Router $router, array $routes, string $what) : void {
+  foreach(locations() as $location){
+    $expected = describe($routes, linear_lookup($routes, $location));
+    $got = describe($routes, $router->lookup($location));
+    check($got === $expected, "$what: $location->method $location", $got, $expected);
+  }
+}
+
+[$router, $routes] = build($spec);
+check_lookups($router, $routes, "compiled");
+check(describe($routes, $router->lookup(URLLocation::fromPath('/actor/admin', 'GET'))) === [7, []], "the method-specific route added first wins a tie");
+check(describe($routes, $router->lookup(URLLocation::fromPath('/actor/bob/inbox', 'DELETE'))) === [6, ['actor', 'bob']], "a route for any method matches what no other one does");
+check($router->lookup(URLLocation::fromPath('/x', 'get')) === null, "no route, no match");
+
+// A table saved to a file is used by a router with the same routes, and only by one
+$file = sys_get_temp_dir() . '/dpa-router-check-' . getmypid() . '.php';
+$router->save($file);
+[$restored, $routes] = build($spec);
+check($restored->restore($file), "the saved table is restored");
+check_lookups($restored, $routes, "restored");
+[$changed, $routes] = build([...$spec, ['get', ['outbox']]]);
+check(!$changed->restore($file), "a table for other routes isn't restored");
+check(!$changed->load($router->compile()), "a table with another signature isn't loaded");
+check(!$changed->load([]), "a table without a signature isn't loaded");
+check_lookups($changed, $routes, "after a stale table");
+[$reordered, $routes] = build(array_reverse($spec));
+check(!$reordered->restore($file), "a table for the same routes in another order isn't restored");
+unlink($file);
+
+// The table in APCu, if there is APCu; without it, cache() just compiles
+$key = 'check.' . getmypid();
+[$cached, $routes] = build($spec);
+$apcu = function_exists('apcu_enabled') && apcu_enabled();
+check(!$cached->cache($key), "the first cache() is a miss");
+check_lookups($cached, $routes, "cached");
+[$cached, $routes] = build($spec);
+check($cached->cache($key) === $apcu, "the second cache() is a hit if there is APCu");
+check_lookups($cached, $routes, "from the cache");
+[$cached, $routes] = build([...$spec, ['get', ['outbox']]]);
+check(!$cached->cache($key), "cache() doesn't use a table for other routes");
+check_lookups($cached, $routes, "after a stale cache");
+if($apcu)
+  apcu_delete(Router::APCU_PREFIX . $key);
+
+check_done();